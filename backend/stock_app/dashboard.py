@@ -0,0 +1,92 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import DataUploadHistory, Notification, Product, Stock, StockMovement, Supplier
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'dashboard:metrics'
+
+
+def compute_snapshot():
+    """The dashboard metrics shared by all users, computed from the database"""
+    now = timezone.now()
+    since = now - timedelta(days=7)
+
+    # current_stock is the sum of the product's stock quantities, so this is the
+    # value of all stock records without joining them to their products
+    products = Product.objects.aggregate(
+        total_products=Count('id', filter=Q(is_active=True)),
+        total_value=Coalesce(
+            Sum(F('current_stock') * F('unit_price')),
+            0,
+            output_field=DecimalField()
+        )
+    )
+
+    recent_imports = DataUploadHistory.objects.filter(upload_date__gte=since).order_by('-upload_date')[:5]
+    recent_activity = (
+        StockMovement.objects.filter(timestamp__gte=since)
+        .select_related('product').order_by('-timestamp')[:10]
+    )
+
+    return {
+        'totalProducts': products['total_products'],
+        'activeSuppliers': Supplier.objects.filter(is_active=True).count(),
+        'lowStockItems': Stock.objects.filter(quantity__lt=F('minimum_threshold')).count(),
+        'totalValue': float(products['total_value']),
+        'recentImports': [{
+            'id': imp.id,
+            'date': imp.upload_date.isoformat(),
+            'type': imp.get_upload_type_display(),
+            'status': imp.status,
+            'processed': imp.records_processed,
+            'failed': imp.records_failed
+        } for imp in recent_imports],
+        'recentActivity': [{
+            'id': activity.id,
+            'date': activity.timestamp.isoformat(),
+            'type': activity.movement_type,
+            'description': f"{activity.get_movement_type_display()} - {activity.product.name} ({activity.quantity} units)"
+        } for activity in recent_activity],
+        'updatedAt': now.isoformat(),
+    }
+
+
+def refresh_snapshot():
+    """
+    Recompute the shared metrics and cache them. The entry outlives a few
+    missed refreshes; once it is gone, the next request recomputes it.
+    """
+    snapshot = compute_snapshot()
+    try:
+        cache.set(SNAPSHOT_KEY, snapshot, settings.DASHBOARD_REFRESH_INTERVAL * 5)
+    except Exception as e:
+        logger.warning(f"Could not cache the dashboard snapshot: {str(e)}")
+    return snapshot
+
+
+def get_snapshot():
+    """The cached metrics, or freshly computed ones when the cache is empty or Redis is unavailable"""
+    try:
+        snapshot = cache.get(SNAPSHOT_KEY)
+    except Exception as e:
+        logger.warning(f"Could not read the dashboard snapshot: {str(e)}")
+        return compute_snapshot()
+    return snapshot or refresh_snapshot()
+
+
+def unread_alerts(user, limit=5):
+    """The latest unread notifications of a user, the only metrics read per request"""
+    return [{
+        'id': alert.id,
+        'type': alert.get_type_display(),
+        'message': alert.message,
+        'severity': 'warning' if alert.type == 'STOCK_LOW' else 'info'
+    } for alert in Notification.objects.filter(user=user, read=False).order_by('-created_at')[:limit]]
@@ -0,0 +1,246 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import zipfile
+import zlib
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import HttpRequest, QueryDict
+from rest_framework.request import Request
+
+from .search import search_transaction
+from .uploads import UPLOAD_DIR
+
+# Background export files, on the volume nginx serves upload_temp from
+EXPORT_DIR = os.path.join(UPLOAD_DIR, 'exports')
+
+# Query params of the product list that do not select products
+NON_FILTER_PARAMS = {'cursor', 'page_size', 'count', 'export_format', 'format'}
+
+# Exported product columns: (header, field)
+EXPORT_COLUMNS = [
+    ('ID', 'id'),
+    ('Name', 'name'),
+    ('SKU', 'sku'),
+    ('Barcode', 'barcode'),
+    ('Unit Price', 'unit_price'),
+    ('Current Stock', 'current_stock'),
+    ('Status', 'is_active'),
+]
+
+
+def export_rows(queryset, chunk_size=None):
+    """
+    Yield lists of exported value tuples, chunk_size rows at a time. Rows
+    come from a server-side cursor, so only one chunk is held in memory.
+
+    The cursor is read inside a transaction: outside one, PostgreSQL would
+    need a WITH HOLD cursor, which materializes the whole result before
+    the first row is returned. The export also sees a single snapshot, and
+    searches match as in the product list.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    with search_transaction(queryset.db):
+        rows = queryset.order_by('id').values_list(*[field for _, field in EXPORT_COLUMNS]).iterator(chunk_size=chunk_size)
+        try:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            # Close the cursor before the transaction ends, also when the client went away
+            rows.close()
+
+
+def status_label(is_active):
+    return 'Active' if is_active else 'Inactive'
+
+
+def write_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    yield drain()
+    for chunk in chunks:
+        writer.writerows(row[:-1] + (status_label(row[-1]),) for row in chunk)
+        yield drain()
+
+
+def write_csv_gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for index, data in enumerate(write_csv(chunks)):
+        compressed = compressor.compress(data)
+        if index == 0:
+            # Send the header right away instead of waiting for a full deflate block
+            compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def write_ndjson(chunks):
+    fields = [field for _, field in EXPORT_COLUMNS]
+    for chunk in chunks:
+        yield ''.join(
+            json.dumps(dict(zip(fields, row)), default=str, ensure_ascii=False) + '\n' for row in chunk
+        ).encode('utf-8')
+
+
+class _ZipSink:
+    """Write-only target without tell(): zipfile then streams entries with data descriptors"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Products" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        text = status_label(value) if isinstance(value, bool) else (value or '')
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_INVALID_XML.sub("", text))}</t></is></c>'
+    return f'<c><v>{value}</v></c>'
+
+
+def write_xlsx(chunks):
+    """
+    Write a single-sheet workbook as it goes: the sheet is one zip entry
+    deflated row by row, so neither the rows nor the file are ever held in
+    memory. Strings are stored inline, which needs no shared string table.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in XLSX_PARTS.items():
+            workbook.writestr(name, content)
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                .encode('utf-8')
+            )
+            sheet.write(
+                ('<row>' + ''.join(_xlsx_cell(header) for header, _ in EXPORT_COLUMNS) + '</row>').encode('utf-8')
+            )
+            yield sink.drain()
+            for chunk in chunks:
+                sheet.write(''.join(
+                    '<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>' for row in chunk
+                ).encode('utf-8'))
+                data = sink.drain()
+                if data:
+                    yield data
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+# Export format -> (content type, file extension, writer)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv', write_csv),
+    'csv.gz': ('application/gzip', 'csv.gz', write_csv_gzip),
+    'ndjson': ('application/x-ndjson', 'ndjson', write_ndjson),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx', write_xlsx),
+}
+
+
+def stream_export(queryset, export_format, chunk_size=None):
+    """Yield the encoded export of a product queryset, chunk by chunk"""
+    _, _, writer = EXPORT_FORMATS[export_format]
+    return writer(export_rows(queryset, chunk_size))
+
+
+def normalize_filters(params):
+    """Product list filters from query params or a dict, without paging/format params or empty values"""
+    return {
+        str(key): str(value) for key, value in sorted(params.items())
+        if key not in NON_FILTER_PARAMS and value not in (None, '')
+    }
+
+
+def filtered_products(filters):
+    """
+    The products matching list filters, selected exactly as
+    ProductViewSet.filter_queryset selects them for a request with these
+    query params. Invalid filter values raise a ValidationError.
+    """
+    from .views.product_views import ProductViewSet
+
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(mutable=True)
+    http_request.GET.update(filters)
+    view = ProductViewSet(request=Request(http_request), action='list', format_kwarg=None, args=(), kwargs={})
+    return view.filter_queryset(view.get_queryset())
+
+
+def export_signature(export_format, filters, version):
+    """Identifies the content of an export: the same format and filters over the same product data"""
+    payload = json.dumps([export_format, normalize_filters(filters), version], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def export_path(job):
+    return os.path.join(EXPORT_DIR, job.file_name)
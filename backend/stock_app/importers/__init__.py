@@ -0,0 +1,51 @@
+from .products import (
+    ImportResult,
+    ProductImporter
+)
+from .readers import (
+    SUPPORTED_EXTENSIONS,
+    iter_file_chunks,
+    iter_csv_stream,
+    read_frame,
+    count_data_rows,
+    append_chunk,
+    iter_chunk_file
+)
+from .stock import STOCK_COLUMNS, apply_stock_chunk
+from .copy_ingest import (
+    ProductCopyIngester,
+    StockCopyIngester
+)
+from .prices import PriceImporter, is_price_feed, importer_for, set_prices
+from .delta import DeltaImporter
+from .preview import (
+    hash_upload,
+    get_parsed_window,
+    build_preview,
+    missing_columns
+)
+
+__all__ = [
+    'ImportResult',
+    'ProductImporter',
+    'SUPPORTED_EXTENSIONS',
+    'iter_file_chunks',
+    'iter_csv_stream',
+    'read_frame',
+    'count_data_rows',
+    'append_chunk',
+    'iter_chunk_file',
+    'STOCK_COLUMNS',
+    'apply_stock_chunk',
+    'ProductCopyIngester',
+    'StockCopyIngester',
+    'PriceImporter',
+    'is_price_feed',
+    'importer_for',
+    'set_prices',
+    'DeltaImporter',
+    'hash_upload',
+    'get_parsed_window',
+    'build_preview',
+    'missing_columns'
+]
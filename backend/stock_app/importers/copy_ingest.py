@@ -0,0 +1,308 @@
+import io
+import logging
+import time
+import uuid
+
+from django.db import connection, transaction
+
+from ..models import Product, PriceHistory, Stock, StockMovement
+from ..versions import LOOKUPS, PRODUCTS, bump_version
+from .products import ImportResult, ProductImporter, PRICE_TYPES, REFERENCE_FIELDS, REQUIRED_FOR_CREATE, TEXT_FIELDS
+from .stock import clean_stock_rows, report_unknown_skus, MAX_REPORTED_SKUS
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_STAGING_COLUMNS = [
+    ('row_no', 'bigint'),
+    ('sku', 'text'),
+    ('name', 'text'),
+    ('description', 'text'),
+    ('barcode', 'text'),
+    ('brand_id', 'bigint'),
+    ('category_id', 'bigint'),
+    ('supplier_id', 'bigint'),
+    ('unit_price', 'numeric(10, 2)'),
+    ('purchase_price', 'numeric(10, 2)'),
+    ('is_active', 'boolean'),
+]
+
+STOCK_STAGING_COLUMNS = [
+    ('row_no', 'bigint'),
+    ('sku', 'text'),
+    ('quantity', 'integer'),
+    ('location', 'text'),
+]
+
+
+class StagingTable:
+    """An unlogged PostgreSQL table that parsed rows are streamed into with COPY"""
+
+    def __init__(self, prefix, columns, key=None):
+        self.name = f'{prefix}_staging_{key or uuid.uuid4().hex}'
+        self.columns = columns
+
+    def create(self):
+        definition = ', '.join(f'{name} {sql_type}' for name, sql_type in self.columns)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.name}')
+            cursor.execute(f'CREATE UNLOGGED TABLE {self.name} ({definition})')
+
+    def copy_frame(self, df, not_null=()):
+        """
+        Stream a frame whose columns match the staging table through COPY
+        FROM STDIN. Missing values arrive as NULL, except in the not_null
+        columns, where an empty value is staged as an empty string.
+        """
+        names = [name for name, _ in self.columns]
+        buffer = io.StringIO()
+        df.to_csv(buffer, columns=names, header=False, index=False, na_rep='')
+        buffer.seek(0)
+        options = f", FORCE_NOT_NULL ({', '.join(not_null)})" if not_null else ''
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {self.name} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv{options})",
+                buffer
+            )
+
+    def finish_load(self):
+        """Index and analyze the loaded rows so the merge statements plan well"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE INDEX ON {self.name} (sku)')
+            cursor.execute(f'ANALYZE {self.name}')
+
+    def drop(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.name}')
+
+
+class CopyIngester:
+    """
+    Base class for COPY-based ingestion.
+
+    Validated chunks are streamed into an unlogged staging table, then
+    merged into the target tables with a few set-based statements inside a
+    single transaction. Subclasses implement stage_chunk() and merge().
+    """
+    table_prefix = None
+    staging_columns = None
+
+    def __init__(self, key=None):
+        self.staging = StagingTable(self.table_prefix, self.staging_columns, key)
+
+    def run(self, chunks, on_chunk=None):
+        started = time.monotonic()
+        result = ImportResult()
+        staged = 0
+
+        self.staging.create()
+        try:
+            for chunk in chunks:
+                staged += self.stage_chunk(chunk, result)
+                if on_chunk:
+                    on_chunk(len(chunk))
+            self.staging.finish_load()
+            with transaction.atomic():
+                self.merge(result, staged)
+                bump_version(PRODUCTS, LOOKUPS)
+        finally:
+            self.staging.drop()
+
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"COPY ingest into {self.table_prefix}: {result.created} inserted, "
+            f"{result.updated} updated, {result.failed} rejected in {elapsed:.2f}s"
+        )
+        return result
+
+    def stage_chunk(self, chunk, result):
+        raise NotImplementedError
+
+    def merge(self, result, staged):
+        raise NotImplementedError
+
+    def sample_skus(self, cursor):
+        return [row[0] for row in cursor.fetchmany(MAX_REPORTED_SKUS + 1)]
+
+
+class ProductCopyIngester(CopyIngester):
+    """Upsert products by SKU with INSERT ... ON CONFLICT (sku) and UPDATE ... FROM"""
+    table_prefix = Product._meta.db_table
+    staging_columns = PRODUCT_STAGING_COLUMNS
+
+    def __init__(self, column_mapping, key=None, user=None, reason='Product import'):
+        super().__init__(key)
+        self.importer = ProductImporter(column_mapping)
+        self.mapped_fields = []
+        self.user = user
+        self.reason = reason
+
+    def stage_chunk(self, chunk, result):
+        data, errors = self.importer.prepare(chunk)
+        for label in data.index:
+            if label in errors:
+                result.add_error(label, errors[label])
+        valid = data.drop(index=list(errors))
+
+        self.mapped_fields = [
+            f'{field}_id' if field in REFERENCE_FIELDS else field for field in data.columns
+        ]
+        staged = valid.rename(columns={field: f'{field}_id' for field in REFERENCE_FIELDS})
+        staged = staged.reindex(columns=[name for name, _ in self.staging_columns])
+        staged['row_no'] = valid.index
+        # Mapped text is never missing in valid rows, an empty cell is a blank value
+        self.staging.copy_frame(staged, not_null=[field for field in data.columns if field in TEXT_FIELDS])
+        return len(valid)
+
+    def merge(self, result, staged):
+        table = Product._meta.db_table
+        staging = self.staging.name
+
+        with connection.cursor() as cursor:
+            # The first occurrence of a SKU wins, as in the ORM import path
+            cursor.execute(
+                f'DELETE FROM {staging} s USING {staging} d '
+                f'WHERE s.sku = d.sku AND s.row_no > d.row_no'
+            )
+            duplicates = cursor.rowcount
+            if duplicates:
+                result.failed += duplicates
+                result.errors.append(f"Duplicate SKUs in file: {duplicates} rows skipped")
+
+            # Log price changes of existing products before they are overwritten
+            for field, price_type in PRICE_TYPES.items():
+                if field not in self.mapped_fields:
+                    continue
+                cursor.execute(
+                    f'INSERT INTO {PriceHistory._meta.db_table} '
+                    f'(product_id, price_type, old_price, new_price, changed_at, changed_by_id, reason) '
+                    f'SELECT p.id, %s, p.{field}, s.{field}, now(), %s, %s '
+                    f'FROM {staging} s JOIN {table} p ON p.sku = s.sku '
+                    f'WHERE s.{field} IS NOT NULL AND s.{field} <> p.{field}',
+                    [price_type, self.user.id if self.user else None, self.reason]
+                )
+
+            # As in the ORM path, an empty price, reference or is_active cell keeps the
+            # stored value, while empty text (staged as '') clears it
+            updates = [
+                f'{field} = COALESCE(s.{field}, p.{field})'
+                for field in self.mapped_fields if field != 'sku'
+            ]
+            cursor.execute(
+                f'UPDATE {table} p SET {", ".join(updates + ["updated_at = now()"])} '
+                f'FROM {staging} s WHERE p.sku = s.sku'
+            )
+            result.updated = cursor.rowcount
+
+            required = [
+                f's.{field}_id IS NOT NULL' if field in REFERENCE_FIELDS else f's.{field} IS NOT NULL'
+                for field in REQUIRED_FOR_CREATE
+            ]
+            cursor.execute(
+                f'INSERT INTO {table} (sku, name, description, barcode, brand_id, category_id, '
+                f'supplier_id, unit_price, purchase_price, is_active, current_stock, created_at, updated_at) '
+                f'SELECT s.sku, s.name, s.description, COALESCE(s.barcode, \'\'), s.brand_id, '
+                f's.category_id, s.supplier_id, s.unit_price, COALESCE(s.purchase_price, 0), '
+                f'COALESCE(s.is_active, true), 0, now(), now() '
+                f'FROM {staging} s '
+                f'WHERE NOT EXISTS (SELECT 1 FROM {table} p WHERE p.sku = s.sku) '
+                f'AND {" AND ".join(required)} '
+                f'ORDER BY s.row_no '
+                f'ON CONFLICT (sku) DO NOTHING'
+            )
+            result.created = cursor.rowcount
+
+            rejected = staged - duplicates - result.updated - result.created
+            if rejected:
+                cursor.execute(
+                    f'SELECT s.sku FROM {staging} s '
+                    f'WHERE NOT EXISTS (SELECT 1 FROM {table} p WHERE p.sku = s.sku) '
+                    f'ORDER BY s.row_no LIMIT %s',
+                    [MAX_REPORTED_SKUS + 1]
+                )
+                skus = self.sample_skus(cursor)
+                result.failed += rejected
+                result.errors.append(
+                    f"New products missing required fields ({rejected} rows): "
+                    f"{', '.join(skus[:MAX_REPORTED_SKUS])}{', ...' if len(skus) > MAX_REPORTED_SKUS else ''}"
+                )
+
+        result.processed = result.created + result.updated
+
+
+class StockCopyIngester(CopyIngester):
+    """Set stock quantities by SKU and log the movements with set-based statements"""
+    table_prefix = Stock._meta.db_table
+    staging_columns = STOCK_STAGING_COLUMNS
+
+    def __init__(self, reference_number, notes='Updated via file upload', key=None):
+        super().__init__(key)
+        self.reference_number = reference_number
+        self.notes = notes
+
+    def stage_chunk(self, chunk, result):
+        rows, chunk_result = clean_stock_rows(chunk)
+        result.failed += chunk_result.failed
+        result.errors.extend(chunk_result.errors)
+        self.staging.copy_frame(rows.assign(row_no=rows.index))
+        return len(rows)
+
+    def merge(self, result, staged):
+        products = Product._meta.db_table
+        stock = Stock._meta.db_table
+        staging = self.staging.name
+        minimum = Stock._meta.get_field('minimum_threshold').default
+        maximum = Stock._meta.get_field('maximum_threshold').default
+
+        with connection.cursor() as cursor:
+            unknown_rows = f'WHERE NOT EXISTS (SELECT 1 FROM {products} p WHERE p.sku = s.sku)'
+            cursor.execute(f'SELECT DISTINCT s.sku FROM {staging} s {unknown_rows} LIMIT %s', [MAX_REPORTED_SKUS + 1])
+            skus = self.sample_skus(cursor)
+            cursor.execute(f'DELETE FROM {staging} s {unknown_rows}')
+            if cursor.rowcount:
+                report_unknown_skus(result, skus, cursor.rowcount)
+
+            # Every row is logged as a movement, like the ORM path
+            cursor.execute(
+                f'INSERT INTO {StockMovement._meta.db_table} '
+                f'(product_id, movement_type, quantity, reference_number, timestamp, notes) '
+                f'SELECT p.id, %s, s.quantity, %s, now(), %s '
+                f'FROM {staging} s JOIN {products} p ON p.sku = s.sku ORDER BY s.row_no',
+                ['ADJUST', self.reference_number, self.notes]
+            )
+            result.processed = cursor.rowcount
+
+            # The last row per SKU sets the quantity of the product's first stock record
+            latest = (
+                f'SELECT DISTINCT ON (s.sku) p.id AS product_id, s.quantity, s.location '
+                f'FROM {staging} s JOIN {products} p ON p.sku = s.sku '
+                f'ORDER BY s.sku, s.row_no DESC'
+            )
+            cursor.execute(
+                f'WITH latest AS ({latest}), '
+                f'first_stock AS ('
+                f'SELECT DISTINCT ON (product_id) id, product_id FROM {stock} '
+                f'WHERE product_id IN (SELECT product_id FROM latest) ORDER BY product_id, id) '
+                f'UPDATE {stock} st SET quantity = l.quantity, location = l.location, last_checked = now() '
+                f'FROM latest l JOIN first_stock f ON f.product_id = l.product_id '
+                f'WHERE st.id = f.id'
+            )
+            result.updated = cursor.rowcount
+
+            cursor.execute(
+                f'WITH latest AS ({latest}) '
+                f'INSERT INTO {stock} '
+                f'(product_id, quantity, location, last_checked, minimum_threshold, maximum_threshold) '
+                f'SELECT l.product_id, l.quantity, l.location, now(), %s, %s FROM latest l '
+                f'WHERE NOT EXISTS (SELECT 1 FROM {stock} st WHERE st.product_id = l.product_id)',
+                [minimum, maximum]
+            )
+            result.created = cursor.rowcount
+
+            # Stock.post_save does not fire for these rows, so recompute the product totals here
+            cursor.execute(
+                f'UPDATE {products} p SET current_stock = t.total '
+                f'FROM (SELECT st.product_id, SUM(st.quantity) AS total FROM {stock} st '
+                f'WHERE st.product_id IN (SELECT sp.id FROM {staging} s JOIN {products} sp ON sp.sku = s.sku) '
+                f'GROUP BY st.product_id) t '
+                f'WHERE p.id = t.product_id'
+            )
@@ -0,0 +1,124 @@
+import logging
+
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import ImportFingerprint, Product
+from ..versions import LOOKUPS, PRODUCTS, bump_version
+from .products import DEFAULT_BATCH_SIZE, ImportResult, to_text
+from .prices import importer_for
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_rows(mapped):
+    """Hash the mapped fields of every row into a signed 64-bit integer"""
+    values = mapped[sorted(mapped.columns)].astype(str)
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    return pd.Series(hashes.view('int64'), index=mapped.index)
+
+
+class DeltaImporter:
+    """
+    Apply a feed of an ImportConfiguration as a delta against its last run.
+
+    Every applied row leaves a fingerprint (SKU -> hash of the mapped
+    fields). On the next run rows with an unchanged fingerprint are skipped,
+    new and changed rows go through the import engine (PriceImporter for
+    price feeds, ProductImporter otherwise), and finish()
+    deactivates the products whose SKUs are no longer in the feed. A SKU
+    that comes back (or is new to the feed) is active again, unless the
+    feed maps is_active itself.
+    Chunks must be fed in file order, as duplicates are detected across
+    the whole file.
+    """
+
+    def __init__(self, configuration, batch_size=DEFAULT_BATCH_SIZE):
+        self.configuration = configuration
+        self.batch_size = batch_size
+        self.importer = importer_for(
+            configuration.column_mapping, batch_size=batch_size, reason=f'Feed: {configuration.name}'
+        )
+        self.previous = pd.Series(
+            dict(configuration.fingerprints.values_list('sku', 'row_hash')),
+            dtype='Int64'
+        )
+        self.seen = set()
+
+    def apply_chunk(self, df):
+        result = ImportResult()
+        mapped = self.importer.map_columns(df)
+        if 'sku' not in mapped:
+            raise ValueError("'sku' must be mapped to a column of the file")
+
+        skus = mapped['sku'].map(to_text, na_action='ignore')
+        hashes = fingerprint_rows(mapped)
+
+        # The first occurrence of a SKU in the file wins, also across chunks
+        duplicate = skus.notna() & (skus.duplicated(keep='first') | skus.isin(self.seen))
+        self.seen.update(skus.dropna())
+
+        previous = self.previous.reindex(skus.to_numpy())
+        new_to_feed = pd.Series(previous.isna().to_numpy(dtype=bool), index=df.index)
+        unchanged = pd.Series(
+            previous.eq(hashes.to_numpy()).fillna(False).to_numpy(dtype=bool),
+            index=df.index
+        ) & ~duplicate
+        changed = ~unchanged & ~duplicate
+
+        if changed.any():
+            applied = self.importer.run(df[changed])
+            result.created = applied.created
+            result.updated = applied.updated
+            result.unchanged = applied.unchanged
+            result.failed_rows = applied.failed_rows
+            result.errors = applied.errors
+            result.failed = applied.failed
+        for label in df.index[duplicate]:
+            result.add_error(label, {'sku': ['Duplicate SKU in file.']})
+
+        result.unchanged += int(unchanged.sum())
+        result.processed = result.created + result.updated + result.unchanged
+
+        # Failed rows keep their old fingerprint (or none), so the next run retries them
+        stored = changed & skus.notna() & ~df.index.isin(result.failed_rows)
+        if 'is_active' not in mapped:
+            self.reactivate(skus[stored & new_to_feed])
+        ImportFingerprint.objects.bulk_create(
+            [
+                ImportFingerprint(configuration=self.configuration, sku=sku, row_hash=row_hash)
+                for sku, row_hash in zip(skus[stored], hashes[stored])
+            ],
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=['configuration', 'sku'],
+            update_fields=['row_hash']
+        )
+        return result
+
+    def reactivate(self, skus):
+        """Activate products whose SKUs (re)entered the feed, finish() of an earlier run may have deactivated them"""
+        skus = list(skus)
+        if not skus:
+            return
+        reactivated = Product.objects.filter(sku__in=skus, is_active=False).update(
+            is_active=True, updated_at=timezone.now()
+        )
+        if reactivated:
+            bump_version(PRODUCTS, LOOKUPS)
+
+    def finish(self):
+        """Deactivate the products whose SKUs left the feed and return how many rows were removed"""
+        removed = [sku for sku in self.previous.index if sku not in self.seen]
+        now = timezone.now()
+        for start in range(0, len(removed), self.batch_size):
+            batch = removed[start:start + self.batch_size]
+            with transaction.atomic():
+                Product.objects.filter(sku__in=batch, is_active=True).update(is_active=False, updated_at=now)
+                self.configuration.fingerprints.filter(sku__in=batch).delete()
+        if removed:
+            bump_version(PRODUCTS, LOOKUPS)
+
+        logger.info(f"Delta import for configuration {self.configuration.id}: {len(removed)} SKUs removed")
+        return len(removed)
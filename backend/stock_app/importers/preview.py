@@ -0,0 +1,114 @@
+import hashlib
+
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+
+from .readers import binary_source, csv_compression, file_format
+
+# Product fields a column mapping is suggested for
+SUGGESTED_FIELDS = ['name', 'sku', 'description', 'barcode', 'unit_price', 'purchase_price']
+
+
+def hash_upload(file):
+    """SHA-256 hex digest of an uploaded file, leaving it rewound for reading"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _key(file_hash):
+    return f'import-preview:{file_hash}'
+
+
+def get_parsed_window(file_hash, file=None, rows=0):
+    """
+    Return the leading rows of a file parsed as raw text without a header,
+    keyed by file hash. The window is parsed once and cached, so previews
+    with other header/preview rows and the import that follows are served
+    from the cache. Returns None when nothing is cached and no file is given.
+    """
+    parsed = cache.get(_key(file_hash))
+    if parsed is not None and (parsed['complete'] or len(parsed['window']) >= rows):
+        return parsed
+    if file is None:
+        return parsed
+
+    window_rows = max(rows, settings.IMPORT_PREVIEW_WINDOW)
+    window = read_window(file, window_rows)
+    parsed = {
+        'file_name': file.name,
+        'window': window,
+        # The whole file fits in the window
+        'complete': len(window) < window_rows,
+    }
+    cache.set(_key(file_hash), parsed, settings.IMPORT_PREVIEW_CACHE_TTL)
+    return parsed
+
+
+def read_window(file, nrows):
+    file.seek(0)
+    try:
+        fmt = file_format(file.name)
+        if fmt == 'csv':
+            return pd.read_csv(
+                binary_source(file), header=None, nrows=nrows, dtype=str,
+                compression=csv_compression(file.name), encoding='utf-8'
+            )
+        if fmt == 'parquet':
+            return _read_parquet_window(file, nrows)
+        return pd.read_excel(file, header=None, nrows=nrows, dtype=str)
+    finally:
+        file.seek(0)
+
+
+def _read_parquet_window(file, nrows):
+    """Lay out the first rows of a Parquet file like a headerless text file: names first, then values"""
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(file)
+    batch = next(parquet_file.iter_batches(batch_size=max(nrows - 1, 1)), None)
+    names = parquet_file.schema_arrow.names
+    values = batch.to_pandas() if batch is not None else pd.DataFrame(columns=names)
+    values = values.map(lambda value: None if pd.isna(value) else str(value))
+    return pd.DataFrame([names, *values.itertuples(index=False)])
+
+
+def get_headers(window, header_row):
+    if header_row >= len(window):
+        raise ValueError(f"Header row {header_row} is past the end of the file")
+    return [
+        value if pd.notna(value) else f'Unnamed: {position}'
+        for position, value in enumerate(window.iloc[header_row])
+    ]
+
+
+def build_preview(window, header_row, preview_rows):
+    """Return the headers, the first preview_rows data rows and a suggested column mapping"""
+    headers = get_headers(window, header_row)
+    rows = window.iloc[header_row + 1:header_row + 1 + preview_rows].set_axis(headers, axis=1)
+    preview = rows.astype(object).where(rows.notna(), None).to_dict('records')
+    return headers, preview, suggest_mapping(headers)
+
+
+def suggest_mapping(headers):
+    suggested_mapping = {}
+    for field in SUGGESTED_FIELDS:
+        # Try to find an exact match
+        matches = [h for h in headers if h.lower() == field.lower()]
+        if matches:
+            suggested_mapping[field] = matches[0]
+        else:
+            # Try to find a partial match
+            matches = [h for h in headers if field.lower() in h.lower()]
+            if matches:
+                suggested_mapping[field] = matches[0]
+    return suggested_mapping
+
+
+def missing_columns(window, header_row, column_mapping):
+    """Mapped file columns that are not in the header row"""
+    headers = set(get_headers(window, header_row))
+    return [column for column in column_mapping.values() if column and column not in headers]
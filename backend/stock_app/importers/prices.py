@@ -0,0 +1,99 @@
+import logging
+
+import pandas as pd
+from django.db import transaction, DatabaseError
+from django.utils import timezone
+
+from ..models import Product, PriceHistory
+from ..versions import LOOKUPS, PRODUCTS, bump_version
+from .products import DEFAULT_BATCH_SIZE, PRICE_FIELDS, ProductImporter, price_changes
+
+logger = logging.getLogger(__name__)
+
+
+def is_price_feed(column_mapping):
+    """Whether a mapping only carries prices by SKU"""
+    fields = {field for field, column in column_mapping.items() if column}
+    return 'sku' in fields and len(fields) > 1 and fields - {'sku'} <= set(PRICE_FIELDS)
+
+
+def importer_for(column_mapping, **kwargs):
+    """The import engine for a mapping: change-only PriceImporter for price feeds, ProductImporter otherwise"""
+    if is_price_feed(column_mapping):
+        return PriceImporter(column_mapping, **kwargs)
+    return ProductImporter(column_mapping, **kwargs)
+
+
+def set_prices(skus, prices, user=None, reason=''):
+    """Give the products with these SKUs the same prices ({'unit_price': ...}), writing only real changes"""
+    df = pd.DataFrame({'sku': list(skus), **prices})
+    return PriceImporter({'sku': 'sku', **{field: field for field in prices}}, user=user, reason=reason).run(df)
+
+
+class PriceImporter(ProductImporter):
+    """
+    Change-only price updates by SKU.
+
+    Rows are validated like product imports, then each batch compares the
+    incoming sale/purchase prices with the current ones of the locked
+    products in memory. Only products whose price actually changed are
+    written (bulk_update), together with their PriceHistory rows
+    (bulk_create), in one transaction per batch; rows with unchanged
+    prices cost no write at all.
+    """
+
+    def __init__(self, column_mapping, batch_size=DEFAULT_BATCH_SIZE, user=None, reason='Price feed'):
+        super().__init__(column_mapping, batch_size, user, reason)
+
+    def save_batch(self, batch, errors, result):
+        fields = [field for field in PRICE_FIELDS if field in batch.columns]
+        now = timezone.now()
+        changed = []
+        history = []
+
+        try:
+            with transaction.atomic():
+                # Only the current prices are read, as plain values rather than model instances
+                current = pd.DataFrame.from_records(
+                    list(
+                        Product.objects.select_for_update()
+                        .filter(sku__in=list(batch['sku'])).order_by('id')
+                        .values_list('sku', 'id', *PRICE_FIELDS)
+                    ),
+                    columns=['sku', 'id'] + PRICE_FIELDS
+                ).set_index('sku')
+
+                known = batch['sku'].isin(current.index)
+                for label in batch.index[~known]:
+                    errors[label] = {'sku': ['No product with this SKU.']}
+                rows = batch[known]
+                old = current.reindex(rows['sku'])
+                differs = pd.Series(False, index=rows.index)
+                for field in fields:
+                    differs |= rows[field].notna() & (rows[field].to_numpy() != old[field].to_numpy())
+
+                for (label, row), (product_id, *prices) in zip(
+                    rows[differs].iterrows(), old[differs.to_numpy()].itertuples(index=False)
+                ):
+                    product = Product(id=product_id, sku=row['sku'], **dict(zip(PRICE_FIELDS, prices)))
+                    history.extend(price_changes(product, row, self.user, self.reason))
+                    for field in fields:
+                        if not pd.isna(row[field]):
+                            setattr(product, field, row[field])
+                    product.updated_at = now
+                    changed.append(product)
+
+                Product.objects.bulk_update(changed, fields + ['updated_at'], batch_size=self.batch_size)
+                PriceHistory.objects.bulk_create(history, batch_size=self.batch_size)
+                if changed:
+                    bump_version(PRODUCTS, LOOKUPS)
+        except DatabaseError as e:
+            logger.error(f"Price import batch failed: {str(e)}")
+            for label in batch.index:
+                errors.setdefault(label, {'non_field_errors': [str(e)]})
+            return
+
+        unchanged = int(known.sum()) - len(changed)
+        result.updated += len(changed)
+        result.unchanged += unchanged
+        result.processed += len(changed) + unchanged
@@ -0,0 +1,338 @@
+import logging
+import time
+from decimal import Decimal
+
+import pandas as pd
+from django.db import transaction, DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Brand, Category, Supplier, Product, PriceHistory
+from ..versions import LOOKUPS, PRODUCTS, bump_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Mappable text fields and their maximum length (None = unbounded TextField)
+TEXT_FIELDS = {
+    'name': 200,
+    'sku': 50,
+    'barcode': 100,
+    'description': None,
+}
+PRICE_FIELDS = ['unit_price', 'purchase_price']
+# PriceHistory.price_type of each price field
+PRICE_TYPES = {
+    'unit_price': 'SALE',
+    'purchase_price': 'PURCHASE',
+}
+BOOLEAN_FIELDS = ['is_active']
+REFERENCE_FIELDS = {
+    'brand': Brand,
+    'category': Category,
+    'supplier': Supplier,
+}
+
+# Text fields that must not be blank when mapped
+NON_BLANK_FIELDS = ['name', 'sku', 'description']
+
+# Fields a new product cannot be inserted without
+REQUIRED_FOR_CREATE = ['name', 'sku', 'description', 'supplier', 'unit_price']
+
+# Largest value allowed by DecimalField(max_digits=10, decimal_places=2)
+MAX_PRICE = 99999999.99
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', 'active'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', 'inactive'}
+
+
+def to_text(value):
+    # Numeric SKUs/barcodes come back from pandas as floats, drop the trailing '.0'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _to_price(value):
+    return Decimal(f"{value:.2f}")
+
+
+def price_changes(product, values, user=None, reason=''):
+    """PriceHistory rows (unsaved) for the prices in values that differ from the product's current ones"""
+    history = []
+    for field, price_type in PRICE_TYPES.items():
+        new_price = values.get(field)
+        if new_price is None or pd.isna(new_price):
+            continue
+        old_price = getattr(product, field)
+        if new_price != old_price:
+            history.append(PriceHistory(
+                product=product,
+                price_type=price_type,
+                old_price=old_price,
+                new_price=new_price,
+                changed_by=user,
+                reason=reason
+            ))
+    return history
+
+
+class ImportResult:
+    """Counters and row errors collected during a product import"""
+
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.created = 0
+        self.updated = 0
+        self.removed = 0
+        self.unchanged = 0
+        self.errors = []
+        self.failed_rows = []
+
+    def add_error(self, label, errors):
+        self.failed += 1
+        self.failed_rows.append(label)
+        self.errors.append(f"Row {label}: {errors}")
+
+    @property
+    def error_message(self):
+        return ''.join(f"{line}\n" for line in self.errors)
+
+
+class ProductImporter:
+    """
+    Set-based product import engine.
+
+    The mapped columns are validated column-wise, brand/category/supplier
+    references are resolved with one query per model, and products are
+    upserted by SKU in batches, each batch in its own transaction. Existing
+    products are locked and compared with the incoming rows in memory: only
+    those with a mapped field that differs are written, with their price
+    changes logged to PriceHistory in the same transaction.
+
+    An importer remembers the valid SKUs it has seen, so when the chunks of
+    a file are run through one importer in file order, a duplicate SKU is
+    caught in whichever chunk it appears.
+    """
+
+    def __init__(self, column_mapping, batch_size=DEFAULT_BATCH_SIZE, user=None, reason='Product import'):
+        self.column_mapping = column_mapping
+        self.batch_size = batch_size
+        self.user = user
+        self.reason = reason
+        self.seen_skus = set()
+
+    def run(self, df):
+        started = time.monotonic()
+        result = ImportResult()
+
+        data, errors = self.prepare(df)
+        valid = data.drop(index=list(errors))
+
+        for start in range(0, len(valid), self.batch_size):
+            self.save_batch(valid.iloc[start:start + self.batch_size], errors, result)
+
+        # Report failures in file order
+        for label in data.index:
+            if label in errors:
+                result.add_error(label, errors[label])
+
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"Product import: {result.created} created, {result.updated} updated, "
+            f"{result.failed} failed in {elapsed:.2f}s "
+            f"({len(data) / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+        return result
+
+    def prepare(self, df):
+        """Map and validate a frame, returning (cleaned rows, errors by row label)"""
+        data = self.map_columns(df)
+        if 'sku' not in data:
+            raise ValueError("'sku' must be mapped to a column of the file")
+        errors = {}
+        return self.clean(data, errors), errors
+
+    def map_columns(self, df):
+        """Build a frame keyed by model field names from the mapped file columns"""
+        known_fields = set(TEXT_FIELDS) | set(PRICE_FIELDS) | set(BOOLEAN_FIELDS) | set(REFERENCE_FIELDS)
+        columns = {
+            model_field: df[file_column]
+            for model_field, file_column in self.column_mapping.items()
+            if model_field in known_fields and file_column in df.columns
+        }
+        return pd.DataFrame(columns, index=df.index)
+
+    def clean(self, data, errors):
+        """Validate and convert every mapped column, recording failures per row label"""
+        cleaned = pd.DataFrame(index=data.index)
+
+        for field, max_length in TEXT_FIELDS.items():
+            if field not in data:
+                continue
+            text = data[field].map(to_text, na_action='ignore')
+            if field in NON_BLANK_FIELDS:
+                self.flag(errors, text.isna(), field, 'This field may not be null.')
+                self.flag(errors, text.notna() & (text == ''), field, 'This field may not be blank.')
+            else:
+                text = text.fillna('')
+            if max_length:
+                self.flag(
+                    errors, text.str.len() > max_length, field,
+                    f'Ensure this field has no more than {max_length} characters.'
+                )
+            cleaned[field] = text
+
+        for field in PRICE_FIELDS:
+            if field not in data:
+                continue
+            numbers = pd.to_numeric(data[field], errors='coerce')
+            self.flag(errors, data[field].notna() & numbers.isna(), field, 'A valid number is required.')
+            self.flag(
+                errors, numbers.abs() > MAX_PRICE, field,
+                'Ensure that there are no more than 10 digits in total.'
+            )
+            if field == 'unit_price':
+                self.flag(errors, data[field].isna(), field, 'This field may not be null.')
+            cleaned[field] = numbers.round(2).map(_to_price, na_action='ignore')
+
+        for field in BOOLEAN_FIELDS:
+            if field not in data:
+                continue
+            text = data[field].map(lambda v: str(v).strip().lower(), na_action='ignore')
+            flags = pd.Series(pd.NA, index=data.index, dtype=object)
+            flags[text.isin(TRUE_VALUES)] = True
+            flags[text.isin(FALSE_VALUES)] = False
+            self.flag(errors, text.notna() & flags.isna(), field, 'Must be a valid boolean.')
+            cleaned[field] = flags
+
+        for field, model in REFERENCE_FIELDS.items():
+            if field not in data:
+                continue
+            keys = data[field].map(to_text, na_action='ignore')
+            lookup = self.resolve_references(model, keys.dropna().unique())
+            resolved = keys.map(lookup, na_action='ignore').astype('Int64')
+            self.flag(
+                errors, keys.notna() & resolved.isna(), field,
+                'Invalid pk or name - object does not exist.'
+            )
+            if field == 'supplier':
+                self.flag(errors, keys.isna(), field, 'This field may not be null.')
+            cleaned[field] = resolved
+
+        # Only the first valid occurrence of a SKU is imported, also across chunks
+        if 'sku' in cleaned:
+            valid_skus = cleaned['sku'].drop(index=list(errors))
+            self.flag(
+                errors, valid_skus.duplicated(keep='first') | valid_skus.isin(self.seen_skus),
+                'sku', 'Duplicate SKU in file.'
+            )
+            self.seen_skus.update(valid_skus)
+
+        return cleaned
+
+    def resolve_references(self, model, keys):
+        """Map id-or-name keys to primary keys with a single query"""
+        ids = [int(key) for key in keys if key.isdigit()]
+        names = [key for key in keys if not key.isdigit()]
+        lookup = {}
+        for pk, name in model.objects.filter(Q(pk__in=ids) | Q(name__in=names)).values_list('pk', 'name'):
+            lookup[str(pk)] = pk
+            lookup.setdefault(name, pk)
+        return lookup
+
+    def save_batch(self, batch, errors, result):
+        """Insert new SKUs and update existing ones for one batch inside a transaction"""
+        fields = list(batch.columns)
+        rows = batch.to_dict('index')
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        history = []
+        unchanged = 0
+
+        try:
+            with transaction.atomic():
+                # Lock existing products in id order so concurrent shards touching the
+                # same SKUs wait for each other instead of deadlocking
+                existing = {
+                    product.sku: product
+                    for product in Product.objects.select_for_update()
+                    .filter(sku__in=list(batch['sku'])).order_by('id')
+                }
+                for label, row in rows.items():
+                    values = {
+                        field: value for field, value in row.items()
+                        if value is not None and not pd.isna(value)
+                    }
+                    product = existing.get(row['sku'])
+                    if product is None:
+                        missing = [field for field in REQUIRED_FOR_CREATE if field not in values]
+                        if missing:
+                            errors[label] = {field: ['This field is required.'] for field in missing}
+                            continue
+                        to_create.append((Product(**self.with_foreign_keys(values)), frozenset(values)))
+                    else:
+                        # Rows matching the locked product in every mapped field cost no write
+                        changes = {
+                            field: value for field, value in self.with_foreign_keys(values).items()
+                            if getattr(product, field) != value
+                        }
+                        if not changes:
+                            unchanged += 1
+                            continue
+                        history.extend(price_changes(product, values, self.user, self.reason))
+                        for field, value in changes.items():
+                            setattr(product, field, value)
+                        product.updated_at = now
+                        to_update.append(product)
+
+                # Existing rows go through INSERT ... ON CONFLICT (sku) DO UPDATE, which is far
+                # cheaper to build than bulk_update's CASE expressions; they carry their stored
+                # values for the fields a row leaves empty
+                self.upsert(to_update, [field for field in fields if field != 'sku'])
+                # New rows are upserted too, absorbing SKUs inserted concurrently since the
+                # lookup above. Their empty fields hold model defaults, not stored values, so
+                # each group of rows only updates the fields it has values for
+                groups = {}
+                for product, present in to_create:
+                    groups.setdefault(present, []).append(product)
+                for present, products in groups.items():
+                    self.upsert(products, [field for field in fields if field in present and field != 'sku'])
+                PriceHistory.objects.bulk_create(history, batch_size=self.batch_size)
+                if to_create or to_update:
+                    bump_version(PRODUCTS, LOOKUPS)
+        except DatabaseError as e:
+            logger.error(f"Product import batch failed: {str(e)}")
+            for label in rows:
+                errors.setdefault(label, {'non_field_errors': [str(e)]})
+            return
+
+        result.created += len(to_create)
+        result.updated += len(to_update)
+        result.unchanged += unchanged
+        result.processed += len(to_create) + len(to_update) + unchanged
+
+    def upsert(self, products, fields):
+        """Insert products by SKU, updating the given mapped fields of the SKUs that already exist"""
+        Product.objects.bulk_create(
+            sorted(products, key=lambda product: product.sku),
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=[f'{field}_id' if field in REFERENCE_FIELDS else field for field in fields] + ['updated_at']
+        )
+
+    @staticmethod
+    def with_foreign_keys(values):
+        return {
+            f'{field}_id' if field in REFERENCE_FIELDS else field: value
+            for field, value in values.items()
+        }
+
+    @staticmethod
+    def flag(errors, mask, field, message):
+        for label in mask[mask.fillna(False).astype(bool)].index:
+            errors.setdefault(label, {}).setdefault(field, []).append(message)
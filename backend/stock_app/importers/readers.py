@@ -0,0 +1,263 @@
+import gzip
+import pickle
+
+import pandas as pd
+from django.conf import settings
+
+# Accepted import files. CSV may be gzip or zstd compressed; Parquet has no header row
+SUPPORTED_EXTENSIONS = ('.csv', '.csv.gz', '.csv.zst', '.parquet', '.xlsx', '.xls')
+
+
+def get_chunk_size():
+    return getattr(settings, 'IMPORT_CHUNK_SIZE', 5000)
+
+
+def file_format(file_name):
+    """Return 'csv', 'parquet', 'xlsx' or 'xls' for a supported file name, else None"""
+    name = file_name.lower()
+    if name.endswith(('.csv', '.csv.gz', '.csv.zst')):
+        return 'csv'
+    if name.endswith('.parquet'):
+        return 'parquet'
+    if name.endswith('.xlsx'):
+        return 'xlsx'
+    if name.endswith('.xls'):
+        return 'xls'
+    return None
+
+
+def csv_compression(file_name):
+    name = file_name.lower()
+    if name.endswith('.gz'):
+        return 'gzip'
+    if name.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def iter_file_chunks(file_path, chunk_size=None, skip_rows=0, header_row=0, columns=None):
+    """
+    Yield the data rows of a CSV/Parquet/Excel file as DataFrames of at
+    most chunk_size rows, so memory use is bounded by the chunk rather than
+    the file. Rows are indexed from the first line after header_row; the
+    first skip_rows data rows are skipped, which is how an interrupted
+    upload resumes from its checkpoint. When columns is given only those
+    columns are read (missing ones are ignored).
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    fmt = file_format(file_path)
+    if fmt == 'csv':
+        return _iter_csv_chunks(file_path, chunk_size, skip_rows, header_row, columns, csv_compression(file_path))
+    if fmt == 'parquet':
+        return _iter_parquet_chunks(file_path, chunk_size, skip_rows, columns)
+    if fmt == 'xls':
+        # Legacy .xls has no streaming reader, fall back to loading it whole
+        df = pd.read_excel(file_path, skiprows=header_row, usecols=_column_filter(columns))
+        return _iter_frame_chunks(df, chunk_size, skip_rows)
+    return _iter_excel_chunks(file_path, chunk_size, skip_rows, header_row, columns)
+
+
+def iter_csv_stream(stream, file_name, chunk_size=None, header_row=0, columns=None):
+    """
+    Yield the data rows of a CSV read from a binary stream (possibly gzip
+    or zstd compressed, as told by file_name) in chunks as the bytes
+    arrive, indexed like iter_file_chunks.
+    """
+    return _iter_csv_chunks(stream, chunk_size or get_chunk_size(), 0, header_row, columns, csv_compression(file_name))
+
+
+def append_chunk(file, chunk):
+    """Append a DataFrame to a chunk file opened for binary writing, keeping its index and dtypes"""
+    pickle.dump(chunk, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def iter_chunk_file(file_path, skip_rows=0):
+    """
+    Yield the DataFrames of a chunk file written with append_chunk, without
+    their rows indexed below skip_rows. Chunk files are written by the
+    import tasks themselves, never uploaded.
+    """
+    with open(file_path, 'rb') as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            if len(chunk) and chunk.index[-1] >= skip_rows:
+                yield chunk[chunk.index >= skip_rows]
+
+
+def read_frame(file, header_row=0, columns=None):
+    """Read a whole uploaded file (path or file object with a name) into a DataFrame"""
+    name = file if isinstance(file, str) else file.name
+    fmt = file_format(name)
+    if fmt == 'csv':
+        return pd.read_csv(
+            binary_source(file),
+            skiprows=header_row,
+            usecols=_column_filter(columns),
+            compression=csv_compression(name),
+            encoding='utf-8'
+        )
+    if fmt == 'parquet':
+        return pd.read_parquet(file, columns=_parquet_columns(file, columns))
+    return pd.read_excel(file, skiprows=header_row, usecols=_column_filter(columns))
+
+
+def count_data_rows(file_path, header_row=0):
+    """Cheaply estimate the number of data rows, used for progress reporting"""
+    fmt = file_format(file_path)
+    if fmt == 'csv':
+        lines = 0
+        with open_binary(file_path) as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                lines += block.count(b'\n')
+        return max(lines - header_row - 1, 0)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(file_path).metadata.num_rows
+    if fmt == 'xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True)
+        try:
+            return max((workbook.active.max_row or 0) - header_row - 1, 0)
+        finally:
+            workbook.close()
+    return None
+
+
+def binary_source(file):
+    """
+    The raw binary stream of an uploaded file: pandas only decompresses
+    streams it recognises as binary, which Django's upload wrappers are not.
+    """
+    if isinstance(file, str):
+        return file
+    return getattr(file, 'file', file)
+
+
+def open_binary(file_path):
+    """Open a possibly compressed file for reading its decompressed bytes"""
+    compression = csv_compression(file_path)
+    if compression == 'gzip':
+        return gzip.open(file_path, 'rb')
+    if compression == 'zstd':
+        import zstandard
+
+        return zstandard.open(file_path, 'rb')
+    return open(file_path, 'rb')
+
+
+def _column_filter(columns):
+    # A callable lets pandas skip the unmapped columns without failing on absent ones
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return lambda column: column in wanted
+
+
+def _parquet_columns(source, columns):
+    if columns is None:
+        return None
+    import pyarrow.parquet as pq
+
+    available = pq.ParquetFile(source).schema_arrow.names
+    if not isinstance(source, str):
+        source.seek(0)
+    return [column for column in available if column in set(columns)]
+
+
+def _iter_csv_chunks(source, chunk_size, skip_rows, header_row, columns, compression=None):
+    def skip(line):
+        return line < header_row or header_row < line <= header_row + skip_rows
+
+    reader = pd.read_csv(
+        source,
+        chunksize=chunk_size,
+        skiprows=skip if skip_rows or header_row else None,
+        usecols=_column_filter(columns),
+        compression=compression
+    )
+    with reader:
+        for chunk in reader:
+            chunk.index += skip_rows
+            yield chunk
+
+
+def _iter_parquet_chunks(file_path, chunk_size, skip_rows, columns):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(file_path)
+    metadata = parquet_file.metadata
+
+    # Skip whole row groups before the first wanted row without reading them
+    row_groups = []
+    position = None
+    start = 0
+    for index in range(metadata.num_row_groups):
+        end = start + metadata.row_group(index).num_rows
+        if end > skip_rows:
+            row_groups.append(index)
+            if position is None:
+                position = start
+        start = end
+    if not row_groups:
+        return
+
+    batches = parquet_file.iter_batches(
+        batch_size=chunk_size,
+        row_groups=row_groups,
+        columns=_parquet_columns(file_path, columns)
+    )
+    for batch in batches:
+        chunk = batch.to_pandas()
+        chunk.index = range(position, position + len(chunk))
+        position += len(chunk)
+        if position <= skip_rows:
+            continue
+        yield chunk[chunk.index >= skip_rows]
+
+
+def _iter_excel_chunks(file_path, chunk_size, skip_rows, header_row, columns):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(min_row=header_row + 1, values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns_read = [str(value) if value is not None else f'Unnamed: {i}' for i, value in enumerate(header)]
+
+        position = 0
+        buffer = []
+        for row in rows:
+            if position >= skip_rows:
+                buffer.append(row[:len(columns_read)])
+            position += 1
+            if len(buffer) == chunk_size:
+                yield _frame(buffer, columns_read, position, columns)
+                buffer = []
+        if buffer:
+            yield _frame(buffer, columns_read, position, columns)
+    finally:
+        workbook.close()
+
+
+def _iter_frame_chunks(df, chunk_size, skip_rows):
+    for start in range(skip_rows, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def _frame(rows, columns, end, wanted=None):
+    # Index chunks by data row number, like pandas' chunked CSV reader
+    df = pd.DataFrame(
+        rows,
+        columns=columns,
+        index=range(end - len(rows), end)
+    )
+    if wanted is not None:
+        df = df[[column for column in columns if column in set(wanted)]]
+    return df.dropna(how='all')
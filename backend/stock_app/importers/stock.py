@@ -0,0 +1,133 @@
+import logging
+
+import pandas as pd
+from django.utils import timezone
+
+from ..models import Product, Stock, StockMovement
+from ..stock_levels import refresh_current_stock
+from .products import ImportResult, to_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCATION = 'Default'
+
+# Columns of a stock file, location is optional
+STOCK_COLUMNS = ['sku', 'quantity', 'location']
+
+# Unknown SKUs listed in the error report for a single chunk
+MAX_REPORTED_SKUS = 50
+
+
+def clean_stock_rows(df):
+    """
+    Validate (sku, quantity[, location]) rows column-wise.
+
+    Returns the valid rows as a frame with normalized sku/quantity/location
+    columns, and an ImportResult holding the rejected ones.
+    """
+    missing = [column for column in ('sku', 'quantity') if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    result = ImportResult()
+    skus = df['sku'].map(to_text, na_action='ignore')
+    quantities = pd.to_numeric(df['quantity'], errors='coerce')
+    if 'location' in df.columns:
+        locations = df['location'].map(to_text, na_action='ignore').fillna(DEFAULT_LOCATION)
+    else:
+        locations = pd.Series(DEFAULT_LOCATION, index=df.index)
+
+    invalid = skus.isna() | quantities.isna() | (quantities % 1 != 0)
+    for label in df.index[invalid]:
+        result.add_error(label, {'quantity': ['A valid integer is required.']}
+                         if pd.notna(skus[label]) else {'sku': ['This field may not be null.']})
+
+    valid = ~invalid
+    rows = pd.DataFrame({
+        'sku': skus[valid],
+        'quantity': quantities[valid].astype('int64'),
+        'location': locations[valid],
+    })
+    return rows, result
+
+
+def report_unknown_skus(result, skus, total):
+    """Count rows with unknown SKUs as failed and add a single summary line"""
+    result.failed += total
+    result.errors.append(
+        f"Unknown SKUs ({total} rows): {', '.join(skus[:MAX_REPORTED_SKUS])}"
+        f"{', ...' if len(skus) > MAX_REPORTED_SKUS else ''}"
+    )
+
+
+def apply_stock_chunk(df, reference_number, notes='Updated via file upload'):
+    """
+    Set stock quantities for one chunk of (sku, quantity[, location]) rows.
+
+    SKUs are resolved with one sku__in query, the matching Stock rows are
+    loaded at once, and writes go through bulk_update/bulk_create, so the
+    number of queries per chunk is constant regardless of its size. Must
+    run inside a transaction, as the matching products are row-locked.
+    """
+    rows, result = clean_stock_rows(df)
+    # Locking the products (in id order) makes concurrent shards updating the
+    # same SKUs take turns, so neither can create a duplicate stock record
+    product_ids = dict(
+        Product.objects.select_for_update()
+        .filter(sku__in=rows['sku'].unique().tolist())
+        .order_by('id')
+        .values_list('sku', 'id')
+    )
+    known = rows['sku'].isin(product_ids)
+    unknown = rows.loc[~known, 'sku']
+    if len(unknown):
+        report_unknown_skus(result, list(unknown.unique()), len(unknown))
+
+    rows = rows[known].assign(product_id=rows.loc[known, 'sku'].map(product_ids))
+    if rows.empty:
+        return result
+
+    # One stock record per product, as with update_or_create(product=...)
+    stocks = {}
+    for stock in Stock.objects.filter(product_id__in=rows['product_id'].unique().tolist()).order_by('id'):
+        stocks.setdefault(stock.product_id, stock)
+
+    now = timezone.now()
+    to_create = {}
+    to_update = {}
+    movements = []
+    # Later rows for the same product win, as they did when applied one by one
+    for product_id, quantity, location in rows[['product_id', 'quantity', 'location']].itertuples(index=False):
+        stock = stocks.get(product_id) or to_create.get(product_id)
+        if stock is None:
+            to_create[product_id] = Stock(product_id=product_id, quantity=quantity, location=location)
+        else:
+            stock.quantity = quantity
+            stock.location = location
+            stock.last_checked = now
+            if stock.pk:
+                to_update[product_id] = stock
+
+        movements.append(StockMovement(
+            product_id=product_id,
+            movement_type='ADJUST',
+            quantity=quantity,
+            reference_number=reference_number,
+            notes=notes
+        ))
+
+    # Existing rows are upserted on their primary key: INSERT ... ON CONFLICT (id) DO UPDATE
+    # is much cheaper to build than bulk_update's per-row CASE expressions
+    Stock.objects.bulk_create(
+        sorted([*to_create.values(), *to_update.values()], key=lambda stock: stock.product_id),
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=['quantity', 'location', 'last_checked']
+    )
+    StockMovement.objects.bulk_create(movements)
+    refresh_current_stock(rows['product_id'].unique().tolist())
+
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    result.processed = len(rows)
+    return result
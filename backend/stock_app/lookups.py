@@ -0,0 +1,168 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django_redis import get_redis_connection
+from redis.exceptions import WatchError
+
+from .models import Product
+from .versions import LOOKUPS, bump_version, data_version, data_versions, version_key
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the lookups of some codes are forgotten: the in-process
+# caches, which cannot be told which codes changed, then start over
+LOOKUP_CHANGES = 'product-lookup-changes'
+
+# Product fields a lookup returns
+LOOKUP_FIELDS = ['id', 'sku', 'barcode', 'name', 'unit_price', 'current_stock', 'is_active']
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _entry_key(version, code):
+    return f'product-lookup:{version}:{code}'
+
+
+class LocalLookupCache:
+    """
+    Least recently used lookups of this process. Entries belong to a stamp
+    (the LOOKUPS and LOOKUP_CHANGES versions) and are dropped as soon as a
+    request sees a newer one.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.stamp = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, stamp, codes):
+        with self.lock:
+            if stamp != self.stamp:
+                self.entries.clear()
+                self.stamp = stamp
+                return {}
+            found = {}
+            for code in codes:
+                if code in self.entries:
+                    self.entries.move_to_end(code)
+                    found[code] = self.entries[code]
+            return found
+
+    def set_many(self, stamp, results):
+        with self.lock:
+            if stamp != self.stamp:
+                return
+            for code, product in results.items():
+                self.entries[code] = product
+                self.entries.move_to_end(code)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+_local = LocalLookupCache(settings.LOOKUP_LOCAL_SIZE)
+
+
+def lookup_products(codes):
+    """
+    The product (LOOKUP_FIELDS) for each code, None for unknown codes. A
+    code is a SKU, or else a barcode; a barcode shared by several products
+    resolves to the oldest one.
+
+    Codes are answered from this process's LRU, then from Redis (one MGET
+    for all of them), and only the rest from the database, whose answers,
+    unknown codes included, are cached in both. Without Redis every lookup
+    goes to the database.
+    """
+    codes = list(dict.fromkeys(codes))
+    stamp = data_versions(LOOKUPS, LOOKUP_CHANGES)
+    if stamp is None:
+        return _from_database(codes)
+    stamp = tuple(stamp)
+
+    found = _local.get_many(stamp, codes)
+    missing = [code for code in codes if code not in found]
+    if missing:
+        fetched = _from_redis(stamp, missing)
+        missing = [code for code in missing if code not in fetched]
+        if missing:
+            loaded = _from_database(missing)
+            _store(stamp, loaded)
+            fetched.update(loaded)
+        _local.set_many(stamp, fetched)
+        found.update(fetched)
+    return {code: found[code] for code in codes}
+
+
+def _from_database(codes):
+    results = dict.fromkeys(codes)
+    rows = list(
+        Product.objects.filter(Q(sku__in=codes) | Q(barcode__in=codes))
+        .order_by('id').values(*LOOKUP_FIELDS)
+    )
+    for row in rows:
+        row['unit_price'] = str(row['unit_price'])
+    for row in reversed(rows):
+        if row['barcode'] in results:
+            results[row['barcode']] = row
+    # SKUs are unique and win over barcodes
+    for row in rows:
+        if row['sku'] in results:
+            results[row['sku']] = row
+    return results
+
+
+def _from_redis(stamp, codes):
+    try:
+        values = _redis().mget([_entry_key(stamp[0], code) for code in codes])
+    except Exception as e:
+        logger.warning(f"Could not read cached lookups: {str(e)}")
+        return {}
+    return {code: json.loads(value) for code, value in zip(codes, values) if value is not None}
+
+
+def _store(stamp, results):
+    """
+    Cache database answers in Redis, unless codes were forgotten since the
+    stamp was read: the answers may then predate that change.
+    """
+    version, changes = stamp
+    try:
+        with _redis().pipeline() as pipe:
+            pipe.watch(version_key(LOOKUP_CHANGES))
+            if int(pipe.get(version_key(LOOKUP_CHANGES)) or 0) != changes:
+                return
+            pipe.multi()
+            for code, product in results.items():
+                pipe.set(_entry_key(version, code), json.dumps(product), ex=settings.LOOKUP_CACHE_TIMEOUT)
+            pipe.execute()
+    except WatchError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not cache lookups: {str(e)}")
+
+
+def forget_codes(codes):
+    """Drop the cached lookups of these SKUs/barcodes once the current transaction commits"""
+    codes = sorted({code for code in codes if code})
+    if not codes:
+        return
+
+    def forget():
+        version = data_version(LOOKUPS)
+        if version is None:
+            return
+        try:
+            _redis().delete(*[_entry_key(version, code) for code in codes])
+        except Exception as e:
+            logger.error(f"Could not forget cached lookups, they may be stale: {str(e)}")
+        bump_version(LOOKUP_CHANGES)
+
+    transaction.on_commit(forget)
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from stock_app.importers import ProductImporter, ProductCopyIngester, iter_file_chunks
+from stock_app.models import Product, Supplier
+
+SKU_PREFIX = 'BENCH-'
+
+COLUMN_MAPPING = {
+    'name': 'Name',
+    'sku': 'SKU',
+    'description': 'Description',
+    'barcode': 'Barcode',
+    'unit_price': 'Price',
+    'purchase_price': 'Cost',
+    'supplier': 'Supplier',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare the ORM and COPY product ingestion paths on a generated catalog file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--mode', choices=['both', 'orm', 'copy'], default='both')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark products afterwards')
+
+    def handle(self, *args, **options):
+        supplier, _ = Supplier.objects.get_or_create(
+            name='Benchmark Supplier',
+            defaults={'email': 'benchmark@example.com', 'phone': '0', 'address': '-'}
+        )
+        file_path = self.generate_file(options['rows'], supplier.name)
+        modes = ['orm', 'copy'] if options['mode'] == 'both' else [options['mode']]
+
+        try:
+            for mode in modes:
+                # Each mode starts from an empty catalog (insert run), then re-imports (update run)
+                self.delete_products()
+                for run in ('insert', 'update'):
+                    elapsed, result = self.run_import(mode, file_path, options['chunk_size'])
+                    self.stdout.write(
+                        f"{mode.upper():<5} {run:<7} {options['rows']:>9} rows in {elapsed:8.2f}s "
+                        f"= {options['rows'] / elapsed:>9.0f} rows/s "
+                        f"(inserted {result.created}, updated {result.updated}, rejected {result.failed})"
+                    )
+        finally:
+            os.remove(file_path)
+            if not options['keep']:
+                self.delete_products()
+
+    def generate_file(self, rows, supplier_name):
+        self.stdout.write(f"Generating {rows} rows...")
+        rng = np.random.default_rng(42)
+        ids = np.arange(rows)
+        df = pd.DataFrame({
+            'Name': pd.Series(ids).map(lambda i: f'Benchmark product {i}'),
+            'SKU': pd.Series(ids).map(lambda i: f'{SKU_PREFIX}{i:08d}'),
+            'Description': 'Generated by benchmark_import',
+            'Barcode': pd.Series(ids).map(lambda i: f'{i:013d}'),
+            'Price': rng.uniform(1, 1000, rows).round(2),
+            'Cost': rng.uniform(1, 500, rows).round(2),
+            'Supplier': supplier_name,
+        })
+        handle, file_path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        df.to_csv(file_path, index=False)
+        return file_path
+
+    def run_import(self, mode, file_path, chunk_size):
+        started = time.monotonic()
+        chunks = iter_file_chunks(file_path, chunk_size)
+        if mode == 'copy':
+            result = ProductCopyIngester(COLUMN_MAPPING).run(chunks)
+        else:
+            importer = ProductImporter(COLUMN_MAPPING)
+            result = None
+            for chunk in chunks:
+                chunk_result = importer.run(chunk)
+                if result is None:
+                    result = chunk_result
+                else:
+                    result.created += chunk_result.created
+                    result.updated += chunk_result.updated
+                    result.failed += chunk_result.failed
+        return time.monotonic() - started, result
+
+    def delete_products(self):
+        # A raw DELETE avoids loading a million rows into the deletion collector
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {Product._meta.db_table} WHERE sku LIKE %s',
+                [f'{SKU_PREFIX}%']
+            )
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock_app", "0002_brand_importconfiguration_webscraperconfig_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="checkpoint_row",
+            field=models.IntegerField(default=0),
+        ),
+    ]
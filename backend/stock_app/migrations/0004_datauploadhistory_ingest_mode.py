@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock_app", "0003_datauploadhistory_checkpoint_row"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="ingest_mode",
+            field=models.CharField(
+                choices=[("ORM", "Batched ORM"), ("COPY", "PostgreSQL COPY staging")],
+                default="ORM",
+                max_length=4,
+            ),
+        ),
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="records_inserted",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="records_updated",
+            field=models.IntegerField(default=0),
+        ),
+    ]
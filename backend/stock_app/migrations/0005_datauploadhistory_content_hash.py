@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock_app", "0004_datauploadhistory_ingest_mode"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="duplicate_of",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="duplicates",
+                to="stock_app.datauploadhistory",
+            ),
+        ),
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="import_options",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock_app", "0005_datauploadhistory_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="import_configuration",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="uploads",
+                to="stock_app.importconfiguration",
+            ),
+        ),
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="records_removed",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="importconfiguration",
+            name="column_mapping",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name="ImportFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sku", models.CharField(max_length=50)),
+                ("row_hash", models.BigIntegerField()),
+                (
+                    "configuration",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fingerprints",
+                        to="stock_app.importconfiguration",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("configuration", "sku")},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock_app", "0006_importfingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importconfiguration",
+            name="remote_manifest",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock_app", "0007_importconfiguration_remote_manifest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importconfiguration",
+            name="next_run",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="webscraperconfig",
+            name="next_run",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
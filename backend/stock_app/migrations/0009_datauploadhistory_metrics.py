@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock_app", "0008_schedule_next_run"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="metrics",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+
+def fill_current_stock(apps, schema_editor):
+    Product = apps.get_model("stock_app", "Product")
+    Stock = apps.get_model("stock_app", "Stock")
+    totals = (
+        Stock.objects.filter(product=models.OuterRef("pk"))
+        .values("product")
+        .annotate(total=models.Sum("quantity"))
+        .values("total")
+    )
+    Product.objects.filter(id__in=Stock.objects.values("product_id")).update(
+        current_stock=models.Subquery(totals)
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock_app", "0009_datauploadhistory_metrics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="current_stock",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_current_stock, migrations.RunPython.noop),
+    ]
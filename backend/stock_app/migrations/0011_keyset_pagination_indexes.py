@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The movement and price history tables are large: build the indexes without blocking writes
+    atomic = False
+
+    dependencies = [
+        ("stock_app", "0010_product_current_stock"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="datauploadhistory",
+            index=models.Index(
+                fields=["upload_date", "id"], name="datauploadhistory_date_id_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pricehistory",
+            index=models.Index(
+                fields=["changed_at", "id"], name="pricehistory_changed_id_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pricehistory",
+            index=models.Index(
+                fields=["product", "changed_at", "id"], name="pricehistory_product_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="stockmovement",
+            index=models.Index(
+                fields=["timestamp", "id"], name="stockmovement_time_id_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="stockmovement",
+            index=models.Index(
+                fields=["product", "timestamp", "id"], name="stockmovement_product_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:25
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    # The product table is large: build the indexes without blocking writes
+    atomic = False
+
+    dependencies = [
+        ("stock_app", "0012_exportjob"),
+    ]
+
+    operations = [
+        # database/init.sql creates it already, this covers databases set up without it
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(fields=["barcode"], name="product_barcode_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+                ),
+                name="product_name_trgm_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("description"),
+                    name="gin_trgm_ops",
+                ),
+                name="product_description_trgm_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("sku"), name="gin_trgm_ops"
+                ),
+                name="product_sku_trgm_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("barcode"),
+                    name="gin_trgm_ops",
+                ),
+                name="product_barcode_trgm_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock_app", "0014_notification_unread_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datauploadhistory",
+            name="stored_file",
+            field=models.CharField(blank=True, max_length=300),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stock_app", "0015_datauploadhistory_stored_file"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.IntegerField()),
+                ("checkpoint_row", models.IntegerField(default=0)),
+                ("records_processed", models.IntegerField(default=0)),
+                ("records_failed", models.IntegerField(default=0)),
+                ("records_inserted", models.IntegerField(default=0)),
+                ("records_updated", models.IntegerField(default=0)),
+                ("error_message", models.TextField(blank=True)),
+                ("error", models.TextField(blank=True)),
+                ("completed", models.BooleanField(default=False)),
+                (
+                    "upload",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shards",
+                        to="stock_app.datauploadhistory",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("upload", "index")},
+            },
+        ),
+    ]
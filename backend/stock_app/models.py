@@ -1,5 +1,23 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex, OpClass
+
+from .versions import BRANDS, CATEGORIES, PRODUCTS, SUPPLIERS, VersionedQuerySet
+
+
+# Bulk writes bump the data set versions cached responses are keyed on
+class CategoryQuerySet(VersionedQuerySet):
+    data_set = CATEGORIES
+
+class BrandQuerySet(VersionedQuerySet):
+    data_set = BRANDS
+
+class SupplierQuerySet(VersionedQuerySet):
+    data_set = SUPPLIERS
+
+class ProductDataQuerySet(VersionedQuerySet):
+    data_set = PRODUCTS
 
 class Category(models.Model):
     name = models.CharField(max_length=200)
@@ -8,6 +26,8 @@ class Category(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -21,6 +41,8 @@ class Brand(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BrandQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -35,6 +57,8 @@ class Supplier(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SupplierQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -49,12 +73,35 @@ class Product(models.Model):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)  # Added default value
     is_active = models.BooleanField(default=True)  # Added active status
+    current_stock = models.IntegerField(default=0, editable=False)  # Sum of stock_records quantities, see stock_levels
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductDataQuerySet.as_manager()
+
+    class Meta:
+        # Exact barcode lookups and trigram search, see search.TrigramSearchFilter.
+        # The trigram indexes are on UPPER(column), the expression icontains compares.
+        indexes = [
+            models.Index(fields=['barcode'], name='product_barcode_idx'),
+        ] + [
+            GinIndex(OpClass(Upper(field), name='gin_trgm_ops'), name=f'product_{field}_trgm_idx')
+            for field in ('name', 'description', 'sku', 'barcode')
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
+    def save(self, *args, **kwargs):
+        # current_stock is maintained from the stock records; saving a product
+        # loaded earlier must not overwrite a total that changed since
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'current_stock'
+            ]
+        super().save(*args, **kwargs)
+
 class PriceHistory(models.Model):
     PRICE_TYPES = [
         ('PURCHASE', 'Purchase Price'),
@@ -69,9 +116,18 @@ class PriceHistory(models.Model):
     changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     reason = models.TextField(blank=True)
 
+    objects = ProductDataQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.product.name} - {self.price_type} change"
 
+    class Meta:
+        # Keyset pagination order, see pagination.PriceHistoryPagination
+        indexes = [
+            models.Index(fields=['changed_at', 'id'], name='pricehistory_changed_id_idx'),
+            models.Index(fields=['product', 'changed_at', 'id'], name='pricehistory_product_idx'),
+        ]
+
 class Stock(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_records')
     quantity = models.IntegerField()
@@ -80,6 +136,8 @@ class Stock(models.Model):
     minimum_threshold = models.IntegerField(default=10)
     maximum_threshold = models.IntegerField(default=100)
 
+    objects = ProductDataQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.product.name} - {self.quantity} units"
 
@@ -98,9 +156,18 @@ class StockMovement(models.Model):
     performed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     notes = models.TextField(blank=True)
 
+    objects = ProductDataQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.get_movement_type_display()} - {self.product.name} ({self.quantity})"
 
+    class Meta:
+        # Keyset pagination order, see pagination.StockMovementPagination
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='stockmovement_time_id_idx'),
+            models.Index(fields=['product', 'timestamp', 'id'], name='stockmovement_product_idx'),
+        ]
+
 class ImportConfiguration(models.Model):
     IMPORT_TYPES = [
         ('FTP', 'FTP'),
@@ -117,13 +184,28 @@ class ImportConfiguration(models.Model):
     remote_path = models.CharField(max_length=255, blank=True)
     is_active = models.BooleanField(default=True)
     schedule = models.CharField(max_length=100, blank=True)  # Cron expression
+    column_mapping = models.JSONField(default=dict, blank=True)  # Product field -> feed column
+    remote_manifest = models.JSONField(default=dict, blank=True)  # Remote file name -> size, mtime, checksum consumed
     last_run = models.DateTimeField(null=True, blank=True)
+    next_run = models.DateTimeField(null=True, blank=True)  # Next due time of the schedule
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.get_import_type_display()})"
 
+class ImportFingerprint(models.Model):
+    """Hash of the mapped fields of one feed row, as applied by the last run of a configuration"""
+    configuration = models.ForeignKey(ImportConfiguration, on_delete=models.CASCADE, related_name='fingerprints')
+    sku = models.CharField(max_length=50)
+    row_hash = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ['configuration', 'sku']
+
+    def __str__(self):
+        return f"{self.configuration_id}:{self.sku}"
+
 class WebScraperConfig(models.Model):
     name = models.CharField(max_length=200)
     url = models.URLField()
@@ -131,6 +213,7 @@ class WebScraperConfig(models.Model):
     schedule = models.CharField(max_length=100, blank=True)  # Cron expression
     is_active = models.BooleanField(default=True)
     last_run = models.DateTimeField(null=True, blank=True)
+    next_run = models.DateTimeField(null=True, blank=True)  # Next due time of the schedule
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -152,18 +235,61 @@ class DataUploadHistory(models.Model):
         ('FAILED', 'Failed'),
     ]
 
+    INGEST_MODES = [
+        ('ORM', 'Batched ORM'),
+        ('COPY', 'PostgreSQL COPY staging'),
+    ]
+
     upload_type = models.CharField(max_length=10, choices=UPLOAD_TYPES)
     file_name = models.CharField(max_length=255, null=True, blank=True)
+    stored_file = models.CharField(max_length=300, blank=True)  # Path of the uploaded file under UPLOAD_DIR
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     upload_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    ingest_mode = models.CharField(max_length=4, choices=INGEST_MODES, default='ORM')
     records_processed = models.IntegerField(default=0)
     records_failed = models.IntegerField(default=0)
+    records_inserted = models.IntegerField(default=0)
+    records_updated = models.IntegerField(default=0)
+    records_removed = models.IntegerField(default=0)
+    checkpoint_row = models.IntegerField(default=0)  # Data rows committed so far, used to resume
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # SHA-256 of the uploaded file
+    import_options = models.JSONField(default=dict, blank=True)  # What the file was imported as
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
+    import_configuration = models.ForeignKey(
+        ImportConfiguration, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploads'
+    )
+    metrics = models.JSONField(default=dict, blank=True)  # Run statistics, e.g. pages/sec and latencies of a scrape
     error_message = models.TextField(blank=True)
 
     def __str__(self):
         return f"{self.get_upload_type_display()} - {self.upload_date}"
 
+    class Meta:
+        # Keyset pagination order, see pagination.UploadHistoryPagination
+        indexes = [
+            models.Index(fields=['upload_date', 'id'], name='datauploadhistory_date_id_idx'),
+        ]
+
+class UploadShard(models.Model):
+    """Progress of one parallel shard of a large upload, committed with each of its chunks"""
+    upload = models.ForeignKey(DataUploadHistory, on_delete=models.CASCADE, related_name='shards')
+    index = models.IntegerField()
+    checkpoint_row = models.IntegerField(default=0)  # File rows read and committed so far, used to resume
+    records_processed = models.IntegerField(default=0)
+    records_failed = models.IntegerField(default=0)
+    records_inserted = models.IntegerField(default=0)
+    records_updated = models.IntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    error = models.TextField(blank=True)  # Why the shard stopped before the end of the file
+    completed = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ['upload', 'index']
+
+    def __str__(self):
+        return f"{self.upload_id}:{self.index}"
+
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
         ('STOCK_LOW', 'Low Stock Alert'),
@@ -179,5 +305,44 @@ class Notification(models.Model):
     read = models.BooleanField(default=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
 
+    class Meta:
+        # The unread alerts of a user, newest first, read on every dashboard load
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at'], condition=models.Q(read=False), name='notification_unread_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"{self.get_type_display()} - {self.created_at}"
+
+class ExportJob(models.Model):
+    EXPORT_FORMATS = [
+        ('csv', 'CSV'),
+        ('csv.gz', 'Gzipped CSV'),
+        ('ndjson', 'NDJSON'),
+        ('xlsx', 'Excel'),
+    ]
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+
+    export_format = models.CharField(max_length=10, choices=EXPORT_FORMATS, default='csv.gz')
+    filters = models.JSONField(default=dict, blank=True)  # Product list query params, e.g. {"search": "...", "supplier": "3"}
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    signature = models.CharField(max_length=64, db_index=True)  # SHA-256 of format, filters and product data version
+    rows_total = models.IntegerField(default=0)
+    rows_written = models.IntegerField(default=0)
+    file_name = models.CharField(max_length=255, blank=True)  # Relative to the export directory
+    file_size = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Export {self.id} ({self.export_format}) - {self.status}"
@@ -0,0 +1,161 @@
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on a composite key such as (timestamp, id).
+
+    The cursor holds the key of the last row of the page, and the next page
+    is read with WHERE key < cursor ORDER BY key LIMIT page_size + 1, which
+    an index on the key answers without counting or skipping rows: page
+    5,000 costs the same as page 1. Unlike DRF's CursorPagination the whole
+    key is compared, so rows sharing a timestamp need no offset. The last
+    ordering field must be unique. A queryset already ordered on a key
+    ending in the id, such as search results ordered by rank, is paged in
+    its own order.
+
+    The total count is only computed when asked for with ?count=true.
+    """
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor.reverse)
+        key = self.key_ordering(queryset)
+        fields = [field.lstrip('-') for field in key]
+
+        self.count = queryset.count() if self.count_requested(request) else None
+
+        ordering = [self.invert(field) for field in key] if reverse else list(key)
+        queryset = queryset.order_by(*ordering)
+        if cursor and cursor.position is not None:
+            queryset = queryset.filter(self.after(ordering, self.decode_position(queryset, fields, cursor)))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Coming back from a later page there is always a next one, and vice versa
+        self.has_next = has_more if not reverse else cursor is not None
+        self.has_previous = has_more if reverse else bool(cursor and cursor.position is not None)
+        self.first_key = self.key_of(rows[0], fields) if rows else None
+        self.last_key = self.key_of(rows[-1], fields) if rows else None
+        return rows
+
+    def key_ordering(self, queryset):
+        ordering = tuple(queryset.query.order_by)
+        if ordering and all(isinstance(field, str) for field in ordering) and ordering[-1].lstrip('-') in ('id', 'pk'):
+            return ordering
+        return self.ordering
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def after(ordering, values):
+        """
+        Q for the rows strictly after a key in the given ordering. The leading
+        bound on the first field is redundant but gives the database an index
+        range to start the scan from.
+        """
+        condition = Q()
+        for position, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {ordering[i].lstrip('-'): values[i] for i in range(position)}
+            condition |= Q(**equal, **{f'{name}__{lookup}': values[position]})
+        first = ordering[0]
+        bound = {f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": values[0]}
+        return Q(**bound) & condition
+
+    @staticmethod
+    def key_of(row, fields):
+        # str() keeps the microseconds of timestamps, which DjangoJSONEncoder would cut
+        return json.dumps([getattr(row, field) for field in fields], default=str)
+
+    def decode_position(self, queryset, fields, cursor):
+        try:
+            values = json.loads(cursor.position)
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [self.key_field(queryset, field).to_python(value) for field, value in zip(fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def key_field(queryset, name):
+        # Key fields are model fields or annotations, such as a search rank
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_key is None:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.last_key))
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_key is None:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.first_key))
+
+    def get_paginated_response(self, data):
+        items = [('next', self.get_next_link()), ('previous', self.get_previous_link())]
+        if self.count is not None:
+            items.append(('count', self.count))
+        items.append(('results', data))
+        return Response(OrderedDict(items))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {
+            'type': 'integer',
+            'description': f'Only present with ?{self.count_query_param}=true',
+        }
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [{
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Include the total number of results',
+            'schema': {'type': 'boolean'},
+        }]
+
+
+class ProductPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class StockMovementPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+
+
+class PriceHistoryPagination(KeysetPagination):
+    ordering = ('-changed_at', '-id')
+
+
+class UploadHistoryPagination(KeysetPagination):
+    ordering = ('-upload_date', '-id')
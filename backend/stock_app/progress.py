@@ -0,0 +1,102 @@
+import logging
+import time
+
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# Progress entries outlive the upload long enough for clients to see the final state
+PROGRESS_TTL = 24 * 60 * 60
+
+# Uploads and export jobs are tracked alike, under their own key prefix
+UPLOAD = 'upload'
+EXPORT = 'export'
+
+
+def _key(upload_id, kind=UPLOAD):
+    return f'{kind}-progress:{upload_id}'
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def start_progress(upload_id, total_rows=None, kind=UPLOAD):
+    """Reset the live progress of an upload before processing starts"""
+    try:
+        redis = _redis()
+        key = _key(upload_id, kind)
+        mapping = {'status': 'PROCESSING', 'started_at': time.time(), 'done': 0, 'failed': 0}
+        if total_rows is not None:
+            mapping['total'] = total_rows
+        with redis.pipeline() as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, PROGRESS_TTL)
+            pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not record progress for {kind} {upload_id}: {str(e)}")
+
+
+def record_progress(upload_id, processed, failed, kind=UPLOAD):
+    """Add the rows handled by one chunk to the live counters"""
+    try:
+        key = _key(upload_id, kind)
+        with _redis().pipeline() as pipe:
+            pipe.hincrby(key, 'done', processed)
+            pipe.hincrby(key, 'failed', failed)
+            pipe.hset(key, 'updated_at', time.time())
+            pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not record progress for {kind} {upload_id}: {str(e)}")
+
+
+def set_progress(upload_id, processed, failed, kind=UPLOAD):
+    """Overwrite the live counters, used once a set-based merge knows the final numbers"""
+    try:
+        _redis().hset(_key(upload_id, kind), mapping={'done': processed, 'failed': failed, 'updated_at': time.time()})
+    except Exception as e:
+        logger.warning(f"Could not record progress for {kind} {upload_id}: {str(e)}")
+
+
+def finish_progress(upload_id, status, kind=UPLOAD):
+    try:
+        _redis().hset(_key(upload_id, kind), mapping={'status': status, 'finished_at': time.time()})
+    except Exception as e:
+        logger.warning(f"Could not record progress for {kind} {upload_id}: {str(e)}")
+
+
+def get_progress(upload_id, kind=UPLOAD):
+    """
+    Return the live progress of an upload (rows done/failed, rows per
+    second and ETA in seconds), or None when nothing is tracked for it.
+    """
+    try:
+        raw = _redis().hgetall(_key(upload_id, kind))
+    except Exception as e:
+        logger.warning(f"Could not read progress for {kind} {upload_id}: {str(e)}")
+        return None
+    if not raw:
+        return None
+
+    values = {key.decode(): value.decode() for key, value in raw.items()}
+    done = int(values.get('done', 0))
+    failed = int(values.get('failed', 0))
+    total = int(values['total']) if 'total' in values else None
+    started_at = float(values['started_at'])
+    ended_at = float(values.get('finished_at') or time.time())
+
+    elapsed = max(ended_at - started_at, 1e-6)
+    rows_per_sec = (done + failed) / elapsed
+    eta = None
+    if total is not None and values['status'] == 'PROCESSING' and rows_per_sec:
+        eta = max(total - done - failed, 0) / rows_per_sec
+
+    return {
+        'status': values['status'],
+        'rows_done': done,
+        'rows_failed': failed,
+        'rows_total': total,
+        'rows_per_sec': round(rows_per_sec, 1),
+        'eta_seconds': round(eta, 1) if eta is not None else None,
+    }
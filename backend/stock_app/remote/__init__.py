@@ -0,0 +1,20 @@
+from .clients import RemoteEntry, FTPClient, SFTPClient
+from .pool import ConnectionPool
+from .engine import FetchResult, RemoteFetcher
+from .manifest import manifest_entry, has_changed, record_consumed_file
+from .stream import BlockPipe, StreamAborted, prefetch
+
+__all__ = [
+    'RemoteEntry',
+    'FTPClient',
+    'SFTPClient',
+    'ConnectionPool',
+    'FetchResult',
+    'RemoteFetcher',
+    'manifest_entry',
+    'has_changed',
+    'record_consumed_file',
+    'BlockPipe',
+    'StreamAborted',
+    'prefetch'
+]
@@ -0,0 +1,135 @@
+import ftplib
+import posixpath
+import stat
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+# A file in a remote directory; size and mtime (POSIX timestamp) are None when the server doesn't say
+RemoteEntry = namedtuple('RemoteEntry', ['name', 'size', 'mtime'])
+
+
+class FTPClient:
+    """Thin wrapper over ftplib with the operations the fetch engine needs"""
+    default_port = 21
+
+    def __init__(self, host, port=None, username='', password='', timeout=None):
+        self.ftp = ftplib.FTP(timeout=timeout)
+        self.ftp.connect(host, port or self.default_port)
+        self.ftp.login(username or 'anonymous', password or '')
+
+    def list_files(self, directory):
+        try:
+            return [
+                RemoteEntry(name, _to_int(facts.get('size')), _parse_ftp_time(facts.get('modify')))
+                for name, facts in self.ftp.mlsd(directory, facts=['type', 'size', 'modify'])
+                if facts.get('type') == 'file'
+            ]
+        except ftplib.error_perm:
+            # Server without MLSD, fall back to NLST and per-file SIZE/MDTM. Servers
+            # may refuse SIZE in ASCII mode, where it is ambiguous, so switch to binary
+            names = self.ftp.nlst(directory)
+            self.ftp.voidcmd('TYPE I')
+            return [self._stat(directory, posixpath.basename(name)) for name in names]
+
+    def _stat(self, directory, name):
+        path = posixpath.join(directory, name)
+        try:
+            size = self.ftp.size(path)
+        except ftplib.error_perm:
+            size = None
+        try:
+            mtime = _parse_ftp_time(self.ftp.voidcmd(f'MDTM {path}').split()[-1])
+        except ftplib.error_perm:
+            mtime = None
+        return RemoteEntry(name, size, mtime)
+
+    def download(self, remote_path, fileobj):
+        self.ftp.retrbinary(f'RETR {remote_path}', fileobj.write, blocksize=settings.REMOTE_BLOCK_SIZE)
+
+    def is_alive(self):
+        try:
+            self.ftp.voidcmd('NOOP')
+            return True
+        except (ftplib.Error, OSError, EOFError):
+            return False
+
+    def close(self):
+        try:
+            self.ftp.quit()
+        except (ftplib.Error, OSError, EOFError):
+            self.ftp.close()
+
+
+class SFTPClient:
+    """SFTP over paramiko, verifying the server against the known hosts"""
+    default_port = 22
+
+    def __init__(self, host, port=None, username='', password='', timeout=None):
+        import paramiko
+
+        self.ssh = paramiko.SSHClient()
+        self.ssh.load_system_host_keys()
+        if settings.REMOTE_SFTP_KNOWN_HOSTS:
+            self.ssh.load_host_keys(settings.REMOTE_SFTP_KNOWN_HOSTS)
+        if settings.REMOTE_SFTP_TRUST_UNKNOWN_HOSTS:
+            self.ssh.set_missing_host_key_policy(paramiko.WarningPolicy())
+        self.ssh.connect(
+            host,
+            port=port or self.default_port,
+            username=username or None,
+            password=password or None,
+            timeout=timeout,
+            allow_agent=False,
+            look_for_keys=False
+        )
+        self.sftp = self.ssh.open_sftp()
+
+    def list_files(self, directory):
+        return [
+            RemoteEntry(attributes.filename, attributes.st_size, attributes.st_mtime)
+            for attributes in self.sftp.listdir_attr(directory)
+            if stat.S_ISREG(attributes.st_mode or 0)
+        ]
+
+    def download(self, remote_path, fileobj):
+        self.sftp.getfo(remote_path, fileobj)
+
+    def is_alive(self):
+        transport = self.ssh.get_transport()
+        return transport is not None and transport.is_active()
+
+    def close(self):
+        self.ssh.close()
+
+
+CLIENTS = {
+    'FTP': FTPClient,
+    'SFTP': SFTPClient,
+}
+
+
+def connect(configuration):
+    """Open a client for an FTP/SFTP ImportConfiguration"""
+    client_class = CLIENTS.get(configuration.import_type)
+    if client_class is None:
+        raise ValueError(f"Import type {configuration.import_type} has no remote client")
+    return client_class(
+        configuration.host,
+        port=configuration.port,
+        username=configuration.username,
+        password=configuration.password,
+        timeout=settings.REMOTE_TIMEOUT
+    )
+
+
+def _to_int(value):
+    return int(value) if value is not None else None
+
+
+def _parse_ftp_time(value):
+    # MLSD/MDTM timestamps are UTC, YYYYMMDDHHMMSS[.sss]
+    if not value:
+        return None
+    return datetime.strptime(value[:14], '%Y%m%d%H%M%S').replace(tzinfo=timezone.utc).timestamp()
@@ -0,0 +1,236 @@
+import fnmatch
+import hashlib
+import io
+import logging
+import os
+import posixpath
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from ..importers.readers import file_format
+from .manifest import has_changed, is_same_content
+from .pool import ConnectionPool
+from .stream import BlockPipe, StreamAborted
+
+logger = logging.getLogger(__name__)
+
+
+class FetchResult:
+    """Outcome of fetching the feed of one configuration"""
+
+    def __init__(self, configuration, remote_path=None, local_path=None, content_hash=None,
+                 entry=None, error=None, unchanged=False, imported=False):
+        self.configuration = configuration
+        self.remote_path = remote_path
+        self.local_path = local_path
+        self.content_hash = content_hash
+        self.entry = entry
+        self.error = error
+        # The feed is the one consumed last (by size/mtime, or by checksum once downloaded)
+        self.unchanged = unchanged
+        # The feed was imported while it downloaded, see RemoteFetcher.fetch(on_stream=...)
+        self.imported = imported
+
+
+def split_remote_path(remote_path):
+    """
+    Split remote_path into a directory and a file name pattern: 'feeds/' is
+    every file of the directory, 'feeds/stock_*.csv' a glob and
+    'feeds/stock.csv' a single file.
+    """
+    directory, pattern = posixpath.split(remote_path or '')
+    return directory or '.', pattern or '*'
+
+
+def pick_feed(entries, pattern):
+    """The newest supported file matching the pattern, each run imports one full feed"""
+    matching = [
+        entry for entry in entries
+        if fnmatch.fnmatchcase(entry.name, pattern) and file_format(entry.name)
+    ]
+    if not matching:
+        return None
+    return max(matching, key=lambda entry: (entry.mtime or 0, entry.name))
+
+
+class RemoteFetcher:
+    """
+    Collect the feeds of many FTP/SFTP configurations concurrently.
+
+    Listings and downloads run on a thread pool and share pooled
+    connections, capped per server by the ConnectionPool. A feed is only
+    downloaded when its size or mtime differ from the configuration's
+    remote manifest. Files are streamed to disk (and hashed on the way)
+    under a temporary name and moved in place once complete.
+
+    CSV feeds can instead be handed to on_stream, which imports them while
+    they download (see download_streaming).
+    """
+
+    def __init__(self, directory, max_workers=None, max_per_host=None):
+        self.directory = directory
+        self.max_workers = max_workers or settings.REMOTE_FETCH_WORKERS
+        self.pool = ConnectionPool(max_per_host)
+
+    def fetch(self, configurations, on_fetched=None, on_stream=None):
+        """
+        Fetch the feed of every configuration; on_fetched is called with
+        each result as it lands. When on_stream is given, changed CSV feeds
+        are passed to on_stream(fetcher, configuration, remote_path, entry)
+        on a worker thread instead of being downloaded first; it returns
+        the FetchResult.
+        """
+        results = []
+
+        def finish(result):
+            results.append(result)
+            if on_fetched:
+                on_fetched(result)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                listings = {
+                    executor.submit(self.find_feed, configuration): configuration
+                    for configuration in configurations
+                }
+                downloads = {}
+                for future in as_completed(listings):
+                    configuration = listings[future]
+                    try:
+                        remote_path, entry = future.result()
+                    except Exception as e:
+                        logger.error(f"Listing {configuration} failed: {str(e)}")
+                        finish(FetchResult(configuration, error=f"Listing failed: {str(e)}"))
+                        continue
+                    if remote_path is None:
+                        finish(FetchResult(configuration, error=f"No file matches {configuration.remote_path}"))
+                        continue
+                    if not has_changed(configuration.remote_manifest, entry):
+                        finish(FetchResult(configuration, remote_path, entry=entry, unchanged=True))
+                        continue
+                    if on_stream and file_format(entry.name) == 'csv':
+                        future = executor.submit(on_stream, self, configuration, remote_path, entry)
+                    else:
+                        future = executor.submit(self.download, configuration, remote_path)
+                    downloads[future] = (configuration, remote_path, entry)
+
+                for future in as_completed(downloads):
+                    configuration, remote_path, entry = downloads[future]
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        logger.error(f"Downloading {remote_path} for {configuration} failed: {str(e)}")
+                        finish(FetchResult(configuration, remote_path, entry=entry, error=f"Download failed: {str(e)}"))
+                        continue
+                    if isinstance(outcome, FetchResult):
+                        finish(outcome)
+                        continue
+                    local_path, content_hash = outcome
+                    unchanged = is_same_content(configuration.remote_manifest, entry.name, content_hash)
+                    finish(FetchResult(configuration, remote_path, local_path, content_hash, entry, unchanged=unchanged))
+        finally:
+            self.pool.close_all()
+
+        return results
+
+    def find_feed(self, configuration):
+        directory, pattern = split_remote_path(configuration.remote_path)
+        with self.pool.connection(configuration) as client:
+            entry = pick_feed(client.list_files(directory), pattern)
+        if entry is None:
+            return None, None
+        return posixpath.join(directory, entry.name), entry
+
+    def download(self, configuration, remote_path):
+        """Stream a remote file to disk, returning its local path and SHA-256"""
+        target_directory = os.path.join(self.directory, str(configuration.id))
+        os.makedirs(target_directory, exist_ok=True)
+        local_path = os.path.join(target_directory, posixpath.basename(remote_path))
+        partial_path = f'{local_path}.part'
+
+        started = time.monotonic()
+        digest = hashlib.sha256()
+        try:
+            with self.pool.connection(configuration) as client, open(partial_path, 'wb') as destination:
+                def write(block):
+                    digest.update(block)
+                    destination.write(block)
+
+                client.download(remote_path, _Writer(write))
+        except Exception:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        os.replace(partial_path, local_path)
+
+        logger.info(
+            f"Fetched {remote_path} for {configuration} "
+            f"({os.path.getsize(local_path)} bytes in {time.monotonic() - started:.2f}s)"
+        )
+        return local_path, digest.hexdigest()
+
+    def download_streaming(self, configuration, remote_path, consume):
+        """
+        Download a remote file on a background thread while consume(reader)
+        reads it from a bounded BlockPipe, so parsing and importing overlap
+        with the transfer. The file is still written (and hashed) to disk
+        on the way. Returns its local path and SHA-256 once both sides are
+        done; if either fails, the other is stopped and the error raised.
+        """
+        target_directory = os.path.join(self.directory, str(configuration.id))
+        os.makedirs(target_directory, exist_ok=True)
+        local_path = os.path.join(target_directory, posixpath.basename(remote_path))
+        partial_path = f'{local_path}.part'
+
+        started = time.monotonic()
+        digest = hashlib.sha256()
+        pipe = BlockPipe(settings.REMOTE_STREAM_BUFFER_BLOCKS)
+
+        def transfer():
+            error = None
+            try:
+                with self.pool.connection(configuration) as client, open(partial_path, 'wb') as destination:
+                    def write(block):
+                        digest.update(block)
+                        destination.write(block)
+                        pipe.put(block)
+
+                    client.download(remote_path, _Writer(write))
+            except Exception as e:
+                error = e
+            try:
+                pipe.finish(error)
+            except StreamAborted:
+                # The reader gave up, nobody is waiting for the end
+                pass
+
+        downloader = threading.Thread(target=transfer, daemon=True)
+        downloader.start()
+        try:
+            consume(io.BufferedReader(pipe, settings.REMOTE_BLOCK_SIZE))
+            # Let the transfer complete even if the reader stopped before the end
+            while pipe.read(settings.REMOTE_BLOCK_SIZE):
+                pass
+        except BaseException:
+            pipe.abort()
+            downloader.join()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        downloader.join()
+        os.replace(partial_path, local_path)
+
+        logger.info(
+            f"Streamed {remote_path} for {configuration} "
+            f"({os.path.getsize(local_path)} bytes in {time.monotonic() - started:.2f}s)"
+        )
+        return local_path, digest.hexdigest()
+
+
+class _Writer:
+    # File-like adapter: ftplib calls a function per block, paramiko writes to a file object
+    def __init__(self, write):
+        self.write = write
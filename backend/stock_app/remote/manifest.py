@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import ImportConfiguration
+
+
+def manifest_entry(entry, checksum=None):
+    """The manifest record of a remote file: size, mtime and (once downloaded) SHA-256"""
+    return {'size': entry.size, 'mtime': entry.mtime, 'checksum': checksum}
+
+
+def has_changed(manifest, entry):
+    """Whether a listed remote file differs from the one consumed last"""
+    consumed = manifest.get(entry.name)
+    if consumed is None:
+        return True
+    # Without size or mtime from the server the file has to be downloaded and compared by checksum
+    if entry.size is None or entry.mtime is None:
+        return True
+    return consumed['size'] != entry.size or consumed['mtime'] != entry.mtime
+
+
+def is_same_content(manifest, name, checksum):
+    consumed = manifest.get(name)
+    return consumed is not None and consumed.get('checksum') == checksum
+
+
+def record_consumed_file(configuration_id, name, values):
+    """
+    Mark a remote file as consumed and stamp last_run in one transaction,
+    so the manifest never runs ahead of a successful run.
+    """
+    with transaction.atomic():
+        configuration = ImportConfiguration.objects.select_for_update().get(id=configuration_id)
+        configuration.remote_manifest[name] = values
+        configuration.last_run = timezone.now()
+        configuration.save(update_fields=['remote_manifest', 'last_run'])
@@ -0,0 +1,76 @@
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .clients import connect
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    Reusable FTP/SFTP connections, pooled per server and credentials.
+
+    At most max_per_host connections to the same server are open at once;
+    callers beyond that wait for a connection to be released. Idle
+    connections are checked before reuse and replaced when they dropped.
+    """
+
+    def __init__(self, max_per_host=None):
+        self.max_per_host = max_per_host or settings.REMOTE_MAX_CONNECTIONS_PER_HOST
+        self._idle = defaultdict(list)
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(configuration):
+        # Credentials are part of the key, a session is never reused for another login
+        return (
+            configuration.import_type, configuration.host, configuration.port,
+            configuration.username, configuration.password
+        )
+
+    def _slot(self, key):
+        # The cap is per server, whichever account connects to it
+        server = key[:3]
+        with self._lock:
+            if server not in self._slots:
+                self._slots[server] = threading.BoundedSemaphore(self.max_per_host)
+            return self._slots[server]
+
+    def _checkout(self, key, configuration):
+        while True:
+            with self._lock:
+                client = self._idle[key].pop() if self._idle[key] else None
+            if client is None:
+                return connect(configuration)
+            if client.is_alive():
+                return client
+            client.close()
+
+    @contextmanager
+    def connection(self, configuration):
+        key = self.key(configuration)
+        with self._slot(key):
+            client = self._checkout(key, configuration)
+            try:
+                yield client
+            except Exception:
+                # The connection may be mid-transfer, don't hand it out again
+                client.close()
+                raise
+            with self._lock:
+                self._idle[key].append(client)
+
+    def close_all(self):
+        with self._lock:
+            idle = [client for clients in self._idle.values() for client in clients]
+            self._idle.clear()
+        for client in idle:
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning(f"Error closing remote connection: {str(e)}")
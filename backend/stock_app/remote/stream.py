@@ -0,0 +1,116 @@
+import io
+import queue
+import threading
+
+# Seconds between checks for an abort while waiting on a full or empty queue
+POLL_INTERVAL = 0.5
+
+_END = object()
+
+
+class StreamAborted(Exception):
+    """Raised on both ends of a BlockPipe once it was aborted"""
+
+
+class BlockPipe(io.RawIOBase):
+    """
+    Bounded in-memory pipe from a download thread to a parser.
+
+    The downloader put()s blocks and close()s it when done; the parser
+    reads it like a binary file. At most max_blocks blocks wait in the
+    pipe: put() blocks while it is full, which stalls the download when
+    parsing falls behind, so memory stays bounded whatever the file size.
+    abort() wakes up and fails both ends.
+    """
+
+    def __init__(self, max_blocks):
+        super().__init__()
+        self._blocks = queue.Queue(max_blocks)
+        self._current = memoryview(b'')
+        self._finished = False
+        self._aborted = threading.Event()
+        self.error = None
+
+    def readable(self):
+        return True
+
+    def put(self, block):
+        _put(self._blocks, bytes(block), self._aborted)
+
+    def finish(self, error=None):
+        """Mark the end of the data; a download error is raised to the reader"""
+        self.error = error
+        _put(self._blocks, _END, self._aborted)
+
+    def abort(self):
+        self._aborted.set()
+
+    def readinto(self, buffer):
+        while not self._current:
+            if self._finished:
+                return 0
+            block = _get(self._blocks, self._aborted)
+            if block is _END:
+                self._finished = True
+                if self.error is not None:
+                    raise IOError(f"Download failed: {str(self.error)}")
+                return 0
+            self._current = memoryview(block)
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+        return size
+
+
+def prefetch(iterable, max_items):
+    """
+    Run an iterator on a background thread, at most max_items results
+    ahead of the consumer. Errors of the iterator are raised to the
+    consumer; closing the generator stops the thread at its next result.
+    """
+    items = queue.Queue(max_items)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                _put(items, (item, None), stop)
+            _put(items, (_END, None), stop)
+        except Exception as e:
+            try:
+                _put(items, (_END, e), stop)
+            except StreamAborted:
+                pass
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def _put(target, item, aborted):
+    while True:
+        if aborted.is_set():
+            raise StreamAborted()
+        try:
+            target.put(item, timeout=POLL_INTERVAL)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(source, aborted):
+    while True:
+        if aborted.is_set():
+            raise StreamAborted()
+        try:
+            return source.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            continue
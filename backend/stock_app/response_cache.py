@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .versions import data_versions
+
+logger = logging.getLogger(__name__)
+
+# Hash of '<basename>:requests' and '<basename>:misses' counters
+STATS_KEY = 'response-cache:stats'
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+class CachedResponseMixin:
+    """
+    Cache the list and retrieve responses of a viewset in Redis.
+
+    Keys hold the current versions of cache_data_sets, the data sets the
+    response is built from, so an entry is never served once a save,
+    delete or bulk update of one of them has committed (see signals and
+    VersionedQuerySet); it simply stops being asked for and expires after
+    RESPONSE_CACHE_TIMEOUT. Keys also hold the action, the object, the
+    normalized query params (sorted, empty values dropped), the host (for
+    the absolute pagination links) and the user when cache_per_user is set.
+    Without Redis responses are computed as usual.
+    """
+    cache_data_sets = ()
+    # Responses that depend on the requesting user are cached per user
+    cache_per_user = False
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def response_cache_key(self, request, versions):
+        params = sorted(
+            (key, sorted(values)) for key, values in request.query_params.lists()
+            if any(value != '' for value in values)
+        )
+        identity = json.dumps([
+            self.action,
+            self.kwargs.get(self.lookup_url_kwarg or self.lookup_field),
+            request.get_host(),
+            request.user.pk if self.cache_per_user else None,
+            versions,
+            params,
+        ])
+        return f'response-cache:{self.basename}:{hashlib.sha256(identity.encode("utf-8")).hexdigest()}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        versions = data_versions(*self.cache_data_sets)
+        if versions is None:
+            return handler(request, *args, **kwargs)
+
+        key = self.response_cache_key(request, versions)
+        try:
+            with _redis().pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.hincrby(STATS_KEY, f'{self.basename}:requests')
+                cached = pipe.execute()[0]
+        except Exception as e:
+            logger.warning(f"Could not read cached response: {str(e)}")
+            return handler(request, *args, **kwargs)
+
+        if cached is not None:
+            response = Response(json.loads(cached))
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        response['X-Cache'] = 'MISS'
+        try:
+            with _redis().pipeline(transaction=False) as pipe:
+                if response.status_code == 200:
+                    pipe.set(key, json.dumps(response.data, cls=JSONEncoder), ex=settings.RESPONSE_CACHE_TIMEOUT)
+                pipe.hincrby(STATS_KEY, f'{self.basename}:misses')
+                pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not cache response: {str(e)}")
+        return response
+
+
+def cache_stats():
+    """Hits and misses of each cached viewset (by basename) since the counters were reset"""
+    try:
+        counters = _redis().hgetall(STATS_KEY)
+    except Exception as e:
+        logger.warning(f"Could not read response cache counters: {str(e)}")
+        return {}
+
+    totals = {}
+    for field, value in counters.items():
+        name, counter = field.decode('utf-8').rsplit(':', 1)
+        totals.setdefault(name, {'requests': 0, 'misses': 0})[counter] = int(value)
+    return {
+        name: {
+            'hits': counts['requests'] - counts['misses'],
+            'misses': counts['misses'],
+            'hit_rate': round((counts['requests'] - counts['misses']) / counts['requests'], 4)
+            if counts['requests'] else None,
+        }
+        for name, counts in sorted(totals.items())
+    }
+
+
+def reset_cache_stats():
+    _redis().delete(STATS_KEY)
@@ -0,0 +1,93 @@
+import logging
+import uuid
+from datetime import timedelta
+
+from celery.schedules import crontab
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Days searched for the next occurrence, enough for any valid expression (29 Feb included)
+MAX_SEARCH_DAYS = 366 * 5
+
+
+def parse_cron(expression):
+    """Parse a 5-field cron expression (minute hour day-of-month month day-of-week)"""
+    fields = (expression or '').split()
+    if len(fields) != 5:
+        raise ValueError(f"Cron expression must have 5 fields: '{expression}'")
+    minute, hour, day_of_month, month_of_year, day_of_week = fields
+    try:
+        return crontab(
+            minute=minute,
+            hour=hour,
+            day_of_month=day_of_month,
+            month_of_year=month_of_year,
+            day_of_week=day_of_week
+        )
+    except Exception as e:
+        raise ValueError(f"Invalid cron expression '{expression}': {str(e)}")
+
+
+def next_occurrence(schedule, after):
+    """First minute strictly after `after` matching the schedule, in the project time zone"""
+    local = timezone.localtime(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    restricted_dom = schedule._orig_day_of_month != '*'
+    restricted_dow = schedule._orig_day_of_week != '*'
+
+    day = local.replace(hour=0, minute=0)
+    for _ in range(MAX_SEARCH_DAYS):
+        if day.month in schedule.month_of_year and _day_matches(schedule, day, restricted_dom, restricted_dow):
+            for hour in sorted(schedule.hour):
+                for minute in sorted(schedule.minute):
+                    candidate = day.replace(hour=hour, minute=minute)
+                    if candidate >= local:
+                        return candidate
+        day = timezone.localtime(day + timedelta(days=1)).replace(hour=0, minute=0)
+    raise ValueError("Cron expression never matches")
+
+
+def _day_matches(schedule, day, restricted_dom, restricted_dow):
+    in_month = day.day in schedule.day_of_month
+    # Python weekdays start on Monday, cron's on Sunday
+    in_week = (day.weekday() + 1) % 7 in schedule.day_of_week
+    if restricted_dom and restricted_dow:
+        # Like cron, either restricted field may match
+        return in_month or in_week
+    return in_month and in_week
+
+
+def acquire_job_lock(kind, config_id):
+    """Take the overlap lock of one configuration; False while a previous run still holds it"""
+    return cache.add(f'scheduler:lock:{kind}:{config_id}', 1, settings.SCHEDULER_LOCK_TIMEOUT)
+
+
+def release_job_lock(kind, config_id):
+    cache.delete(f'scheduler:lock:{kind}:{config_id}')
+
+
+def job_running(kind, config_id):
+    """Whether a run of the configuration holds its overlap lock"""
+    return cache.get(f'scheduler:lock:{kind}:{config_id}') is not None
+
+
+def acquire_budget_slot():
+    """
+    Take one of the SCHEDULER_MAX_CONCURRENT_JOBS slots shared by all
+    workers, or return None when they are all taken. Slots expire after
+    SCHEDULER_LOCK_TIMEOUT, so a crashed worker cannot leak them.
+    """
+    token = uuid.uuid4().hex
+    for slot in range(settings.SCHEDULER_MAX_CONCURRENT_JOBS):
+        key = f'scheduler:slot:{slot}'
+        if cache.add(key, token, settings.SCHEDULER_LOCK_TIMEOUT):
+            return key, token
+    return None
+
+
+def release_budget_slot(slot):
+    key, token = slot
+    if cache.get(key) == token:
+        cache.delete(key)
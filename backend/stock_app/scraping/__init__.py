@@ -0,0 +1,13 @@
+from .extract import ScraperSpec, parse_price
+from .engine import PAGE_COLUMN, HostRateLimiter, ScrapeMetrics, Scraper
+from .cache import PageCache
+
+__all__ = [
+    'ScraperSpec',
+    'parse_price',
+    'PAGE_COLUMN',
+    'HostRateLimiter',
+    'ScrapeMetrics',
+    'Scraper',
+    'PageCache'
+]
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# Every cached page in least-recently-used order, and the bytes they take, across all scrapers
+LRU_KEY = 'scrape-cache:lru'
+SIZE_KEY = 'scrape-cache:bytes'
+
+# Entries removed per round trip while evicting
+EVICTION_BATCH = 100
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+class PageCache:
+    """
+    Validators and parse results of the pages a scraper fetched.
+
+    For each URL the ETag, Last-Modified and SHA-256 of the body are kept,
+    along with the links found on the page, so an unchanged page (a 304,
+    or the same body) is neither parsed nor imported again while the crawl
+    still reaches the pages it links to. Entries of one scraper live in a
+    Redis hash named after its selectors, so changing the selectors starts
+    from an empty cache. All scrapers share SCRAPER_CACHE_MAX_BYTES; the
+    least recently used pages are evicted beyond it.
+
+    The cache is read once before a run and written once after it: the
+    crawl only touches the in-memory copy, and pages whose rows failed to
+    import are not written, so they are read again next time.
+    """
+
+    def __init__(self, scraper_id, selectors):
+        digest = hashlib.sha256(json.dumps(selectors, sort_keys=True).encode()).hexdigest()[:16]
+        self.key = f'scrape-cache:{scraper_id}:{digest}'
+        self.entries = {}
+        self.pending = {}
+
+    def load(self):
+        try:
+            stored = _redis().hgetall(self.key)
+        except Exception as e:
+            logger.warning(f"Could not read page cache {self.key}: {str(e)}")
+            return
+        self.entries = {url.decode(): json.loads(entry) for url, entry in stored.items()}
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def store(self, url, entry):
+        self.pending[url] = entry
+
+    def save(self, exclude=()):
+        """Write the entries of this run, except the pages in exclude, then evict over the size budget"""
+        entries = {
+            url: json.dumps(entry)
+            for url, entry in self.pending.items() if url not in exclude
+        }
+        if not entries:
+            return
+        try:
+            redis = _redis()
+            now = time.time()
+            with redis.pipeline() as pipe:
+                for url, entry in entries.items():
+                    pipe.hstrlen(self.key, url)
+                    pipe.hset(self.key, url, entry)
+                    pipe.zadd(LRU_KEY, {f'{self.key}\n{url}': now})
+                replies = pipe.execute()
+            replaced = sum(replies[0::3])
+            redis.incrby(SIZE_KEY, sum(len(entry) for entry in entries.values()) - replaced)
+            evict(redis)
+        except Exception as e:
+            logger.warning(f"Could not write page cache {self.key}: {str(e)}")
+
+
+def evict(redis, max_bytes=None):
+    """Drop least recently used pages until the cache fits in max_bytes"""
+    max_bytes = settings.SCRAPER_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    evicted = 0
+    while int(redis.get(SIZE_KEY) or 0) > max_bytes:
+        members = redis.zrange(LRU_KEY, 0, EVICTION_BATCH - 1)
+        if not members:
+            # Nothing left to evict, the counter drifted
+            redis.set(SIZE_KEY, 0)
+            break
+        with redis.pipeline() as pipe:
+            for member in members:
+                key, url = member.decode().split('\n', 1)
+                pipe.hstrlen(key, url)
+                pipe.hdel(key, url)
+            pipe.zrem(LRU_KEY, *members)
+            replies = pipe.execute()
+        # Only count entries this call actually removed, a concurrent eviction may have taken some
+        freed = sum(size for size, deleted in zip(replies[0:-1:2], replies[1:-1:2]) if deleted)
+        redis.decrby(SIZE_KEY, freed)
+        evicted += len(members)
+    if evicted:
+        logger.info(f"Evicted {evicted} pages from the scraper cache")
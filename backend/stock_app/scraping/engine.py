@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Responses worth another attempt, everything else is reported as it is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Column added to every row with the URL of the page it was read from
+PAGE_COLUMN = '_page'
+
+
+class Page:
+    """A fetched page with its cache validators"""
+
+    def __init__(self, body, text, etag=None, last_modified=None):
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.checksum = hashlib.sha256(body).hexdigest()
+
+
+# Returned by Scraper.fetch when the server answered 304 Not Modified
+NOT_MODIFIED = object()
+
+
+class HostRateLimiter:
+    """Space out requests to the same host to at most `rate` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next_slot = {}
+        self._locks = {}
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class ScrapeMetrics:
+    """Page, error and latency counters of one scraper run"""
+
+    def __init__(self):
+        self.pages = 0
+        self.unchanged = 0
+        self.errors = []
+        self.latencies = []
+        self.started = time.monotonic()
+        self.elapsed = 0
+
+    def add_error(self, url, error):
+        self.errors.append(f"{url}: {error}")
+
+    def stop(self):
+        self.elapsed = time.monotonic() - self.started
+
+    def as_dict(self):
+        return {
+            'pages': self.pages,
+            'unchanged': self.unchanged,
+            'errors': len(self.errors),
+            'elapsed': round(self.elapsed, 3),
+            'pages_per_sec': round(self.pages / self.elapsed, 2) if self.elapsed else 0,
+            'latency_ms': {
+                f'p{p}': percentile(self.latencies, p) for p in (50, 95, 99)
+            }
+        }
+
+
+def percentile(values, p):
+    """Nearest-rank percentile in milliseconds, None without values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return round(ordered[rank - 1] * 1000, 1)
+
+
+class Scraper:
+    """
+    Crawl a listing with aiohttp and extract product rows with a ScraperSpec.
+
+    Listing pages are followed through "next_page" one after the other,
+    while the detail pages they link to are fetched concurrently by a pool
+    of workers. Connections are kept alive and reused through one session,
+    capped in total and per host, and requests to a host are spaced by
+    SCRAPER_REQUESTS_PER_SECOND. HTML is parsed off the event loop.
+
+    With a PageCache, requests are conditional (If-None-Match and
+    If-Modified-Since) and pages that come back 304 or with the same body
+    yield no rows; the crawl goes on through the links cached for them.
+    """
+
+    def __init__(self, spec, cache=None, max_connections=None, connections_per_host=None,
+                 requests_per_second=None, timeout=None, max_pages=None, retries=None):
+        self.spec = spec
+        self.cache = cache
+        self.max_connections = max_connections or settings.SCRAPER_MAX_CONNECTIONS
+        self.connections_per_host = connections_per_host or settings.SCRAPER_CONNECTIONS_PER_HOST
+        self.limiter = HostRateLimiter(
+            settings.SCRAPER_REQUESTS_PER_SECOND if requests_per_second is None else requests_per_second
+        )
+        self.timeout = timeout or settings.SCRAPER_TIMEOUT
+        self.max_pages = spec.max_pages or max_pages or settings.SCRAPER_MAX_PAGES
+        self.retries = settings.SCRAPER_RETRIES if retries is None else retries
+
+    def run(self, url):
+        """Scrape from the start URL, returning (rows, ScrapeMetrics)"""
+        return asyncio.run(self.scrape(url))
+
+    async def scrape(self, url):
+        metrics = ScrapeMetrics()
+        rows = []
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.connections_per_host)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'User-Agent': settings.SCRAPER_USER_AGENT}
+        ) as session:
+            details = asyncio.Queue()
+            workers = [
+                asyncio.create_task(self._detail_worker(session, details, rows, metrics))
+                for _ in range(self.max_connections)
+            ] if self.spec.links else []
+
+            seen = set()
+            budget = self.max_pages
+            while url and url not in seen and budget > 0:
+                seen.add(url)
+                budget -= 1
+                visited = await self._visit(session, url, metrics)
+                if visited is None:
+                    break
+                page_rows, links, url = visited
+                rows.extend(page_rows)
+                for link in links:
+                    if link not in seen and budget > 0:
+                        seen.add(link)
+                        budget -= 1
+                        details.put_nowait(link)
+
+            await details.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        metrics.stop()
+        return rows, metrics
+
+    async def _detail_worker(self, session, queue, rows, metrics):
+        while True:
+            url = await queue.get()
+            try:
+                visited = await self._visit(session, url, metrics, detail=True)
+                if visited is not None:
+                    rows.extend(visited[0])
+            except Exception as e:
+                metrics.add_error(url, f"Parsing failed: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def _visit(self, session, url, metrics, detail=False):
+        """Fetch and parse one page: (rows, links, next URL), or None when it could not be fetched"""
+        cached = self.cache.get(url) if self.cache is not None else None
+        page = await self.fetch(session, url, metrics, cached)
+        if page is None:
+            return None
+
+        if cached is not None and (page is NOT_MODIFIED or page.checksum == cached['checksum']):
+            metrics.unchanged += 1
+            if page is not NOT_MODIFIED:
+                cached = dict(cached, etag=page.etag, last_modified=page.last_modified)
+            # Stored again to mark it recently used
+            self.cache.store(url, cached)
+            return [], cached['links'], cached['next']
+
+        rows, links, next_url = await asyncio.get_running_loop().run_in_executor(
+            None, self.spec.parse, page.text, url, detail
+        )
+        for row in rows:
+            row[PAGE_COLUMN] = url
+        if self.cache is not None:
+            self.cache.store(url, {
+                'etag': page.etag,
+                'last_modified': page.last_modified,
+                'checksum': page.checksum,
+                'links': links,
+                'next': next_url
+            })
+        return rows, links, next_url
+
+    async def fetch(self, session, url, metrics, cached=None):
+        """
+        GET a page with retries on transient failures, conditionally when it
+        is cached. Returns a Page, NOT_MODIFIED, or None (and an error
+        recorded) when it can't be had.
+        """
+        headers = {}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        host = urlsplit(url).netloc
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(min(2 ** attempt, 30))
+            await self.limiter.wait(host)
+            started = time.monotonic()
+            try:
+                async with session.get(url, headers=headers) as response:
+                    body = await response.read()
+                    metrics.latencies.append(time.monotonic() - started)
+                    if response.status == 304 and cached:
+                        metrics.pages += 1
+                        return NOT_MODIFIED
+                    if response.status == 200:
+                        metrics.pages += 1
+                        return Page(
+                            body,
+                            await response.text(),
+                            response.headers.get('ETag'),
+                            response.headers.get('Last-Modified')
+                        )
+                    error = f"HTTP {response.status}"
+                    if response.status not in RETRY_STATUSES:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+        logger.warning(f"Scraping {url} failed: {error}")
+        metrics.add_error(url, error)
+        return None
@@ -0,0 +1,143 @@
+import re
+from urllib.parse import urljoin
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+from ..importers.products import PRICE_FIELDS, TEXT_FIELDS, BOOLEAN_FIELDS, REFERENCE_FIELDS
+
+# Product fields a scraper may fill, from the page or from constant defaults
+SCRAPED_FIELDS = set(TEXT_FIELDS) | set(PRICE_FIELDS) | set(BOOLEAN_FIELDS) | set(REFERENCE_FIELDS)
+
+_NUMBER = re.compile(r'-?\d[\d\s.,]*')
+
+
+class ScraperSpec:
+    """
+    The parsed selectors of a WebScraperConfig.
+
+    {
+        "item": ".product",                   # optional, one row per match (default: the page is one row)
+        "fields": {"sku": ".sku", "name": "h2", "unit_price": ".price"},
+        "links": "a.product@href",            # optional, rows are read from the linked pages instead
+        "next_page": "a.next@href",           # optional, listing pagination
+        "max_pages": 50,                      # optional cap on pages fetched per run
+        "defaults": {"supplier": "Acme"}      # optional constant values
+    }
+
+    A selector is a CSS selector, optionally followed by '@attribute' to
+    read an attribute instead of the text. A flat {field: selector} object
+    is read as "fields".
+    """
+
+    def __init__(self, selectors):
+        if not isinstance(selectors, dict):
+            raise ValueError("Selectors must be a JSON object")
+        if 'fields' not in selectors:
+            selectors = {'fields': selectors}
+
+        fields = selectors['fields']
+        if not isinstance(fields, dict) or not fields:
+            raise ValueError("'fields' must map product fields to selectors")
+        unknown = sorted(set(fields) - SCRAPED_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown product fields: {', '.join(unknown)}")
+        defaults = selectors.get('defaults') or {}
+        if not isinstance(defaults, dict) or set(defaults) - SCRAPED_FIELDS:
+            raise ValueError("'defaults' must map product fields to values")
+        if 'sku' not in fields and 'sku' not in defaults:
+            raise ValueError("A selector for 'sku' is required")
+
+        self.fields = {field: _compile(selector) for field, selector in fields.items()}
+        self.item = _compile(selectors['item'], attribute=False) if selectors.get('item') else None
+        self.links = _compile(selectors['links']) if selectors.get('links') else None
+        self.next_page = _compile(selectors['next_page']) if selectors.get('next_page') else None
+        self.defaults = defaults
+        self.max_pages = selectors.get('max_pages')
+        if self.max_pages is not None and (not isinstance(self.max_pages, int) or self.max_pages < 1):
+            raise ValueError("'max_pages' must be a positive integer")
+
+    @property
+    def column_mapping(self):
+        """Rows are keyed by product field, so they map onto themselves"""
+        return {field: field for field in list(self.fields) + list(self.defaults)}
+
+    def parse(self, html, url, detail=False):
+        """
+        Read one page, returning (rows, detail page URLs, next listing URL).
+        Pages linked from a listing are read with detail=True: rows only.
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        if detail:
+            return self._rows(soup), [], None
+        next_urls = self._absolute_urls(soup, self.next_page, url)
+        next_url = next_urls[0] if next_urls else None
+        if self.links:
+            return [], self._absolute_urls(soup, self.links, url), next_url
+        return self._rows(soup), [], next_url
+
+    def _rows(self, soup):
+        items = self.item[0].select(soup) if self.item else [soup]
+        rows = []
+        for item in items:
+            row = dict(self.defaults)
+            for field, selector in self.fields.items():
+                value = _select_value(item, selector)
+                if value is not None:
+                    row[field] = parse_price(value) if field in PRICE_FIELDS else value
+            # Blocks without any scraped value (ads, spacers) are not products
+            if set(row) - set(self.defaults):
+                rows.append(row)
+        return rows
+
+    @staticmethod
+    def _absolute_urls(soup, selector, base_url):
+        if selector is None:
+            return []
+        urls = []
+        for element in selector[0].select(soup):
+            href = element.get(selector[1] or 'href')
+            if href:
+                urls.append(urljoin(base_url, href.strip()))
+        return urls
+
+
+def parse_price(text):
+    """The number in a price text: '$1,234.50' and '1.234,50 €' both give '1234.50', None without digits"""
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    number = re.sub(r'\s', '', match.group()).rstrip('.,')
+    if ',' in number and '.' in number:
+        # The right-most separator is the decimal one
+        thousands = ',' if number.rfind('.') > number.rfind(',') else '.'
+        number = number.replace(thousands, '').replace(',', '.')
+    elif ',' in number:
+        # A lone comma followed by 1-2 digits is a decimal comma, otherwise thousands
+        head, _, tail = number.rpartition(',')
+        number = f'{head.replace(",", "")}.{tail}' if len(tail) <= 2 else number.replace(',', '')
+    return number
+
+
+def _compile(selector, attribute=True):
+    """Split 'css@attribute' and compile the CSS part, raising ValueError when invalid"""
+    if not isinstance(selector, str) or not selector.strip():
+        raise ValueError(f"Invalid selector: {selector!r}")
+    css, attr = selector, None
+    if attribute and '@' in selector:
+        css, attr = selector.rsplit('@', 1)
+    try:
+        return soupsieve.compile(css.strip()), attr.strip() if attr else None
+    except soupsieve.SelectorSyntaxError as e:
+        raise ValueError(f"Invalid CSS selector '{css}': {str(e)}")
+
+
+def _select_value(item, selector):
+    pattern, attribute = selector
+    element = pattern.select_one(item)
+    if element is None:
+        return None
+    value = element.get(attribute) if attribute else element.get_text(' ', strip=True)
+    if isinstance(value, list):
+        value = ' '.join(value)
+    return value.strip() if value else None
@@ -0,0 +1,87 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db import connections, transaction
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast, Greatest, Upper
+from rest_framework import filters
+
+# Terms shorter than this have no trigram the indexes could look up
+MIN_TRIGRAM_LENGTH = 3
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    """
+    Ranked product search on the pg_trgm GIN indexes of Product.
+
+    - A term equal to a SKU or barcode returns just those products, from
+      the btree indexes.
+    - Otherwise products containing the term in name, description, SKU or
+      barcode match (the ILIKE scans are answered by the trigram indexes
+      on UPPER(column)), as do names with a word similar to the term
+      (SEARCH_SIMILARITY_THRESHOLD), which tolerates typos.
+    - Matches are ordered by search_rank, the best trigram similarity of
+      the term to name, SKU or barcode, then by id. The keyset pagination
+      pages in that order.
+
+    Terms too short for trigrams fall back to SearchFilter over
+    search_fields. Querysets with trigram conditions (is_trigram_search) are
+    evaluated in search_transaction(), which sets the similarity threshold
+    for that transaction only.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = ' '.join(self.get_search_terms(request))
+        if not term:
+            return queryset
+
+        exact = queryset.filter(Q(sku=term) | Q(barcode=term))
+        if exact.exists():
+            return exact
+
+        if len(term) < MIN_TRIGRAM_LENGTH:
+            return super().filter_queryset(request, queryset, view)
+
+        return (
+            queryset
+            .alias(search_name=Upper('name'))
+            .filter(
+                Q(name__icontains=term)
+                | Q(sku__icontains=term)
+                | Q(barcode__icontains=term)
+                | Q(description__icontains=term)
+                | Q(search_name__trigram_word_similar=term)
+            )
+            .annotate(search_rank=Cast(
+                Greatest(
+                    TrigramWordSimilarity(term, 'name'),
+                    TrigramSimilarity('sku', term),
+                    TrigramSimilarity('barcode', term),
+                ),
+                # Double precision: the rank in a page cursor must compare equal to the stored one
+                FloatField()
+            ))
+            .order_by('-search_rank', 'id')
+        )
+
+
+def is_trigram_search(queryset):
+    """Whether TrigramSearchFilter applied its trigram conditions to a queryset"""
+    return 'search_rank' in queryset.query.annotations
+
+
+@contextmanager
+def search_transaction(using='default'):
+    """
+    A transaction in which trigram searches match names at
+    SEARCH_SIMILARITY_THRESHOLD. The setting is local to the transaction,
+    so it never leaks to other requests sharing the connection.
+    """
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(settings.SEARCH_SIMILARITY_THRESHOLD)]
+            )
+        yield
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.conf import settings
 from .models import (
     Category,
     Brand,
@@ -10,8 +11,38 @@ from .models import (
     ImportConfiguration,
     WebScraperConfig,
     DataUploadHistory,
+    ExportJob,
     Notification
 )
+from .exports import normalize_filters
+from .importers.prices import is_price_feed
+from .importers.readers import SUPPORTED_EXTENSIONS, file_format
+from .progress import EXPORT, get_progress
+from .scheduler import parse_cron
+from .scraping import ScraperSpec
+
+
+def validate_schedule(value):
+    if value:
+        try:
+            parse_cron(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+    return value
+
+
+def update_scheduled(serializer, instance, validated_data):
+    # A new schedule is counted from now by the scheduler
+    if validated_data.get('schedule', instance.schedule) != instance.schedule:
+        validated_data['next_run'] = None
+    return serializer.update(instance, validated_data)
+
+
+def validate_import_file(file):
+    if file_format(file.name) is None:
+        raise serializers.ValidationError(
+            f"Unsupported file type, expected one of: {', '.join(SUPPORTED_EXTENSIONS)}"
+        )
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -37,7 +68,6 @@ class ProductSerializer(serializers.ModelSerializer):
     brand_name = serializers.CharField(source='brand.name', read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     supplier_name = serializers.CharField(source='supplier.name', read_only=True)
-    current_stock = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -47,10 +77,6 @@ class ProductSerializer(serializers.ModelSerializer):
             'purchase_price', 'is_active', 'current_stock', 'created_at', 'updated_at'
         ]
 
-    def get_current_stock(self, obj):
-        stock = obj.stock_records.first()
-        return stock.quantity if stock else 0
-
 class StockSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     
@@ -79,13 +105,43 @@ class ImportConfigurationSerializer(serializers.ModelSerializer):
         model = ImportConfiguration
         fields = '__all__'
         extra_kwargs = {
-            'password': {'write_only': True}
+            'password': {'write_only': True},
+            'remote_manifest': {'read_only': True},
+            'next_run': {'read_only': True}
         }
 
+    def validate_schedule(self, value):
+        return validate_schedule(value)
+
+    def update(self, instance, validated_data):
+        return update_scheduled(super(), instance, validated_data)
+
+    def validate_column_mapping(self, value):
+        # Feeds are matched to their previous run by SKU
+        if value and not value.get('sku'):
+            raise serializers.ValidationError("'sku' is required in column mapping")
+        return value
+
 class WebScraperConfigSerializer(serializers.ModelSerializer):
     class Meta:
         model = WebScraperConfig
         fields = '__all__'
+        extra_kwargs = {
+            'next_run': {'read_only': True}
+        }
+
+    def validate_schedule(self, value):
+        return validate_schedule(value)
+
+    def validate_selectors(self, value):
+        try:
+            ScraperSpec(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def update(self, instance, validated_data):
+        return update_scheduled(super(), instance, validated_data)
 
 class DataUploadHistorySerializer(serializers.ModelSerializer):
     uploaded_by_username = serializers.CharField(source='uploaded_by.username', read_only=True)
@@ -94,6 +150,27 @@ class DataUploadHistorySerializer(serializers.ModelSerializer):
         model = DataUploadHistory
         fields = '__all__'
 
+class ExportJobSerializer(serializers.ModelSerializer):
+    requested_by_username = serializers.CharField(source='requested_by.username', read_only=True)
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = '__all__'
+        read_only_fields = [
+            'requested_by', 'status', 'signature', 'rows_total', 'rows_written',
+            'file_name', 'file_size', 'created_at', 'completed_at', 'error_message'
+        ]
+
+    def get_progress(self, obj):
+        # Live counters while the file is written
+        return get_progress(obj.id, kind=EXPORT) if obj.status == 'PROCESSING' else None
+
+    def validate_filters(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected an object of product list query params")
+        return normalize_filters(value)
+
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
@@ -138,19 +215,46 @@ class BulkProductUpdateSerializer(serializers.Serializer):
     action = serializers.ChoiceField(choices=['update_price', 'update_stock', 'deactivate', 'activate'])
     value = serializers.JSONField(required=False)
 
+class ProductLookupSerializer(serializers.Serializer):
+    codes = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        allow_empty=False,
+        max_length=settings.LOOKUP_MAX_CODES
+    )
+
 class FilePreviewSerializer(serializers.Serializer):
-    file = serializers.FileField()
-    header_row = serializers.IntegerField(default=0)
-    preview_rows = serializers.IntegerField(default=5)
+    file = serializers.FileField(required=False, validators=[validate_import_file])
+    # Hash returned by a previous preview, to preview the same file again without uploading it
+    file_hash = serializers.CharField(max_length=64, required=False)
+    header_row = serializers.IntegerField(default=0, min_value=0)
+    preview_rows = serializers.IntegerField(default=5, min_value=0)
+
+    def validate(self, data):
+        if 'file' not in data and 'file_hash' not in data:
+            raise serializers.ValidationError("Either 'file' or 'file_hash' is required")
+        return data
+
+class StockFileUploadSerializer(serializers.Serializer):
+    file = serializers.FileField(validators=[validate_import_file])
+    ingest_mode = serializers.ChoiceField(choices=DataUploadHistory.INGEST_MODES, default='ORM')
+    # Apply the file even when the same content was already imported
+    force = serializers.BooleanField(default=False)
+
+class FeedFileSerializer(serializers.Serializer):
+    file = serializers.FileField(validators=[validate_import_file])
 
 class ProductImportSerializer(serializers.Serializer):
-    file = serializers.FileField()
+    file = serializers.FileField(validators=[validate_import_file])
     header_row = serializers.IntegerField(default=0)
     data_start_row = serializers.IntegerField(default=1)
     column_mapping = serializers.JSONField()
+    ingest_mode = serializers.ChoiceField(choices=DataUploadHistory.INGEST_MODES, default='ORM')
+    # Import the file even when the same content was already imported with this mapping
+    force = serializers.BooleanField(default=False)
 
     def validate_column_mapping(self, value):
-        required_fields = ['name', 'sku']
+        # Price feeds only update existing products, by SKU
+        required_fields = ['sku'] if isinstance(value, dict) and is_price_feed(value) else ['name', 'sku']
         for field in required_fields:
             if field not in value or not value[field]:
                 raise serializers.ValidationError(f"'{field}' is required in column mapping")
@@ -0,0 +1,88 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .lookups import forget_codes
+from .models import Brand, Category, PriceHistory, Product, Stock, StockMovement, Supplier
+from .stock_levels import refresh_current_stock
+from .versions import BRANDS, CATEGORIES, PRODUCTS, SUPPLIERS, bump_version
+
+
+# Stock rows saved or deleted one at a time (API, stock adjustments, bulk
+# updates) keep Product.current_stock in sync here; the bulk import paths
+# call refresh_current_stock and bump_version themselves, as they bypass
+# signals. Products saved or deleted here forget their cached SKU/barcode
+# lookups.
+
+@receiver(pre_save, sender=Stock)
+def remember_stock_product(sender, instance, raw=False, **kwargs):
+    # A stock record moved to another product changes the total of both
+    if raw or instance.pk is None:
+        instance._previous_product_id = None
+        return
+    instance._previous_product_id = (
+        Stock.objects.filter(pk=instance.pk).values_list('product_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Stock)
+def stock_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_product_id', None)
+    refresh_current_stock([instance.product_id] + ([previous] if previous else []))
+
+
+@receiver(post_delete, sender=Stock)
+def stock_deleted(sender, instance, **kwargs):
+    refresh_current_stock([instance.product_id])
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_codes(sender, instance, raw=False, **kwargs):
+    # A changed SKU or barcode must not keep resolving to the product
+    if raw or instance.pk is None:
+        instance._previous_codes = ()
+        return
+    instance._previous_codes = (
+        Product.objects.filter(pk=instance.pk).values_list('sku', 'barcode').first() or ()
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    forget_codes([instance.sku, instance.barcode, *getattr(instance, '_previous_codes', ())])
+    bump_version(PRODUCTS)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, raw=False, **kwargs):
+    if not raw:
+        bump_version(CATEGORIES)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def brand_changed(sender, raw=False, **kwargs):
+    if not raw:
+        bump_version(BRANDS)
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def supplier_changed(sender, raw=False, **kwargs):
+    if not raw:
+        bump_version(SUPPLIERS)
+
+
+@receiver(post_save, sender=StockMovement)
+@receiver(post_delete, sender=StockMovement)
+@receiver(post_save, sender=PriceHistory)
+@receiver(post_delete, sender=PriceHistory)
+def product_history_changed(sender, raw=False, **kwargs):
+    # Movements and price history are part of the product data (product details)
+    if not raw:
+        bump_version(PRODUCTS)
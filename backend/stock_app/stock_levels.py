@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .lookups import forget_codes
+from .models import Product, Stock
+from .versions import PRODUCTS, bump_version
+
+
+def refresh_current_stock(product_ids):
+    """
+    Recompute Product.current_stock (the sum of quantities over all stock
+    records) for the given products with one set-based UPDATE.
+
+    The products are row-locked in id order first, so that concurrent
+    writers to stock records of the same product recompute one after the
+    other, each seeing the stock rows the other one committed.
+    """
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return
+    totals = (
+        Stock.objects.filter(product=OuterRef('pk'))
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    with transaction.atomic():
+        codes = list(
+            Product.objects.select_for_update().filter(id__in=product_ids).order_by('id')
+            .values_list('sku', 'barcode')
+        )
+        Product.objects.filter(id__in=product_ids).update(
+            current_stock=Coalesce(Subquery(totals), Value(0))
+        )
+        forget_codes(code for pair in codes for code in pair)
+    bump_version(PRODUCTS)
@@ -1,81 +1,725 @@
 import logging
-from celery import shared_task
+import math
+import os
+import random
+import pandas as pd
+from pandas.util import hash_pandas_object
+from celery import group, shared_task
 from django.core.mail import send_mail
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat
 from django.utils import timezone
-import pandas as pd
+from .importers import (
+    STOCK_COLUMNS,
+    DeltaImporter,
+    ProductCopyIngester,
+    StockCopyIngester,
+    append_chunk,
+    apply_stock_chunk,
+    count_data_rows,
+    importer_for,
+    iter_chunk_file,
+    iter_csv_stream,
+    iter_file_chunks
+)
+from .importers.products import to_text
 from .models import (
-    Product,
     Stock,
     StockMovement,
     DataUploadHistory,
+    UploadShard,
+    ExportJob,
+    ImportConfiguration,
+    WebScraperConfig,
     Notification
 )
+from .dashboard import refresh_snapshot
+from .exports import EXPORT_DIR, EXPORT_FORMATS, export_path, export_rows, filtered_products
+from .progress import EXPORT, start_progress, record_progress, set_progress, finish_progress
+from .remote import FetchResult, RemoteFetcher, manifest_entry, prefetch, record_consumed_file
+from .scheduler import (
+    parse_cron,
+    next_occurrence,
+    acquire_job_lock,
+    release_job_lock,
+    acquire_budget_slot,
+    release_budget_slot
+)
+from .scraping import PAGE_COLUMN, PageCache, Scraper, ScraperSpec
+from .search import search_transaction
+from .uploads import UPLOAD_DIR
 
 logger = logging.getLogger(__name__)
 
-@shared_task
-def process_stock_file_upload(upload_history_id, file_path):
-    """Process uploaded stock file (CSV/Excel)"""
-    upload_history = DataUploadHistory.objects.get(id=upload_history_id)
-    
+@shared_task(acks_late=True)
+def process_stock_file_upload(upload_history_id, file_path, chunk_size=None):
+    """Process uploaded stock file (CSV/Excel) in fixed-size chunks"""
+    _process_upload(upload_history_id, file_path, 'stock', chunk_size=chunk_size)
+
+
+@shared_task(acks_late=True)
+def process_product_import(upload_history_id, file_path, column_mapping,
+                           header_row=0, data_start_row=1, chunk_size=None):
+    """Import products from an uploaded file through the bulk import engine"""
+    _process_upload(
+        upload_history_id,
+        file_path,
+        'products',
+        column_mapping=column_mapping,
+        chunk_size=chunk_size,
+        header_row=header_row,
+        data_offset=data_start_row - header_row - 1
+    )
+
+
+@shared_task(acks_late=True)
+def process_configured_import(upload_history_id, file_path):
+    """
+    Apply a feed file of an ImportConfiguration as a delta against the
+    previous run: only new, changed and removed rows touch the catalog.
+    """
+    upload_history = DataUploadHistory.objects.select_related('import_configuration').get(id=upload_history_id)
+    if upload_history.status == 'COMPLETED':
+        return
+    configuration = upload_history.import_configuration
+
+    try:
+        chunks = iter_file_chunks(file_path, columns=_read_columns('products', configuration.column_mapping))
+        _apply_delta(upload_history, chunks, count_data_rows(file_path))
+
+        remote = upload_history.import_options.get('remote')
+        if remote:
+            record_consumed_file(configuration.id, remote['name'], remote['manifest'])
+        else:
+            configuration.last_run = timezone.now()
+            configuration.save(update_fields=['last_run'])
+
+        upload_history.refresh_from_db()
+        _finish_upload(upload_history)
+
+    except Exception as e:
+        upload_history.refresh_from_db()
+        _finish_upload(upload_history, str(e))
+        raise
+
+
+def _apply_delta(upload_history, chunks, total_rows=None):
+    """Apply the chunks of a feed as a delta, keeping the upload record and live progress up to date"""
+    # Finding removed rows needs every SKU of the file, so a delta run always
+    # starts from the top; rows applied before an interruption are unchanged now
+    upload_history.status = 'PROCESSING'
+    upload_history.records_processed = 0
+    upload_history.records_failed = 0
+    upload_history.records_inserted = 0
+    upload_history.records_updated = 0
+    upload_history.error_message = ''
+    upload_history.save()
+    start_progress(upload_history.id, total_rows)
+
+    importer = DeltaImporter(upload_history.import_configuration)
+    _ingest_in_chunks(upload_history.id, chunks, importer.apply_chunk)
+    DataUploadHistory.objects.filter(id=upload_history.id).update(records_removed=importer.finish())
+
+
+def _stream_configured_import(fetcher, configuration, remote_path, entry):
+    """
+    Import a CSV feed while it downloads: the transfer, the CSV parser and
+    the delta writes run on three threads linked by bounded buffers, so a
+    feed takes about as long as its slowest stage. Runs on a fetch worker
+    thread and returns the FetchResult.
+    """
+    upload_history = DataUploadHistory.objects.create(
+        upload_type='FTP',
+        file_name=remote_path,
+        status='PENDING',
+        import_options={'kind': 'delta', 'configuration': configuration.id, 'streamed': True},
+        import_configuration=configuration
+    )
+
+    def consume(reader):
+        chunks = prefetch(
+            iter_csv_stream(reader, entry.name, columns=_read_columns('products', configuration.column_mapping)),
+            settings.REMOTE_STREAM_MAX_CHUNKS
+        )
+        try:
+            _apply_delta(upload_history, chunks)
+        finally:
+            chunks.close()
+
     try:
-        # Read file based on extension
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
+        local_path, content_hash = fetcher.download_streaming(configuration, remote_path, consume)
+        manifest = manifest_entry(entry, content_hash)
+        upload_history.refresh_from_db()
+        upload_history.file_name = os.path.relpath(local_path, UPLOAD_DIR)
+        upload_history.content_hash = content_hash
+        upload_history.import_options['remote'] = {'name': entry.name, 'manifest': manifest}
+        upload_history.save(update_fields=['file_name', 'content_hash', 'import_options'])
+        record_consumed_file(configuration.id, entry.name, manifest)
+        _finish_upload(upload_history)
+        return FetchResult(configuration, remote_path, local_path, content_hash, entry, imported=True)
+    except Exception as e:
+        logger.error(f"Streaming import of {remote_path} for {configuration} failed: {str(e)}")
+        upload_history.refresh_from_db()
+        _finish_upload(upload_history, str(e))
+        return FetchResult(configuration, remote_path, entry=entry, error=str(e), imported=True)
+    finally:
+        # Worker threads open their own database connection
+        connection.close()
+
+
+@shared_task
+def fetch_remote_imports(configuration_ids=None, import_inline=False, stream=None):
+    """
+    Collect the feeds of the active FTP/SFTP import configurations in
+    parallel and queue a delta import for each file as soon as it lands
+    (or run it in this task with import_inline, as scheduled runs do).
+    With stream (default REMOTE_STREAM_IMPORTS) CSV feeds are imported
+    while they download instead.
+    """
+    if stream is None:
+        stream = settings.REMOTE_STREAM_IMPORTS
+    configurations = ImportConfiguration.objects.filter(is_active=True, import_type__in=['FTP', 'SFTP'])
+    if configuration_ids:
+        configurations = configurations.filter(id__in=configuration_ids)
+
+    ready = []
+    for configuration in configurations:
+        if configuration.column_mapping.get('sku'):
+            ready.append(configuration)
         else:
-            df = pd.read_excel(file_path)
+            logger.warning(f"Skipping {configuration}: no column mapping for 'sku'")
+
+    def queue_import(fetched):
+        if fetched.imported:
+            return
+        if fetched.unchanged:
+            if fetched.content_hash:
+                # Touched but identical content, remember the new size/mtime without importing
+                record_consumed_file(
+                    fetched.configuration.id, fetched.entry.name,
+                    manifest_entry(fetched.entry, fetched.content_hash)
+                )
+            return
+
+        import_options = {'kind': 'delta', 'configuration': fetched.configuration.id}
+        if fetched.entry:
+            # Recorded in the manifest only once the import succeeds
+            import_options['remote'] = {
+                'name': fetched.entry.name,
+                'manifest': manifest_entry(fetched.entry, fetched.content_hash)
+            }
+        upload_history = DataUploadHistory.objects.create(
+            upload_type='FTP',
+            file_name=os.path.relpath(fetched.local_path, UPLOAD_DIR) if fetched.local_path else fetched.remote_path,
+            status='FAILED' if fetched.error else 'PENDING',
+            error_message=fetched.error or '',
+            content_hash=fetched.content_hash or '',
+            import_options=import_options,
+            import_configuration=fetched.configuration
+        )
+        if fetched.error:
+            return
+        if not import_inline:
+            process_configured_import.delay(upload_history.id, fetched.local_path)
+            return
+        try:
+            process_configured_import(upload_history.id, fetched.local_path)
+        except Exception:
+            # Already recorded on the upload, carry on with the other feeds
+            pass
+
+    results = RemoteFetcher(os.path.join(UPLOAD_DIR, 'feeds')).fetch(
+        ready, on_fetched=queue_import, on_stream=_stream_configured_import if stream else None
+    )
+    failed = sum(1 for result in results if result.error)
+    unchanged = sum(1 for result in results if result.unchanged)
+    fetched = len(results) - failed - unchanged
+    logger.info(f"Fetched {fetched} remote feeds, {unchanged} unchanged, {failed} failed")
+    return {'fetched': fetched, 'unchanged': unchanged, 'failed': failed}
+
 
+@shared_task
+def run_web_scraper(scraper_id, user_id=None, full=False):
+    """
+    Crawl the pages of a WebScraperConfig and upsert the extracted products
+    through the same engine as file imports. The run is recorded as a
+    SCRAPE upload, with pages/sec, fetch errors and latency percentiles
+    in its metrics. Pages unchanged since the last run are skipped, unless
+    full is set.
+    """
+    config = WebScraperConfig.objects.get(id=scraper_id)
+    upload_history = DataUploadHistory.objects.create(
+        upload_type='SCRAPE',
+        file_name=config.url,
+        uploaded_by_id=user_id,
+        status='PROCESSING',
+        import_options={'kind': 'scrape', 'scraper': config.id, 'full': full}
+    )
+
+    try:
+        spec = ScraperSpec(config.selectors)
+        cache = PageCache(config.id, config.selectors)
+        if not full:
+            cache.load()
+        rows, metrics = Scraper(spec, cache).run(config.url)
+        upload_history.metrics = metrics.as_dict()
+        upload_history.error_message = ''.join(f"{error}\n" for error in metrics.errors)
+        upload_history.save(update_fields=['metrics', 'error_message'])
+        logger.info(
+            f"Scraped {metrics.pages} pages of {config} ({metrics.unchanged} unchanged) into {len(rows)} rows, "
+            f"{len(metrics.errors)} errors ({upload_history.metrics['pages_per_sec']} pages/s)"
+        )
+        if not metrics.pages:
+            raise ValueError(f"No page of {config.url} could be fetched")
+
+        start_progress(upload_history.id, len(rows))
+        importer = importer_for(spec.column_mapping, user=upload_history.uploaded_by, reason=f'Scraper: {config.name}')
+        failed_pages = set()
+
+        def apply_chunk(chunk):
+            result = importer.run(chunk)
+            failed_pages.update(chunk.loc[result.failed_rows, PAGE_COLUMN])
+            return result
+
+        frame = pd.DataFrame(rows)
+        chunk_size = settings.IMPORT_CHUNK_SIZE
+        chunks = (frame.iloc[start:start + chunk_size] for start in range(0, len(frame), chunk_size))
+        _ingest_in_chunks(upload_history.id, chunks, apply_chunk)
+
+        # Pages with rows that failed are read again next time
+        cache.save(exclude=failed_pages)
+        config.last_run = timezone.now()
+        config.save(update_fields=['last_run'])
+
+        upload_history.refresh_from_db()
+        _finish_upload(upload_history)
+
+    except Exception as e:
+        upload_history.refresh_from_db()
+        _finish_upload(upload_history, str(e))
+        raise
+
+
+@shared_task
+def dispatch_scheduled_jobs():
+    """
+    Run every minute by Celery beat: dispatch the configurations whose cron
+    schedule is due, each with a random delay so jobs due at the same
+    minute are spread out.
+    """
+    now = timezone.now()
+    dispatched = 0
+
+    for kind, (queryset, _) in SCHEDULED_JOBS.items():
+        for config in queryset.filter(is_active=True).exclude(schedule=''):
+            try:
+                schedule = parse_cron(config.schedule)
+                next_run = next_occurrence(schedule, now)
+            except ValueError as e:
+                logger.warning(f"Not scheduling {config}: {str(e)}")
+                continue
+
+            if config.next_run is None:
+                # First sight of this schedule, start counting from now
+                queryset.filter(id=config.id, next_run__isnull=True).update(next_run=next_run)
+                continue
+            if config.next_run > now:
+                continue
+
+            # Only the beat that moves next_run forward dispatches the run
+            if queryset.filter(id=config.id, next_run=config.next_run).update(next_run=next_run):
+                run_scheduled_job.apply_async(
+                    (kind, config.id),
+                    countdown=random.uniform(0, settings.SCHEDULER_MAX_JITTER)
+                )
+                dispatched += 1
+
+    return dispatched
+
+
+@shared_task(bind=True, max_retries=None)
+def run_scheduled_job(self, kind, config_id, **options):
+    """
+    Run one scheduled or manually triggered job, passing options to the
+    job function. A configuration never runs twice at the same time, and
+    at most SCHEDULER_MAX_CONCURRENT_JOBS jobs run at once across all
+    workers; jobs over the budget are retried a little later.
+    """
+    if not acquire_job_lock(kind, config_id):
+        logger.info(f"Skipping scheduled {kind} {config_id}: previous run still in progress")
+        return
+
+    try:
+        slot = acquire_budget_slot()
+        if slot is None:
+            raise self.retry(countdown=settings.SCHEDULER_RETRY_DELAY * random.uniform(1, 2))
+        try:
+            SCHEDULED_JOBS[kind][1](config_id, **options)
+        finally:
+            release_budget_slot(slot)
+    finally:
+        release_job_lock(kind, config_id)
+
+
+def _run_scheduled_import(configuration_id):
+    fetch_remote_imports([configuration_id], import_inline=True)
+
+
+# Scheduled configurations and the function running one of them
+SCHEDULED_JOBS = {
+    'import': (ImportConfiguration.objects.filter(import_type__in=['FTP', 'SFTP']), _run_scheduled_import),
+    'scraper': (WebScraperConfig.objects.all(), run_web_scraper),
+}
+
+
+@shared_task(acks_late=True)
+def process_upload_shard(upload_history_id, shard_file, kind, shard_index, shard_count, column_mapping=None):
+    """
+    Apply the rows of one shard of a sharded upload, read from the shard
+    file split_upload wrote for it. All rows of a SKU are in one shard, in
+    file order, so they are applied exactly as a single task would.
+
+    Counters and the checkpoint are kept on the shard's own UploadShard row,
+    committed with each chunk, so shards never contend on the upload record
+    and a re-delivered shard resumes after its last committed chunk instead
+    of applying rows (and stock movements) twice. Whatever stops a shard is
+    recorded on it and the shard still completes, so the others are merged
+    and the last shard to finish closes the upload.
+    """
+    error = ''
+    try:
+        shard, _ = UploadShard.objects.get_or_create(upload_id=upload_history_id, index=shard_index)
+        if shard.completed:
+            _close_sharded_upload(upload_history_id, shard_count)
+            return
+        if not _apply_shard(shard, shard_file, kind, column_mapping):
+            logger.info(f"Shard {shard_index} of upload {upload_history_id} is run by another worker")
+            return
+    except Exception as e:
+        logger.error(f"Shard {shard_index} of upload {upload_history_id} failed: {str(e)}")
+        error = f"Shard {shard_index + 1}/{shard_count}: {str(e)}"
+
+    UploadShard.objects.update_or_create(
+        upload_id=upload_history_id, index=shard_index, defaults={'completed': True, 'error': error}
+    )
+    _discard_file(shard_file)
+    _close_sharded_upload(upload_history_id, shard_count)
+
+
+def _apply_shard(shard, shard_file, kind, column_mapping=None):
+    """Apply the chunks of a shard file after its checkpoint; False when another worker took a chunk first"""
+    committed = _rows_before(iter_chunk_file(shard_file), shard.checkpoint_row)
+    apply_chunk = _chunk_applier(shard.upload_id, kind, column_mapping, replay=committed)
+    position = shard.checkpoint_row
+    for chunk in iter_chunk_file(shard_file, skip_rows=position):
+        end = chunk.index[-1] + 1
         with transaction.atomic():
-            records_processed = 0
-            records_failed = 0
-
-            for _, row in df.iterrows():
-                try:
-                    product = Product.objects.get(sku=row['sku'])
-                    
-                    # Update or create stock record
-                    stock, created = Stock.objects.update_or_create(
-                        product=product,
-                        defaults={
-                            'quantity': row['quantity'],
-                            'location': row.get('location', 'Default')
-                        }
-                    )
+            # Moving the checkpoint first locks the shard row: a copy of this shard
+            # running at the same time waits here, then finds the chunk taken and stops
+            if not UploadShard.objects.filter(id=shard.id, checkpoint_row=position).update(checkpoint_row=end):
+                return False
+            result = apply_chunk(chunk)
+            UploadShard.objects.filter(id=shard.id).update(
+                records_processed=F('records_processed') + result.processed,
+                records_failed=F('records_failed') + result.failed,
+                records_inserted=F('records_inserted') + result.created,
+                records_updated=F('records_updated') + result.updated,
+                error_message=Concat(F('error_message'), Value(result.error_message))
+            )
+        record_progress(shard.upload_id, result.processed, result.failed)
+        position = end
+    return True
 
-                    # Create stock movement record
-                    StockMovement.objects.create(
-                        product=product,
-                        movement_type='ADJUST',
-                        quantity=row['quantity'],
-                        reference_number=f'FILE-UPLOAD-{upload_history_id}',
-                        notes='Updated via file upload'
+
+def _close_sharded_upload(upload_history_id, shard_count):
+    """Once every shard has completed, sum their counters into the upload record and close it"""
+    with transaction.atomic():
+        # The lock makes shards finishing at the same time close the upload only once
+        upload_history = DataUploadHistory.objects.select_for_update().get(id=upload_history_id)
+        shards = list(upload_history.shards.filter(completed=True).order_by('index'))
+        if upload_history.status != 'PROCESSING' or len(shards) < shard_count:
+            return
+
+        upload_history.records_processed = sum(shard.records_processed for shard in shards)
+        upload_history.records_failed = sum(shard.records_failed for shard in shards)
+        upload_history.records_inserted = sum(shard.records_inserted for shard in shards)
+        upload_history.records_updated = sum(shard.records_updated for shard in shards)
+        upload_history.error_message = ''.join(shard.error_message for shard in shards)
+        upload_history.save()
+
+        set_progress(upload_history_id, upload_history.records_processed, upload_history.records_failed)
+        shard_errors = [shard.error for shard in shards if shard.error]
+        _finish_upload(upload_history, '; '.join(shard_errors) if shard_errors else None)
+
+
+def plan_shards(total_rows, data_offset=0):
+    """
+    Number of parallel shards for an upload: one per IMPORT_SHARD_SIZE
+    rows, at most IMPORT_MAX_SHARDS. Returns None when the file is small
+    enough (or its size unknown) to be processed by a single task.
+    """
+    shard_size = settings.IMPORT_SHARD_SIZE
+    if not shard_size or total_rows is None or total_rows - data_offset <= shard_size:
+        return None
+    return min(math.ceil((total_rows - data_offset) / shard_size), settings.IMPORT_MAX_SHARDS)
+
+
+def shard_of(skus, shard_count):
+    """
+    The shard (0 to shard_count - 1) of each SKU of a column. The hash is
+    the same in every process, and SKUs are normalized as the importers
+    do, so a SKU written as 123 or 123.0 lands in the same shard.
+    """
+    keys = skus.map(to_text, na_action='ignore').fillna('')
+    return pd.Series(hash_pandas_object(keys, index=False).to_numpy() % shard_count, index=skus.index)
+
+
+def split_upload(file_path, shard_count, kind, column_mapping=None,
+                 chunk_size=None, header_row=0, data_offset=0):
+    """
+    Read an upload once and write the rows of each shard (see shard_of) to
+    a shard file of its own, in file order, in chunks of about chunk_size
+    rows. Returns the shard file paths. Files are written under temporary
+    names and moved into place, so a shard never reads a partial file.
+    """
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    paths = [shard_path(file_path, index) for index in range(shard_count)]
+    files = [open(f'{path}.part', 'wb') for path in paths]
+    pending = [[] for _ in paths]
+
+    def flush(index):
+        if pending[index]:
+            append_chunk(files[index], pd.concat(pending[index]))
+            pending[index] = []
+
+    try:
+        chunks = iter_file_chunks(
+            file_path, chunk_size, skip_rows=data_offset, header_row=header_row,
+            columns=_read_columns(kind, column_mapping)
+        )
+        for chunk in chunks:
+            for index, rows in chunk.groupby(_shards(chunk, kind, column_mapping, shard_count), sort=False):
+                pending[index].append(rows)
+                if sum(len(piece) for piece in pending[index]) >= chunk_size:
+                    flush(index)
+        for index in range(shard_count):
+            flush(index)
+    except BaseException:
+        for path in paths:
+            _discard_file(f'{path}.part')
+        raise
+    finally:
+        for f in files:
+            f.close()
+    for path in paths:
+        os.replace(f'{path}.part', path)
+    return paths
+
+
+def shard_path(file_path, shard_index):
+    return f'{file_path}.shard{shard_index}'
+
+
+def _shards(chunk, kind, column_mapping, shard_count):
+    """The shard of each row of a chunk"""
+    column = 'sku' if kind == 'stock' else column_mapping.get('sku')
+    if column not in chunk.columns:
+        # The importer reports the missing column, once
+        return pd.Series(0, index=chunk.index)
+    return shard_of(chunk[column], shard_count)
+
+
+def _rows_before(chunks, end_row):
+    """The rows of chunks before end_row"""
+    for chunk in chunks:
+        if not len(chunk) or chunk.index[0] >= end_row:
+            return
+        yield chunk[chunk.index < end_row]
+
+
+def _discard_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _read_columns(kind, column_mapping=None):
+    """File columns an upload needs, so readers can skip the others"""
+    if kind == 'stock':
+        return STOCK_COLUMNS
+    return [column for column in column_mapping.values() if column]
+
+
+def _chunk_applier(upload_history_id, kind, column_mapping=None, replay=()):
+    """
+    The function applying one chunk of an upload. The chunks of a product
+    import share one importer, which catches duplicate SKUs across them;
+    when resuming, the rows committed before the checkpoint are given as
+    replay and validated again (not written) so it knows their SKUs.
+    """
+    if kind == 'stock':
+        reference_number = f'FILE-UPLOAD-{upload_history_id}'
+        return lambda chunk: apply_stock_chunk(chunk, reference_number)
+    importer = importer_for(column_mapping, user=_uploader(upload_history_id), reason=f'File upload {upload_history_id}')
+    for chunk in replay:
+        importer.prepare(chunk)
+    return importer.run
+
+
+def _copy_ingester(upload_history_id, kind, column_mapping=None):
+    if kind == 'stock':
+        return StockCopyIngester(f'FILE-UPLOAD-{upload_history_id}', key=upload_history_id)
+    return ProductCopyIngester(
+        column_mapping, key=upload_history_id,
+        user=_uploader(upload_history_id), reason=f'File upload {upload_history_id}'
+    )
+
+
+def _uploader(upload_history_id):
+    # Price changes are logged in PriceHistory on behalf of the uploader
+    return DataUploadHistory.objects.select_related('uploaded_by').get(id=upload_history_id).uploaded_by
+
+
+def _process_upload(upload_history_id, file_path, kind, column_mapping=None,
+                    chunk_size=None, header_row=0, data_offset=0):
+    """
+    Run an upload with the ingest mode chosen for it, keeping its status,
+    live progress and notifications up to date. Large ORM uploads are
+    fanned out to parallel shards, the last of which closes the upload.
+    """
+    upload_history = DataUploadHistory.objects.get(id=upload_history_id)
+    if upload_history.status == 'COMPLETED':
+        return
+
+    try:
+        if upload_history.checkpoint_row:
+            logger.info(f"Resuming upload {upload_history_id} from row {upload_history.checkpoint_row}")
+        upload_history.status = 'PROCESSING'
+        upload_history.save(update_fields=['status'])
+
+        total_rows = count_data_rows(file_path, header_row)
+        start_progress(upload_history_id, total_rows)
+
+        if upload_history.ingest_mode == 'COPY':
+            chunks = iter_file_chunks(
+                file_path, chunk_size, skip_rows=data_offset, header_row=header_row,
+                columns=_read_columns(kind, column_mapping)
+            )
+            _ingest_with_copy(upload_history_id, chunks, _copy_ingester(upload_history_id, kind, column_mapping))
+        else:
+            shard_count = None if upload_history.checkpoint_row else plan_shards(total_rows, data_offset)
+            if shard_count:
+                # Split the file once: a re-delivered upload whose shards already started re-dispatches
+                # them (each resumes from its checkpoint) without rewriting their files
+                if not upload_history.shards.exists():
+                    logger.info(f"Splitting upload {upload_history_id} into {shard_count} shards")
+                    split_upload(
+                        file_path, shard_count, kind, column_mapping,
+                        chunk_size=chunk_size, header_row=header_row, data_offset=data_offset
+                    )
+                group(
+                    process_upload_shard.s(
+                        upload_history_id, shard_path(file_path, shard_index), kind, shard_index, shard_count,
+                        column_mapping=column_mapping
                     )
+                    for shard_index in range(shard_count)
+                ).delay()
+                return
 
-                    records_processed += 1
-                except Exception as e:
-                    records_failed += 1
-                    logger.error(f"Error processing row: {row}, Error: {str(e)}")
+            record_progress(upload_history_id, upload_history.records_processed, upload_history.records_failed)
+            columns = _read_columns(kind, column_mapping)
+            skip_rows = max(upload_history.checkpoint_row, data_offset)
+            committed = _rows_before(
+                iter_file_chunks(file_path, chunk_size, skip_rows=data_offset, header_row=header_row, columns=columns),
+                skip_rows
+            )
+            chunks = iter_file_chunks(file_path, chunk_size, skip_rows=skip_rows, header_row=header_row, columns=columns)
+            _ingest_in_chunks(
+                upload_history_id, chunks, _chunk_applier(upload_history_id, kind, column_mapping, replay=committed)
+            )
 
-            upload_history.records_processed = records_processed
-            upload_history.records_failed = records_failed
-            upload_history.status = 'COMPLETED'
-            upload_history.save()
+        upload_history.refresh_from_db()
+        _finish_upload(upload_history)
 
     except Exception as e:
-        upload_history.status = 'FAILED'
-        upload_history.error_message = str(e)
-        upload_history.save()
-        logger.error(f"File processing failed: {str(e)}")
+        upload_history.refresh_from_db()
+        _finish_upload(upload_history, str(e))
         raise
 
 
+def _finish_upload(upload_history, error=None):
+    """Set the final status of an upload and notify the user who uploaded it"""
+    if error:
+        upload_history.status = 'FAILED'
+        upload_history.error_message = error if not upload_history.error_message else \
+            f"{upload_history.error_message}{error}"
+        logger.error(f"File processing failed: {error}")
+    else:
+        upload_history.status = 'COMPLETED'
+    upload_history.save()
+    finish_progress(upload_history.id, upload_history.status)
+
+    if not upload_history.uploaded_by:
+        return
+    if error:
+        Notification.objects.create(
+            type='UPLOAD_FAILED',
+            message=f'Failed to process file "{upload_history.file_name}": {error}',
+            user=upload_history.uploaded_by
+        )
+    else:
+        Notification.objects.create(
+            type='UPLOAD_COMPLETE',
+            message=f'File "{upload_history.file_name}" processed: '
+                    f'{upload_history.records_processed} records processed, '
+                    f'{upload_history.records_failed} failed',
+            user=upload_history.uploaded_by
+        )
+
+
+def _ingest_in_chunks(upload_history_id, chunks, apply_chunk):
+    """
+    Apply chunks one at a time through the ORM.
+
+    Each chunk is committed in its own transaction together with the upload
+    counters and checkpoint, so a crash mid-file keeps the work done so far
+    and re-running the task resumes after the last committed row.
+    """
+    for chunk in chunks:
+        with transaction.atomic():
+            result = apply_chunk(chunk)
+            DataUploadHistory.objects.filter(id=upload_history_id).update(
+                records_processed=F('records_processed') + result.processed,
+                records_failed=F('records_failed') + result.failed,
+                records_inserted=F('records_inserted') + result.created,
+                records_updated=F('records_updated') + result.updated,
+                error_message=Concat(F('error_message'), Value(result.error_message)),
+                checkpoint_row=chunk.index[-1] + 1 if len(chunk) else F('checkpoint_row')
+            )
+        record_progress(upload_history_id, result.processed, result.failed)
+
+
+def _ingest_with_copy(upload_history_id, chunks, ingester):
+    """Stage all chunks with COPY and merge them in one set-based transaction"""
+    result = ingester.run(chunks, on_chunk=lambda rows: record_progress(upload_history_id, rows, 0))
+    DataUploadHistory.objects.filter(id=upload_history_id).update(
+        records_processed=result.processed,
+        records_failed=result.failed,
+        records_inserted=result.created,
+        records_updated=result.updated,
+        error_message=result.error_message
+    )
+    set_progress(upload_history_id, result.processed, result.failed)
+
+
 @shared_task
 def check_stock_levels():
     """Check stock levels and create notifications for low/high stock"""
-    low_stock = Stock.objects.filter(quantity__lte=models.F('minimum_threshold'))
-    high_stock = Stock.objects.filter(quantity__gte=models.F('maximum_threshold'))
+    low_stock = Stock.objects.filter(quantity__lte=F('minimum_threshold'))
+    high_stock = Stock.objects.filter(quantity__gte=F('maximum_threshold'))
 
     # Process low stock alerts
     for stock in low_stock:
@@ -97,6 +741,10 @@ def check_stock_levels():
 @shared_task
 def send_stock_report():
     """Generate and send daily stock report"""
+    if not settings.ADMIN_EMAIL:
+        logger.warning("ADMIN_EMAIL is not set, daily stock report not sent")
+        return
+
     today = timezone.now().date()
     
     # Get today's stock movements
@@ -129,6 +777,12 @@ def send_stock_report():
         raise
 
 
+@shared_task
+def refresh_dashboard_metrics():
+    """Recompute the cached dashboard metrics snapshot"""
+    refresh_snapshot()
+
+
 @shared_task
 def clean_old_notifications():
     """Clean up old notifications"""
@@ -139,6 +793,73 @@ def clean_old_notifications():
     ).delete()
 
 
+@shared_task
+def run_product_export(job_id):
+    """
+    Write the products matching an ExportJob's filters to a file in the
+    export directory, chunk by chunk, with live progress in Redis. The
+    file appears under its final name only once it is complete.
+    """
+    job = ExportJob.objects.get(id=job_id)
+    ExportJob.objects.filter(id=job_id).update(status='PROCESSING')
+    _, extension, writer = EXPORT_FORMATS[job.export_format]
+    job.file_name = f'products-{job.id}.{extension}'
+    file_path = export_path(job)
+    partial_path = f'{file_path}.part'
+    written = 0
+
+    def counted(chunks):
+        nonlocal written
+        for chunk in chunks:
+            yield chunk
+            written += len(chunk)
+            record_progress(job.id, len(chunk), 0, kind=EXPORT)
+
+    try:
+        queryset = filtered_products(job.filters)
+        with search_transaction(queryset.db):
+            total = queryset.count()
+        ExportJob.objects.filter(id=job_id).update(rows_total=total)
+        start_progress(job.id, total, kind=EXPORT)
+
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        with open(partial_path, 'wb') as destination:
+            for data in writer(counted(export_rows(queryset))):
+                destination.write(data)
+        os.replace(partial_path, file_path)
+
+        ExportJob.objects.filter(id=job_id).update(
+            status='COMPLETED',
+            rows_written=written,
+            file_name=job.file_name,
+            file_size=os.path.getsize(file_path),
+            completed_at=timezone.now()
+        )
+        finish_progress(job.id, 'COMPLETED', kind=EXPORT)
+        logger.info(f"Export {job.id}: {written} products written to {job.file_name}")
+    except Exception as e:
+        logger.error(f"Export {job.id} failed: {str(e)}")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        ExportJob.objects.filter(id=job_id).update(
+            status='FAILED', rows_written=written, error_message=str(e), completed_at=timezone.now()
+        )
+        finish_progress(job.id, 'FAILED', kind=EXPORT)
+
+
+@shared_task
+def clean_old_exports():
+    """Delete export jobs, and their files, older than EXPORT_RETENTION_HOURS"""
+    cutoff = timezone.now() - timezone.timedelta(hours=settings.EXPORT_RETENTION_HOURS)
+    old_jobs = ExportJob.objects.filter(created_at__lt=cutoff).exclude(status__in=['PENDING', 'PROCESSING'])
+    for job in old_jobs.exclude(file_name=''):
+        try:
+            os.remove(export_path(job))
+        except FileNotFoundError:
+            pass
+    old_jobs.delete()
+
+
 @shared_task
 def process_stock_adjustment(movement_id):
     """Process stock adjustment asynchronously"""
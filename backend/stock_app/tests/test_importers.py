@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+import pandas as pd
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..importers import ProductImporter
+from ..models import PriceHistory, Product, Supplier
+
+# The mapping of a scraped shop page, see scraping.extract
+MAPPING = {'sku': 'sku', 'name': 'name', 'unit_price': 'unit_price'}
+
+
+def writes(queries):
+    return [query['sql'] for query in queries if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+
+class ProductImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = Supplier.objects.create(name='Acme', email='acme@example.com', phone='1', address='Main St')
+        for sku, name, price in [('SKU-1', 'Kettle', '19.90'), ('SKU-2', 'Toaster', '34.50')]:
+            Product.objects.create(sku=sku, name=name, description='', supplier=cls.supplier, unit_price=Decimal(price))
+
+    def test_unchanged_batch_writes_nothing(self):
+        df = pd.DataFrame({'sku': ['SKU-1', 'SKU-2'], 'name': ['Kettle', 'Toaster'], 'unit_price': ['19.90', '34.5']})
+
+        with CaptureQueriesContext(connection) as queries:
+            result = ProductImporter(MAPPING).run(df)
+
+        self.assertEqual(writes(queries.captured_queries), [])
+        self.assertEqual((result.processed, result.unchanged, result.updated, result.failed), (2, 2, 0, 0))
+
+    def test_only_changed_rows_are_written(self):
+        before = Product.objects.get(sku='SKU-1').updated_at
+        df = pd.DataFrame({'sku': ['SKU-1', 'SKU-2'], 'name': ['Kettle', 'Toaster'], 'unit_price': ['19.90', '29.99']})
+
+        result = ProductImporter(MAPPING).run(df)
+
+        self.assertEqual((result.processed, result.unchanged, result.updated), (2, 1, 1))
+        self.assertEqual(Product.objects.get(sku='SKU-1').updated_at, before)
+        self.assertEqual(Product.objects.get(sku='SKU-2').unit_price, Decimal('29.99'))
+        history = PriceHistory.objects.filter(product__supplier=self.supplier)
+        self.assertEqual(
+            list(history.values_list('product__sku', 'old_price', 'new_price')),
+            [('SKU-2', Decimal('34.50'), Decimal('29.99'))]
+        )
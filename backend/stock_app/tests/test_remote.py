@@ -0,0 +1,263 @@
+import hashlib
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+import paramiko
+from django.test import SimpleTestCase, override_settings
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import ThreadedFTPServer
+
+from ..models import ImportConfiguration
+from ..remote import FTPClient, RemoteFetcher, manifest_entry
+from ..remote.clients import RemoteEntry
+
+FEED = b'sku,quantity\nA-1,5\nA-2,7\n'
+
+
+class NoMLSDHandler(FTPHandler):
+    # A server without MLSD, listings go through NLST and SIZE/MDTM
+    proto_cmds = {command: info for command, info in FTPHandler.proto_cmds.items() if command != 'MLSD'}
+
+
+def write_file(directory, name, content, mtime):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(content)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+class FTPServerMixin:
+    """A local FTP server on a free port serving cls.root, started once per test class"""
+    handler = FTPHandler
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(cls.root, 'feeds'))
+        authorizer = DummyAuthorizer()
+        authorizer.add_user('feeds', 'secret', cls.root, perm='elr')
+        handler = type('Handler', (cls.handler,), {'authorizer': authorizer})
+        logging.getLogger('pyftpdlib').setLevel(logging.WARNING)
+        cls.server = ThreadedFTPServer(('127.0.0.1', 0), handler)
+        cls.port = cls.server.address[1]
+        cls.thread = threading.Thread(target=cls.server.serve_forever, kwargs={'timeout': 0.1}, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close_all()
+        cls.thread.join()
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.feeds = os.path.join(self.root, 'feeds')
+        for name in os.listdir(self.feeds):
+            os.remove(os.path.join(self.feeds, name))
+        self.download_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.download_dir)
+
+    def configuration(self, remote_path='feeds/', manifest=None):
+        return ImportConfiguration(
+            id=1, name='feed', import_type='FTP', host='127.0.0.1', port=self.port,
+            username='feeds', password='secret', remote_path=remote_path,
+            remote_manifest=manifest or {}
+        )
+
+    def ftp_client(self):
+        client = FTPClient('127.0.0.1', self.port, 'feeds', 'secret', timeout=10)
+        self.addCleanup(client.close)
+        return client
+
+
+class FTPListingTests(FTPServerMixin, SimpleTestCase):
+    def test_mlsd_listing_has_sizes_and_times(self):
+        write_file(self.feeds, 'stock.csv', FEED, 1700000000)
+        os.mkdir(os.path.join(self.feeds, 'archive'))
+        self.addCleanup(os.rmdir, os.path.join(self.feeds, 'archive'))
+
+        entries = self.ftp_client().list_files('feeds')
+
+        self.assertEqual(entries, [RemoteEntry('stock.csv', len(FEED), 1700000000)])
+
+
+class FTPWithoutMLSDTests(FTPServerMixin, SimpleTestCase):
+    handler = NoMLSDHandler
+
+    def test_falls_back_to_nlst(self):
+        write_file(self.feeds, 'stock.csv', FEED, 1700000000)
+
+        entries = self.ftp_client().list_files('feeds')
+
+        self.assertEqual(entries, [RemoteEntry('stock.csv', len(FEED), 1700000000)])
+
+    def test_newest_feed_is_fetched(self):
+        write_file(self.feeds, 'stock_1.csv', b'sku,quantity\nOLD,1\n', 1700000000)
+        write_file(self.feeds, 'stock_2.csv', FEED, 1700003600)
+        write_file(self.feeds, 'stock_3.txt', b'not a feed', 1700007200)
+
+        [result] = RemoteFetcher(self.download_dir).fetch([self.configuration('feeds/stock_*')])
+
+        self.assertIsNone(result.error)
+        self.assertEqual(result.remote_path, 'feeds/stock_2.csv')
+        with open(result.local_path, 'rb') as f:
+            self.assertEqual(f.read(), FEED)
+
+    def test_feed_in_manifest_is_not_downloaded(self):
+        write_file(self.feeds, 'stock.csv', FEED, 1700000000)
+        manifest = {'stock.csv': manifest_entry(RemoteEntry('stock.csv', len(FEED), 1700000000), 'checksum')}
+
+        [result] = RemoteFetcher(self.download_dir).fetch([self.configuration(manifest=manifest)])
+
+        self.assertTrue(result.unchanged)
+        self.assertIsNone(result.local_path)
+
+
+class FTPFetchTests(FTPServerMixin, SimpleTestCase):
+    def test_feed_is_downloaded_and_hashed(self):
+        write_file(self.feeds, 'stock_b.csv', FEED, 1700003600)
+        write_file(self.feeds, 'stock_a.csv', b'sku,quantity\nOLD,1\n', 1700000000)
+
+        [result] = RemoteFetcher(self.download_dir).fetch([self.configuration()])
+
+        self.assertEqual(result.remote_path, 'feeds/stock_b.csv')
+        self.assertEqual(result.content_hash, hashlib.sha256(FEED).hexdigest())
+        self.assertFalse(result.unchanged)
+        self.assertEqual(os.listdir(os.path.dirname(result.local_path)), ['stock_b.csv'])
+
+    def test_feed_in_manifest_is_not_downloaded(self):
+        write_file(self.feeds, 'stock.csv', FEED, 1700000000)
+        manifest = {'stock.csv': manifest_entry(RemoteEntry('stock.csv', len(FEED), 1700000000), 'checksum')}
+
+        [result] = RemoteFetcher(self.download_dir).fetch([self.configuration(manifest=manifest)])
+
+        self.assertTrue(result.unchanged)
+        self.assertIsNone(result.local_path)
+        self.assertFalse(os.path.exists(os.path.join(self.download_dir, '1')))
+
+    def test_touched_feed_with_same_content_is_unchanged(self):
+        write_file(self.feeds, 'stock.csv', FEED, 1700003600)
+        checksum = hashlib.sha256(FEED).hexdigest()
+        manifest = {'stock.csv': manifest_entry(RemoteEntry('stock.csv', len(FEED), 1700000000), checksum)}
+
+        [result] = RemoteFetcher(self.download_dir).fetch([self.configuration(manifest=manifest)])
+
+        self.assertIsNotNone(result.local_path)
+        self.assertEqual(result.content_hash, checksum)
+        self.assertTrue(result.unchanged)
+
+    def test_missing_feed_is_an_error(self):
+        [result] = RemoteFetcher(self.download_dir).fetch([self.configuration('feeds/stock.csv')])
+
+        self.assertEqual(result.error, 'No file matches feeds/stock.csv')
+
+
+class SFTPServer(paramiko.ServerInterface):
+    def check_auth_password(self, username, password):
+        if (username, password) == ('feeds', 'secret'):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+class LocalSFTP(paramiko.SFTPServerInterface):
+    """Read-only SFTP over a local directory, enough for listing and downloading"""
+    root = None
+
+    def _path(self, path):
+        return os.path.join(self.root, os.path.normpath('/' + path).lstrip('/'))
+
+    def list_folder(self, path):
+        directory = self._path(path)
+        entries = []
+        for name in os.listdir(directory):
+            attributes = paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(directory, name)))
+            attributes.filename = name
+            entries.append(attributes)
+        return entries
+
+    def stat(self, path):
+        return paramiko.SFTPAttributes.from_stat(os.stat(self._path(path)))
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        handle = paramiko.SFTPHandle(flags)
+        handle.readfile = open(self._path(path), 'rb')
+        return handle
+
+
+class SFTPFetchTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(cls.root, 'feeds'))
+        cls.host_key = paramiko.RSAKey.generate(2048)
+        cls.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        cls.listener.bind(('127.0.0.1', 0))
+        cls.listener.listen(5)
+        cls.port = cls.listener.getsockname()[1]
+        cls.transports = []
+        cls.thread = threading.Thread(target=cls.serve, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def serve(cls):
+        sftp = type('SFTP', (LocalSFTP,), {'root': cls.root})
+        while True:
+            try:
+                connection, _ = cls.listener.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(connection)
+            transport.add_server_key(cls.host_key)
+            transport.set_subsystem_handler('sftp', paramiko.SFTPServer, sftp)
+            transport.start_server(server=SFTPServer())
+            cls.transports.append(transport)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Shutting the listener down wakes the accept() waiting in serve()
+        cls.listener.shutdown(socket.SHUT_RDWR)
+        cls.listener.close()
+        cls.thread.join()
+        for transport in cls.transports:
+            transport.close()
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.download_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.download_dir)
+
+    @override_settings(REMOTE_SFTP_TRUST_UNKNOWN_HOSTS=True)
+    def test_newest_feed_is_fetched(self):
+        feeds = os.path.join(self.root, 'feeds')
+        write_file(feeds, 'stock_1.csv', b'sku,quantity\nOLD,1\n', 1700000000)
+        write_file(feeds, 'stock_2.csv', FEED, 1700003600)
+        configuration = ImportConfiguration(
+            id=2, name='sftp feed', import_type='SFTP', host='127.0.0.1', port=self.port,
+            username='feeds', password='secret', remote_path='feeds/*.csv', remote_manifest={}
+        )
+
+        [result] = RemoteFetcher(self.download_dir).fetch([configuration])
+
+        self.assertIsNone(result.error)
+        self.assertEqual(result.remote_path, 'feeds/stock_2.csv')
+        self.assertEqual(result.entry, RemoteEntry('stock_2.csv', len(FEED), 1700003600))
+        self.assertEqual(result.content_hash, hashlib.sha256(FEED).hexdigest())
@@ -0,0 +1,142 @@
+from collections import Counter
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from django.test import SimpleTestCase
+
+from ..scraping import PAGE_COLUMN, PageCache, Scraper, ScraperSpec
+
+SELECTORS = {
+    'fields': {'sku': '.sku', 'name': 'h1', 'unit_price': '.price'},
+    'links': 'a.product@href',
+    'next_page': 'a.next@href',
+}
+
+
+def product_page(sku, name, price):
+    return f'<h1>{name}</h1><span class="sku">{sku}</span><span class="price">${price}</span>'
+
+
+def reload(cache):
+    # What save() followed by load() gives the next run, without Redis
+    cache.entries, cache.pending = dict(cache.pending), {}
+
+
+class CatalogSite:
+    """A small shop: two listing pages linking to product pages, with optional validators and failures"""
+
+    def __init__(self):
+        self.requests = Counter()
+        self.conditional = Counter()
+        self.pages = {
+            '/list': '<a class="product" href="/p/1">1</a><a class="product" href="/p/2">2</a>'
+                     '<a class="next" href="/list?page=2">next</a>',
+            '/list?page=2': '<a class="product" href="/p/3">3</a>',
+            '/p/1': product_page('SKU-1', 'Kettle', '19.90'),
+            '/p/2': product_page('SKU-2', 'Toaster', '1,234.50'),
+            '/p/3': product_page('SKU-3', 'Mixer', '49.00'),
+        }
+        self.etags = {}
+        # Path -> statuses answered before the page itself
+        self.failures = {}
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/{path:.*}', self.handle)
+        return app
+
+    async def handle(self, request):
+        path = request.path_qs
+        self.requests[path] += 1
+        if request.headers.get('If-None-Match'):
+            self.conditional[path] += 1
+
+        failures = self.failures.get(path)
+        if failures:
+            return web.Response(status=failures.pop(0))
+        if path not in self.pages:
+            raise web.HTTPNotFound()
+
+        etag = self.etags.get(path)
+        if etag and request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        headers = {'ETag': etag} if etag else {}
+        return web.Response(text=self.pages[path], content_type='text/html', headers=headers)
+
+
+class ScraperTests(SimpleTestCase):
+    def scraper(self, cache=None, retries=0):
+        return Scraper(
+            ScraperSpec(SELECTORS), cache=cache, max_connections=4, connections_per_host=4,
+            requests_per_second=0, timeout=10, max_pages=20, retries=retries
+        )
+
+    async def test_listing_and_product_pages_are_crawled(self):
+        site = CatalogSite()
+        async with TestServer(site.app()) as server:
+            rows, metrics = await self.scraper().scrape(str(server.make_url('/list')))
+
+        self.assertEqual(
+            sorted((row['sku'], row['name'], row['unit_price']) for row in rows),
+            [('SKU-1', 'Kettle', '19.90'), ('SKU-2', 'Toaster', '1234.50'), ('SKU-3', 'Mixer', '49.00')]
+        )
+        self.assertTrue(all(row[PAGE_COLUMN].endswith(f"/p/{row['sku'][-1]}") for row in rows))
+        self.assertEqual(metrics.pages, 5)
+        self.assertEqual(metrics.errors, [])
+
+    async def test_not_modified_pages_are_skipped(self):
+        site = CatalogSite()
+        site.etags = {path: f'"{index}"' for index, path in enumerate(site.pages)}
+        cache = PageCache(1, SELECTORS)
+        async with TestServer(site.app()) as server:
+            url = str(server.make_url('/list'))
+            await self.scraper(cache).scrape(url)
+            reload(cache)
+            site.pages['/p/2'] = product_page('SKU-2', 'Toaster', '1,199.00')
+            site.etags['/p/2'] = '"changed"'
+
+            rows, metrics = await self.scraper(cache).scrape(url)
+
+        # The crawl still reaches every page through the cached links, only the changed one is parsed
+        self.assertEqual([(row['sku'], row['unit_price']) for row in rows], [('SKU-2', '1199.00')])
+        self.assertEqual(metrics.unchanged, 4)
+        self.assertEqual(site.conditional['/list'], 1)
+        self.assertEqual(site.requests['/p/3'], 2)
+
+    async def test_pages_with_the_same_body_are_skipped(self):
+        site = CatalogSite()
+        cache = PageCache(1, SELECTORS)
+        async with TestServer(site.app()) as server:
+            url = str(server.make_url('/list'))
+            await self.scraper(cache).scrape(url)
+            reload(cache)
+
+            rows, metrics = await self.scraper(cache).scrape(url)
+
+        self.assertEqual(rows, [])
+        self.assertEqual(metrics.unchanged, 5)
+        self.assertEqual(site.conditional, Counter())
+
+    async def test_transient_errors_are_retried(self):
+        site = CatalogSite()
+        site.failures = {'/p/1': [429], '/p/2': [503], '/p/3': [503, 503]}
+        async with TestServer(site.app()) as server:
+            rows, metrics = await self.scraper(retries=1).scrape(str(server.make_url('/list')))
+
+        self.assertEqual(sorted(row['sku'] for row in rows), ['SKU-1', 'SKU-2'])
+        self.assertEqual(site.requests['/p/1'], 2)
+        self.assertEqual(site.requests['/p/2'], 2)
+        # Out of retries, the page is reported
+        self.assertEqual(site.requests['/p/3'], 2)
+        self.assertEqual(len(metrics.errors), 1)
+        self.assertTrue(metrics.errors[0].endswith('/p/3: HTTP 503'))
+
+    async def test_client_errors_are_not_retried(self):
+        site = CatalogSite()
+        site.pages['/list'] = '<a class="product" href="/p/1">1</a><a class="product" href="/p/404">?</a>'
+        async with TestServer(site.app()) as server:
+            rows, metrics = await self.scraper(retries=2).scrape(str(server.make_url('/list')))
+
+        self.assertEqual([row['sku'] for row in rows], ['SKU-1'])
+        self.assertEqual(site.requests['/p/404'], 1)
+        self.assertTrue(metrics.errors[0].endswith('/p/404: HTTP 404'))
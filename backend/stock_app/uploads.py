@@ -0,0 +1,69 @@
+import hashlib
+import os
+import tempfile
+
+from .models import DataUploadHistory
+
+UPLOAD_DIR = '/app/upload_temp'
+
+
+def save_upload(uploaded_file, directory=UPLOAD_DIR):
+    """
+    Write an uploaded file to a temporary file of its own in the upload
+    directory, hashing it while it streams to disk. Returns the temporary
+    path and the SHA-256 hex digest; the caller then keeps the file with
+    keep_upload, or drops it with discard_upload when the content was
+    already imported, without ever touching another upload's file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(prefix='.incoming-', suffix='.part', dir=directory)
+    digest = hashlib.sha256()
+    with os.fdopen(handle, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+            destination.write(chunk)
+    return temp_path, digest.hexdigest()
+
+
+def keep_upload(temp_path, upload_history):
+    """Move a saved upload to <upload id>_<name>, record it as the upload's stored_file and return the path"""
+    stored_file = f'{upload_history.id}_{os.path.basename(upload_history.file_name)}'
+    file_path = os.path.join(os.path.dirname(temp_path), stored_file)
+    os.replace(temp_path, file_path)
+    upload_history.stored_file = os.path.relpath(file_path, UPLOAD_DIR)
+    upload_history.save(update_fields=['stored_file'])
+    return file_path
+
+
+def discard_upload(temp_path):
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+def find_duplicate_upload(content_hash, import_options):
+    """
+    Return the earliest successful upload of the same content imported with
+    the same options, or None. The same file imported as stock and as
+    products, or with another column mapping, is not a duplicate. Only
+    uploads without failed rows count: a file whose rows were rejected
+    (unknown SKUs, bad values) may apply once the data is fixed.
+    """
+    return (
+        DataUploadHistory.objects
+        .filter(
+            content_hash=content_hash,
+            import_options=import_options,
+            status='COMPLETED',
+            records_failed=0,
+            duplicate_of__isnull=True
+        )
+        .order_by('id')
+        .first()
+    )
+
+
+def upload_path(upload_history):
+    """Where the file of an upload is kept: stored_file, or file_name for older records"""
+    return os.path.join(UPLOAD_DIR, upload_history.stored_file or upload_history.file_name)
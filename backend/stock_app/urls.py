@@ -13,8 +13,10 @@ router.register(r'price-history', views.PriceHistoryViewSet)
 router.register(r'import-configs', views.ImportConfigurationViewSet)
 router.register(r'scraper-configs', views.WebScraperConfigViewSet)
 router.register(r'upload-history', views.DataUploadHistoryViewSet)
+router.register(r'export-jobs', views.ExportJobViewSet)
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
 router.register(r'dashboard', views.DashboardViewSet, basename='dashboard')
+router.register(r'cache-stats', views.CacheStatsViewSet, basename='cache-stats')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -42,7 +44,8 @@ urlpatterns = [
 #   DELETE /{id}/ - Delete product
 #   POST /bulk-update/ - Bulk update products
 #   POST /import-products/ - Import products from CSV
-#   GET /export-products/ - Export products to CSV
+#   GET, POST /lookup/ - Products by SKU or barcode (cached)
+#   GET /export-products/ - Stream products as CSV, CSV.gz, NDJSON or XLSX
 
 # /api/stock/ - Stock management
 #   Similar CRUD operations for stock records
@@ -62,6 +65,12 @@ urlpatterns = [
 # /api/upload-history/ - Upload history tracking
 #   Similar CRUD operations for upload history
 
+# /api/export-jobs/ - Background product exports
+#   GET / - List export jobs
+#   POST / - Queue an export (or get the identical finished one)
+#   GET /{id}/ - Job status and progress
+#   GET /{id}/download/ - Download the finished file
+
 # /api/notifications/ - User notifications
 #   GET / - List user's notifications
 #   POST /{id}/mark-as-read/ - Mark notification as read
@@ -76,3 +85,7 @@ urlpatterns = [
 #     - Recent imports
 #     - Recent activity
 #     - Unread alerts
+
+# /api/cache-stats/ - Response cache counters
+#   GET / - Hits, misses and hit rate per cached endpoint
+#   POST /reset/ - Reset the counters
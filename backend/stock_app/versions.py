@@ -0,0 +1,85 @@
+import logging
+import time
+
+from django.db import models, transaction
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# Data sets whose version is tracked. PRODUCTS covers the products with
+# their stock records, movements and price history.
+PRODUCTS = 'products'
+CATEGORIES = 'categories'
+BRANDS = 'brands'
+SUPPLIERS = 'suppliers'
+# Cached SKU/barcode lookups, see lookups.py. Writes that know the changed
+# products forget their codes instead; bulk writes bump this.
+LOOKUPS = 'product-lookups'
+
+
+def version_key(name):
+    return f'data-version:{name}'
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def data_versions(*names):
+    """
+    Current versions of data sets, read in one round trip, or None when
+    Redis is unavailable (callers then must not reuse cached results). A
+    missing counter starts from the current time, so versions handed out
+    before Redis lost it never repeat.
+    """
+    try:
+        with _redis().pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.set(version_key(name), time.time_ns(), nx=True)
+                pipe.get(version_key(name))
+            return [int(value) for value in pipe.execute()[1::2]]
+    except Exception as e:
+        logger.warning(f"Could not read data version of {', '.join(names)}: {str(e)}")
+        return None
+
+
+def data_version(name):
+    versions = data_versions(name)
+    return versions[0] if versions else None
+
+
+def bump_version(*names):
+    """Give data sets a new version once the current transaction commits"""
+
+    def bump():
+        try:
+            with _redis().pipeline() as pipe:
+                for name in names:
+                    pipe.set(version_key(name), time.time_ns(), nx=True)
+                    pipe.incr(version_key(name))
+                pipe.execute()
+        except Exception as e:
+            logger.error(f"Could not bump data version of {', '.join(names)}, cached results may be stale: {str(e)}")
+
+    transaction.on_commit(bump)
+
+
+class VersionedQuerySet(models.QuerySet):
+    """
+    QuerySet whose bulk writes (update, and so bulk_update, and bulk_create),
+    which send no signals, bump the version of the model's data set. Saves
+    and deletes bump it from signals.
+    """
+    data_set = None
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            bump_version(self.data_set)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        if created:
+            bump_version(self.data_set)
+        return created
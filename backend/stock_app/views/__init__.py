@@ -15,6 +15,8 @@ from .import_views import (
     WebScraperConfigViewSet,
     DataUploadHistoryViewSet
 )
+from .export_views import ExportJobViewSet
+from .cache_views import CacheStatsViewSet
 from .notification_views import NotificationViewSet
 from .error_handlers import (
     bad_request,
@@ -35,6 +37,8 @@ __all__ = [
     'ImportConfigurationViewSet',
     'WebScraperConfigViewSet',
     'DataUploadHistoryViewSet',
+    'ExportJobViewSet',
+    'CacheStatsViewSet',
     'NotificationViewSet',
     'bad_request',
     'permission_denied',
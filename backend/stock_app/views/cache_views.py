@@ -0,0 +1,18 @@
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from ..response_cache import cache_stats, reset_cache_stats
+
+class CacheStatsViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """Response cache hits, misses and hit rate per cached endpoint"""
+        return Response(cache_stats())
+
+    @action(detail=False, methods=['post'])
+    def reset(self, request):
+        reset_cache_stats()
+        return Response({'status': 'success'})
@@ -0,0 +1,81 @@
+from rest_framework import mixins, viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+import os
+import logging
+
+from ..exports import EXPORT_FORMATS, export_path, export_signature, filtered_products
+from ..models import ExportJob
+from ..serializers import ExportJobSerializer
+from ..tasks import run_product_export
+from ..versions import PRODUCTS, data_version
+
+logger = logging.getLogger(__name__)
+
+class ExportJobViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ExportJob.objects.select_related('requested_by').order_by('-created_at')
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status', 'export_format', 'requested_by']
+
+    def create(self, request, *args, **kwargs):
+        """
+        Queue an export of the products matching `filters` (the query params
+        of the product list). An identical export of unchanged product data
+        is not written again: the existing job is returned instead.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        export_format = serializer.validated_data.get('export_format', 'csv.gz')
+        filters = serializer.validated_data.get('filters', {})
+
+        # Invalid filter values are reported now rather than by the task
+        filtered_products(filters)
+
+        version = data_version(PRODUCTS)
+        if version is not None:
+            signature = export_signature(export_format, filters, version)
+            existing = (
+                ExportJob.objects.filter(signature=signature, status__in=['PENDING', 'PROCESSING', 'COMPLETED'])
+                .order_by('-id').first()
+            )
+            if existing and (existing.status != 'COMPLETED' or os.path.exists(export_path(existing))):
+                return Response(self.get_serializer(existing).data, status=status.HTTP_200_OK)
+        else:
+            # Without a data version the content cannot be matched, so the job is never reused
+            signature = ''
+
+        job = serializer.save(requested_by=request.user, signature=signature)
+        run_product_export.delay(job.id)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['GET'], url_path='download')
+    def download(self, request, pk=None):
+        """The finished file, handed to nginx to send when EXPORT_ACCEL_REDIRECT_PREFIX is set"""
+        job = self.get_object()
+        file_path = export_path(job) if job.file_name else None
+        if job.status != 'COMPLETED' or not file_path or not os.path.exists(file_path):
+            return Response(
+                {'error': 'Export file is not available', 'status': job.status},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        content_type, extension, _ = EXPORT_FORMATS[job.export_format]
+        download_name = f'products-{job.id}.{extension}'
+        if settings.EXPORT_ACCEL_REDIRECT_PREFIX:
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = f'{settings.EXPORT_ACCEL_REDIRECT_PREFIX}{job.file_name}'
+            response['Content-Disposition'] = f'attachment; filename="{download_name}"'
+            return response
+
+        return FileResponse(
+            open(file_path, 'rb'),
+            content_type=content_type,
+            as_attachment=True,
+            filename=download_name
+        )
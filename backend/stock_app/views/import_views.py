@@ -3,7 +3,6 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.utils import timezone
 from django.http import FileResponse, Http404
 import os
 import mimetypes
@@ -19,9 +18,20 @@ from ..serializers import (
     ImportConfigurationSerializer,
     WebScraperConfigSerializer,
     DataUploadHistorySerializer,
-    FilePreviewSerializer,
+    StockFileUploadSerializer,
+    FeedFileSerializer,
     ProductImportSerializer
 )
+from ..pagination import UploadHistoryPagination
+from ..progress import get_progress
+from ..uploads import save_upload, keep_upload, discard_upload, find_duplicate_upload, upload_path
+from ..tasks import (
+    process_stock_file_upload,
+    process_product_import,
+    process_configured_import,
+    run_scheduled_job
+)
+from ..scheduler import job_running
 
 logger = logging.getLogger(__name__)
 
@@ -30,19 +40,114 @@ class ImportConfigurationViewSet(viewsets.ModelViewSet):
     serializer_class = ImportConfigurationSerializer
     permission_classes = [IsAuthenticated]
 
+    @action(detail=True, methods=['POST'], url_path='fetch')
+    def fetch(self, request, pk=None):
+        """Pull the current feed of an FTP/SFTP configuration and import it in the background"""
+        configuration = self.get_object()
+        if configuration.import_type not in ('FTP', 'SFTP'):
+            return Response(
+                {'error': 'Only FTP and SFTP configurations can be fetched'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not configuration.column_mapping.get('sku'):
+            return Response(
+                {'error': "Configuration has no column mapping for 'sku'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if job_running('import', configuration.id):
+            return Response(
+                {'error': f'A fetch of "{configuration.name}" is already in progress'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        # Through the scheduler, so a manual fetch takes the same overlap lock and job slot
+        run_scheduled_job.delay('import', configuration.id)
+        return Response(
+            {'message': f'Fetching feed of "{configuration.name}"'},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(detail=True, methods=['POST'], url_path='import-file')
+    def import_file(self, request, pk=None):
+        """Apply a feed file as a delta against the previous run of this configuration"""
+        configuration = self.get_object()
+        if not configuration.column_mapping.get('sku'):
+            return Response(
+                {'error': "Configuration has no column mapping for 'sku'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = FeedFileSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            uploaded_file = request.FILES['file']
+            temp_path, content_hash = save_upload(uploaded_file)
+
+            upload_history = DataUploadHistory.objects.create(
+                upload_type='FILE',
+                file_name=uploaded_file.name,
+                uploaded_by=request.user,
+                status='PENDING',
+                content_hash=content_hash,
+                import_options={'kind': 'delta', 'configuration': configuration.id},
+                import_configuration=configuration
+            )
+            file_path = keep_upload(temp_path, upload_history)
+
+            process_configured_import.delay(upload_history.id, file_path)
+
+            return Response({
+                'message': f'Feed "{uploaded_file.name}" queued for delta import',
+                'upload_id': upload_history.id,
+                'status': upload_history.status,
+                'records_processed': 0,
+                'records_failed': 0
+            }, status=status.HTTP_202_ACCEPTED)
+
+        except Exception as e:
+            logger.error(f"Error queueing feed import: {str(e)}")
+            return Response({
+                'error': 'Failed to queue feed import',
+                'detail': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class WebScraperConfigViewSet(viewsets.ModelViewSet):
     queryset = WebScraperConfig.objects.all()
     serializer_class = WebScraperConfigSerializer
     permission_classes = [IsAuthenticated]
 
+    @action(detail=True, methods=['POST'], url_path='run')
+    def run(self, request, pk=None):
+        """
+        Scrape the configured pages and import the products found in the
+        background; pages unchanged since the last run are skipped unless
+        "full" is set.
+        """
+        config = self.get_object()
+        full = str(request.data.get('full', '')).lower() in ('1', 'true', 'yes')
+        if job_running('scraper', config.id):
+            return Response(
+                {'error': f'A run of "{config.name}" is already in progress'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        run_scheduled_job.delay('scraper', config.id, user_id=request.user.id, full=full)
+        return Response(
+            {'message': f'Scraping "{config.name}"'},
+            status=status.HTTP_202_ACCEPTED
+        )
+
 class DataUploadHistoryViewSet(viewsets.ModelViewSet):
-    queryset = DataUploadHistory.objects.all().order_by('-upload_date')  # Order by newest first
+    queryset = DataUploadHistory.objects.select_related('uploaded_by').order_by('-upload_date')  # Order by newest first
     serializer_class = DataUploadHistorySerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['file_name']
     filterset_fields = ['upload_type', 'status', 'uploaded_by']
-    pagination_class = None  # Disable pagination for this viewset
+    pagination_class = UploadHistoryPagination
 
     @action(detail=True, methods=['GET'], url_path='download')
     def download_file(self, request, pk=None):
@@ -54,7 +159,7 @@ class DataUploadHistoryViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            file_path = os.path.join('/app/upload_temp', upload_history.file_name)
+            file_path = upload_path(upload_history)
             if not os.path.exists(file_path):
                 logger.error(f"File not found at path: {file_path}")
                 return Response(
@@ -73,7 +178,7 @@ class DataUploadHistoryViewSet(viewsets.ModelViewSet):
                 file_handle,
                 content_type=content_type,
                 as_attachment=True,
-                filename=upload_history.file_name
+                filename=os.path.basename(upload_history.file_name)
             )
 
             # Add Content-Length header
@@ -94,74 +199,67 @@ class DataUploadHistoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['GET'], url_path='progress')
+    def progress(self, request, pk=None):
+        """Live progress of an upload, served from Redis while it is processed"""
+        progress = get_progress(pk)
+        if progress is None:
+            # Not tracked (or expired), fall back to the stored counters
+            upload_history = self.get_object()
+            progress = {
+                'status': upload_history.status,
+                'rows_done': upload_history.records_processed,
+                'rows_failed': upload_history.records_failed,
+                'rows_total': None,
+                'rows_per_sec': None,
+                'eta_seconds': None,
+            }
+        return Response({'upload_id': int(pk), **progress})
+
     @action(detail=False, methods=['POST'], url_path='upload-file')
     def upload_file(self, request):
         try:
             # Validate file upload
-            file_serializer = FilePreviewSerializer(data=request.data)
+            file_serializer = StockFileUploadSerializer(data=request.data)
             if not file_serializer.is_valid():
                 return Response(file_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
             uploaded_file = request.FILES['file']
-            
+
+            # Save the file to a temporary path, hashing it on the way to disk
+            temp_path, content_hash = save_upload(uploaded_file)
+            import_options = {'kind': 'stock'}
+
             # Create upload history record
             upload_history = DataUploadHistory.objects.create(
                 upload_type='FILE',
                 file_name=uploaded_file.name,
                 uploaded_by=request.user,
                 status='PENDING',
+                ingest_mode=file_serializer.validated_data['ingest_mode'],
+                content_hash=content_hash,
+                import_options=import_options,
                 records_processed=0,
                 records_failed=0
             )
 
-            # Ensure upload directory exists
-            os.makedirs('/app/upload_temp', exist_ok=True)
-
-            # Save the file
-            file_path = os.path.join('/app/upload_temp', uploaded_file.name)
-            with open(file_path, 'wb+') as destination:
-                for chunk in uploaded_file.chunks():
-                    destination.write(chunk)
-
-            # Process the file
-            try:
-                # For now, just mark as completed with basic processing
-                upload_history.status = 'COMPLETED'
-                upload_history.records_processed = 1
-                upload_history.save()
-
-                # Create notification for successful upload
-                Notification.objects.create(
-                    type='UPLOAD_COMPLETE',
-                    message=f'File "{uploaded_file.name}" uploaded successfully',
-                    user=request.user
-                )
+            # The same file was already applied, don't parse it again unless forced
+            original = None if file_serializer.validated_data['force'] else find_duplicate_upload(content_hash, import_options)
+            if original:
+                discard_upload(temp_path)
+                return self._duplicate_response(upload_history, original)
+            file_path = keep_upload(temp_path, upload_history)
 
-                return Response({
-                    'message': f'File "{uploaded_file.name}" uploaded successfully',
-                    'upload_id': upload_history.id,
-                    'status': 'COMPLETED',
-                    'records_processed': 1,
-                    'records_failed': 0
-                }, status=status.HTTP_201_CREATED)
-
-            except Exception as e:
-                logger.error(f"Error processing file: {str(e)}")
-                upload_history.status = 'FAILED'
-                upload_history.error_message = str(e)
-                upload_history.save()
-
-                # Create notification for failed upload
-                Notification.objects.create(
-                    type='UPLOAD_FAILED',
-                    message=f'Failed to process file "{uploaded_file.name}": {str(e)}',
-                    user=request.user
-                )
+            # Process the file in the background
+            process_stock_file_upload.delay(upload_history.id, file_path)
 
-                return Response({
-                    'error': 'Failed to process file',
-                    'detail': str(e)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({
+                'message': f'File "{uploaded_file.name}" uploaded, processing started',
+                'upload_id': upload_history.id,
+                'status': upload_history.status,
+                'records_processed': 0,
+                'records_failed': 0
+            }, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.error(f"Error uploading file: {str(e)}")
@@ -185,64 +283,51 @@ class DataUploadHistoryViewSet(viewsets.ModelViewSet):
 
             uploaded_file = request.FILES['file']
 
+            # Save the file to a temporary path, hashing it on the way to disk
+            temp_path, content_hash = save_upload(uploaded_file)
+            import_options = {
+                'kind': 'products',
+                'column_mapping': serializer.validated_data['column_mapping'],
+                'header_row': serializer.validated_data['header_row'],
+                'data_start_row': serializer.validated_data['data_start_row']
+            }
+
             # Create upload history record
             upload_history = DataUploadHistory.objects.create(
                 upload_type='FILE',
                 file_name=uploaded_file.name,
                 uploaded_by=request.user,
-                status='PROCESSING',
+                status='PENDING',
+                ingest_mode=serializer.validated_data['ingest_mode'],
+                content_hash=content_hash,
+                import_options=import_options,
                 records_processed=0,
                 records_failed=0
             )
 
-            # Ensure upload directory exists
-            os.makedirs('/app/upload_temp', exist_ok=True)
-
-            # Save the file
-            file_path = os.path.join('/app/upload_temp', uploaded_file.name)
-            with open(file_path, 'wb+') as destination:
-                for chunk in uploaded_file.chunks():
-                    destination.write(chunk)
-
-            try:
-                # Process product import
-                # Implementation details would go here
-                upload_history.status = 'COMPLETED'
-                upload_history.records_processed = 1
-                upload_history.save()
-
-                # Create notification for successful import
-                Notification.objects.create(
-                    type='UPLOAD_COMPLETE',
-                    message=f'Products from "{uploaded_file.name}" imported successfully',
-                    user=request.user
-                )
-
-                return Response({
-                    'message': f'Products from "{uploaded_file.name}" imported successfully',
-                    'upload_id': upload_history.id,
-                    'status': 'COMPLETED',
-                    'records_processed': 1,
-                    'records_failed': 0
-                }, status=status.HTTP_201_CREATED)
-
-            except Exception as e:
-                logger.error(f"Error importing products: {str(e)}")
-                upload_history.status = 'FAILED'
-                upload_history.error_message = str(e)
-                upload_history.save()
-
-                # Create notification for failed import
-                Notification.objects.create(
-                    type='UPLOAD_FAILED',
-                    message=f'Failed to import products from "{uploaded_file.name}": {str(e)}',
-                    user=request.user
-                )
+            # The same file was already imported with this mapping, don't parse it again unless forced
+            original = None if serializer.validated_data['force'] else find_duplicate_upload(content_hash, import_options)
+            if original:
+                discard_upload(temp_path)
+                return self._duplicate_response(upload_history, original)
+            file_path = keep_upload(temp_path, upload_history)
+
+            # Import the products in the background
+            process_product_import.delay(
+                upload_history.id,
+                file_path,
+                import_options['column_mapping'],
+                header_row=import_options['header_row'],
+                data_start_row=import_options['data_start_row']
+            )
 
-                return Response({
-                    'error': 'Failed to import products',
-                    'detail': str(e)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({
+                'message': f'Products from "{uploaded_file.name}" queued for import',
+                'upload_id': upload_history.id,
+                'status': upload_history.status,
+                'records_processed': 0,
+                'records_failed': 0
+            }, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.error(f"Error in product import: {str(e)}")
@@ -256,3 +341,22 @@ class DataUploadHistoryViewSet(viewsets.ModelViewSet):
                 'error': 'Failed to process import',
                 'detail': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _duplicate_response(self, upload_history, original):
+        """Close an upload whose content was already imported successfully"""
+        upload_history.status = 'COMPLETED'
+        upload_history.duplicate_of = original
+        # The content is the original's, its file serves the download
+        upload_history.stored_file = original.stored_file
+        upload_history.error_message = f'Duplicate of upload #{original.id}, not processed again'
+        upload_history.save()
+        logger.info(f"Upload {upload_history.id} is a duplicate of upload {original.id}, skipped")
+
+        return Response({
+            'message': f'File "{upload_history.file_name}" is a duplicate of upload #{original.id}',
+            'upload_id': upload_history.id,
+            'duplicate_of': original.id,
+            'status': upload_history.status,
+            'records_processed': 0,
+            'records_failed': 0
+        }, status=status.HTTP_200_OK)
@@ -1,15 +1,12 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
-import csv
-import pandas as pd
+from django.http import StreamingHttpResponse
 
 from ..models import (
     Product,
-    PriceHistory,
     Stock,
     StockMovement,
     DataUploadHistory
@@ -20,16 +17,44 @@ from ..serializers import (
     ProductListSerializer,
     FilePreviewSerializer,
     ProductImportSerializer,
+    ProductLookupSerializer,
     BulkProductUpdateSerializer
 )
+from ..exports import EXPORT_FORMATS, stream_export
+from ..lookups import lookup_products
+from ..pagination import ProductPagination
+from ..search import TrigramSearchFilter, is_trigram_search, search_transaction
+from ..response_cache import CachedResponseMixin
+from ..versions import BRANDS, CATEGORIES, LOOKUPS, PRODUCTS, SUPPLIERS, bump_version
+from ..importers import (
+    ProductCopyIngester,
+    importer_for,
+    set_prices,
+    hash_upload,
+    get_parsed_window,
+    build_preview,
+    missing_columns,
+    read_frame
+)
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
+    # Deleting a brand, category or supplier updates its products without signals
+    cache_data_sets = (PRODUCTS, CATEGORIES, BRANDS, SUPPLIERS)
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    pagination_class = ProductPagination
+    filter_backends = [TrigramSearchFilter, DjangoFilterBackend]
     search_fields = ['name', 'description', 'sku', 'barcode']
     filterset_fields = ['is_active', 'brand', 'category', 'supplier']
 
+    def paginate_queryset(self, queryset):
+        # Trigram searches are read with their similarity threshold, see search_transaction;
+        # plain listings, exact code matches and short terms need no transaction
+        if not is_trigram_search(queryset):
+            return super().paginate_queryset(queryset)
+        with search_transaction(queryset.db):
+            return super().paginate_queryset(queryset)
+
     def get_serializer_class(self):
         if self.action == 'list':
             return ProductListSerializer
@@ -44,36 +69,24 @@ class ProductViewSet(viewsets.ModelViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            file = serializer.validated_data['file']
+            file = serializer.validated_data.get('file')
             header_row = serializer.validated_data['header_row']
             preview_rows = serializer.validated_data['preview_rows']
 
-            # Read the file
-            if file.name.endswith('.csv'):
-                df = pd.read_csv(file, nrows=preview_rows + header_row + 1, encoding='utf-8')
-            else:  # Excel files
-                df = pd.read_excel(file, nrows=preview_rows + header_row + 1)
+            # Parse the file once, later previews of the same content come from the cache
+            file_hash = hash_upload(file) if file else serializer.validated_data['file_hash']
+            parsed = get_parsed_window(file_hash, file, rows=header_row + 1 + preview_rows)
+            if parsed is None:
+                return Response(
+                    {'error': 'File preview expired, upload the file again'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-            # Get headers and preview data
-            headers = df.iloc[header_row].tolist()
-            preview_data = df.iloc[header_row + 1:header_row + 1 + preview_rows].to_dict('records')
-
-            # Suggest column mapping
-            model_fields = ['name', 'sku', 'description', 'barcode', 'unit_price', 'purchase_price']
-            suggested_mapping = {}
-            
-            for field in model_fields:
-                # Try to find an exact match
-                matches = [h for h in headers if h.lower() == field.lower()]
-                if matches:
-                    suggested_mapping[field] = matches[0]
-                else:
-                    # Try to find a partial match
-                    matches = [h for h in headers if field.lower() in h.lower()]
-                    if matches:
-                        suggested_mapping[field] = matches[0]
+            # Get headers, preview data and suggested column mapping
+            headers, preview_data, suggested_mapping = build_preview(parsed['window'], header_row, preview_rows)
 
             return Response({
+                'file_hash': file_hash,
                 'headers': headers,
                 'preview': preview_data,
                 'suggested_mapping': suggested_mapping
@@ -95,42 +108,40 @@ class ProductViewSet(viewsets.ModelViewSet):
         header_row = serializer.validated_data['header_row']
         data_start_row = serializer.validated_data['data_start_row']
         column_mapping = serializer.validated_data['column_mapping']
+        ingest_mode = serializer.validated_data['ingest_mode']
 
+        file_hash = hash_upload(file)
         upload_history = DataUploadHistory.objects.create(
             upload_type='FILE',
             file_name=file.name,
             uploaded_by=request.user,
-            status='PROCESSING'
+            status='PROCESSING',
+            ingest_mode=ingest_mode,
+            content_hash=file_hash
         )
 
         try:
-            # Read the file
-            if file.name.endswith('.csv'):
-                df = pd.read_csv(file, skiprows=header_row, encoding='utf-8')
-            else:  # Excel files
-                df = pd.read_excel(file, skiprows=header_row)
+            # The headers known from the preview catch a missing SKU column before the whole file is parsed
+            parsed = get_parsed_window(file_hash)
+            if parsed and column_mapping['sku'] in missing_columns(parsed['window'], header_row, column_mapping):
+                raise ValueError(f"Column '{column_mapping['sku']}' mapped to 'sku' is not in the file")
+
+            # Read only the mapped columns of the file
+            df = read_frame(file, header_row, columns=[column for column in column_mapping.values() if column])
 
             # Skip to data start row
             df = df.iloc[data_start_row - header_row - 1:]
 
-            # Process each row
-            for _, row in df.iterrows():
-                product_data = {}
-                for model_field, file_column in column_mapping.items():
-                    if file_column in df.columns:
-                        value = row[file_column]
-                        # Handle NaN values
-                        if pd.isna(value):
-                            value = None
-                        product_data[model_field] = value
-
-                product_serializer = ProductSerializer(data=product_data)
-                if product_serializer.is_valid():
-                    product_serializer.save()
-                    upload_history.records_processed += 1
-                else:
-                    upload_history.records_failed += 1
-                    upload_history.error_message += f"Row {_}: {product_serializer.errors}\n"
+            # Validate and upsert all rows in batches, or stage them with COPY and merge
+            if ingest_mode == 'COPY':
+                result = ProductCopyIngester(column_mapping, key=upload_history.id, user=request.user).run([df])
+            else:
+                result = importer_for(column_mapping, user=request.user).run(df)
+            upload_history.records_processed = result.processed
+            upload_history.records_inserted = result.created
+            upload_history.records_updated = result.updated
+            upload_history.records_failed = result.failed
+            upload_history.error_message = result.error_message
 
             upload_history.status = 'COMPLETED'
             upload_history.save()
@@ -164,16 +175,13 @@ class ProductViewSet(viewsets.ModelViewSet):
             if action == 'update_price':
                 new_price = value.get('price')
                 if new_price is not None:
-                    for product in products:
-                        PriceHistory.objects.create(
-                            product=product,
-                            price_type='SALE',
-                            old_price=product.unit_price,
-                            new_price=new_price,
-                            changed_by=request.user
-                        )
-                        product.unit_price = new_price
-                        product.save()
+                    # Only products whose price differs are written, together with their history
+                    result = set_prices(
+                        products.values_list('sku', flat=True), {'unit_price': new_price},
+                        user=request.user, reason='Bulk update'
+                    )
+                    if result.failed:
+                        return Response({'error': result.error_message}, status=status.HTTP_400_BAD_REQUEST)
 
             elif action == 'update_stock':
                 quantity = value.get('quantity')
@@ -194,34 +202,54 @@ class ProductViewSet(viewsets.ModelViewSet):
             elif action in ['activate', 'deactivate']:
                 is_active = action == 'activate'
                 products.update(is_active=is_active)
+                bump_version(PRODUCTS, LOOKUPS)
 
             return Response({'status': 'success'})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['get', 'post'])
+    def lookup(self, request):
+        """
+        Products by SKU or barcode, for scanners: ?code= returns one product
+        (404 when unknown), ?codes=a,b or POST {"codes": [...]} map every
+        code to its product or null. Served from the lookup caches.
+        """
+        single = request.method == 'GET' and 'code' in request.query_params
+        if single:
+            data = {'codes': [request.query_params['code']]}
+        elif request.method == 'GET':
+            data = {'codes': [code for code in request.query_params.get('codes', '').split(',') if code]}
+        else:
+            data = request.data
+        serializer = ProductLookupSerializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        codes = serializer.validated_data['codes']
+        results = lookup_products(codes)
+        if not single:
+            return Response({'results': results})
+        if results[codes[0]] is None:
+            return Response(
+                {'error': 'No product with this SKU or barcode', 'code': codes[0]},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(results[codes[0]])
+
     @action(detail=False, methods=['get'])
     def export_products(self, request):
+        """Stream the filtered products as CSV, gzipped CSV, NDJSON or XLSX (?export_format=)"""
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"Unknown export format, use one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         queryset = self.filter_queryset(self.get_queryset())
-        serializer = ProductListSerializer(queryset, many=True)
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="products.csv"'
-        
-        writer = csv.writer(response)
-        
-        # Write headers
-        headers = ['ID', 'Name', 'SKU', 'Barcode', 'Unit Price', 'Current Stock', 'Status']
-        writer.writerow(headers)
-        
-        # Write data
-        for product in serializer.data:
-            writer.writerow([
-                product['id'],
-                product['name'],
-                product['sku'],
-                product['barcode'],
-                product['unit_price'],
-                product['current_stock'],
-                'Active' if product['is_active'] else 'Inactive'
-            ])
-        
+        content_type, extension, _ = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(stream_export(queryset, export_format), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="products.{extension}"'
+        # Let nginx pass the rows on as they are written
+        response['X-Accel-Buffering'] = 'no'
         return response
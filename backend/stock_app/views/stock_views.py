@@ -8,25 +8,32 @@ from ..serializers import (
     StockMovementSerializer,
     PriceHistorySerializer
 )
+from ..pagination import StockMovementPagination, PriceHistoryPagination
+from ..response_cache import CachedResponseMixin
+from ..versions import PRODUCTS
 
-class StockViewSet(viewsets.ModelViewSet):
+class StockViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Stock.objects.all()
+    # Stock records are part of the product data set
+    cache_data_sets = (PRODUCTS,)
     serializer_class = StockSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product']
 
 class StockMovementViewSet(viewsets.ModelViewSet):
-    queryset = StockMovement.objects.all()
+    queryset = StockMovement.objects.select_related('product', 'performed_by')
     serializer_class = StockMovementSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = StockMovementPagination
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['reference_number', 'notes']
     filterset_fields = ['product', 'movement_type', 'performed_by']
 
 class PriceHistoryViewSet(viewsets.ModelViewSet):
-    queryset = PriceHistory.objects.all()
+    queryset = PriceHistory.objects.select_related('product', 'changed_by')
     serializer_class = PriceHistorySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PriceHistoryPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product', 'price_type', 'changed_by']
@@ -4,28 +4,34 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 
 from ..models import Category, Brand, Supplier
+from ..response_cache import CachedResponseMixin
+from ..versions import BRANDS, CATEGORIES, PRODUCTS, SUPPLIERS
 from ..serializers import (
     CategorySerializer,
     BrandSerializer,
     SupplierSerializer
 )
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
+    cache_data_sets = (CATEGORIES,)
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['name', 'description']
 
-class BrandViewSet(viewsets.ModelViewSet):
+class BrandViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Brand.objects.all()
+    cache_data_sets = (BRANDS,)
     serializer_class = BrandSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['name', 'description']
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Supplier.objects.all()
+    # product_count reads the products
+    cache_data_sets = (SUPPLIERS, PRODUCTS)
     serializer_class = SupplierSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
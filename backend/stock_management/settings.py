@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from datetime import timedelta
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'drf_yasg',
@@ -71,6 +73,63 @@ DATABASES = {
     }
 }
 
+# Redis (cache, live progress and Celery broker)
+REDIS_URL = os.environ.get('REDIS_URL', f"redis://{os.environ.get('REDIS_HOST', 'redis')}:6379")
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': f'{REDIS_URL}/1',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        }
+    }
+}
+
+# Celery settings
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', f'{REDIS_URL}/0')
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+# The dashboard metrics shared by all users are recomputed in the background every
+# DASHBOARD_REFRESH_INTERVAL seconds and served from the cache in between
+DASHBOARD_REFRESH_INTERVAL = int(os.environ.get('DASHBOARD_REFRESH_INTERVAL', 60))
+
+CELERY_BEAT_SCHEDULE = {
+    # Evaluates ImportConfiguration/WebScraperConfig cron schedules
+    'dispatch-scheduled-jobs': {
+        'task': 'stock_app.tasks.dispatch_scheduled_jobs',
+        'schedule': 60.0,
+    },
+    'check-stock-levels': {
+        'task': 'stock_app.tasks.check_stock_levels',
+        'schedule': crontab(hour=6, minute=0),
+    },
+    'send-stock-report': {
+        'task': 'stock_app.tasks.send_stock_report',
+        'schedule': crontab(hour=23, minute=50),
+    },
+    'clean-old-notifications': {
+        'task': 'stock_app.tasks.clean_old_notifications',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'refresh-dashboard-metrics': {
+        'task': 'stock_app.tasks.refresh_dashboard_metrics',
+        'schedule': float(DASHBOARD_REFRESH_INTERVAL),
+    },
+    'clean-old-exports': {
+        'task': 'stock_app.tasks.clean_old_exports',
+        'schedule': crontab(minute=15),
+    },
+}
+
+# Scheduled jobs: at most SCHEDULER_MAX_CONCURRENT_JOBS run at once, each starts within
+# SCHEDULER_MAX_JITTER seconds of its due time, and jobs over the budget retry after
+# SCHEDULER_RETRY_DELAY seconds. Locks expire after SCHEDULER_LOCK_TIMEOUT seconds.
+SCHEDULER_MAX_CONCURRENT_JOBS = int(os.environ.get('SCHEDULER_MAX_CONCURRENT_JOBS', 4))
+SCHEDULER_MAX_JITTER = int(os.environ.get('SCHEDULER_MAX_JITTER', 120))
+SCHEDULER_RETRY_DELAY = int(os.environ.get('SCHEDULER_RETRY_DELAY', 60))
+SCHEDULER_LOCK_TIMEOUT = int(os.environ.get('SCHEDULER_LOCK_TIMEOUT', 6 * 60 * 60))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -104,6 +163,46 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# File imports
+# Rows read and committed per transaction when processing uploaded files
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 5000))
+# Uploads larger than IMPORT_SHARD_SIZE rows are split by SKU hash into shards processed
+# by parallel Celery tasks, at most IMPORT_MAX_SHARDS of them (0 disables sharding)
+IMPORT_SHARD_SIZE = int(os.environ.get('IMPORT_SHARD_SIZE', 100000))
+IMPORT_MAX_SHARDS = int(os.environ.get('IMPORT_MAX_SHARDS', 8))
+# Leading rows of a file parsed once for import previews, and how long (seconds) they stay cached
+IMPORT_PREVIEW_WINDOW = int(os.environ.get('IMPORT_PREVIEW_WINDOW', 1000))
+IMPORT_PREVIEW_CACHE_TTL = int(os.environ.get('IMPORT_PREVIEW_CACHE_TTL', 60 * 60))
+
+# FTP/SFTP feed collection
+REMOTE_FETCH_WORKERS = int(os.environ.get('REMOTE_FETCH_WORKERS', 16))
+REMOTE_MAX_CONNECTIONS_PER_HOST = int(os.environ.get('REMOTE_MAX_CONNECTIONS_PER_HOST', 4))
+REMOTE_TIMEOUT = int(os.environ.get('REMOTE_TIMEOUT', 60))
+REMOTE_BLOCK_SIZE = 64 * 1024
+# SFTP servers are checked against the system known hosts and this file; unknown
+# hosts are refused unless REMOTE_SFTP_TRUST_UNKNOWN_HOSTS is set
+REMOTE_SFTP_KNOWN_HOSTS = os.environ.get('REMOTE_SFTP_KNOWN_HOSTS', '')
+REMOTE_SFTP_TRUST_UNKNOWN_HOSTS = os.environ.get('REMOTE_SFTP_TRUST_UNKNOWN_HOSTS', 'False') == 'True'
+# Import CSV feeds while they download. Memory is bounded by REMOTE_STREAM_BUFFER_BLOCKS
+# blocks of REMOTE_BLOCK_SIZE bytes between download and parser, and REMOTE_STREAM_MAX_CHUNKS
+# parsed chunks of IMPORT_CHUNK_SIZE rows between parser and database writes
+REMOTE_STREAM_IMPORTS = os.environ.get('REMOTE_STREAM_IMPORTS', 'False') == 'True'
+REMOTE_STREAM_BUFFER_BLOCKS = int(os.environ.get('REMOTE_STREAM_BUFFER_BLOCKS', 64))
+REMOTE_STREAM_MAX_CHUNKS = int(os.environ.get('REMOTE_STREAM_MAX_CHUNKS', 2))
+
+# Web scraping: open connections in total and per host, requests per second to one host
+# (0 for no limit), per-request timeout (seconds), retries and pages fetched per run
+SCRAPER_MAX_CONNECTIONS = int(os.environ.get('SCRAPER_MAX_CONNECTIONS', 32))
+SCRAPER_CONNECTIONS_PER_HOST = int(os.environ.get('SCRAPER_CONNECTIONS_PER_HOST', 4))
+SCRAPER_REQUESTS_PER_SECOND = float(os.environ.get('SCRAPER_REQUESTS_PER_SECOND', 5))
+SCRAPER_TIMEOUT = int(os.environ.get('SCRAPER_TIMEOUT', 30))
+SCRAPER_RETRIES = int(os.environ.get('SCRAPER_RETRIES', 2))
+SCRAPER_MAX_PAGES = int(os.environ.get('SCRAPER_MAX_PAGES', 500))
+SCRAPER_USER_AGENT = os.environ.get('SCRAPER_USER_AGENT', 'CatalogManagementSystem/1.0')
+# Redis memory (bytes) for the validators and links of scraped pages, shared by all
+# scrapers; the least recently used pages are evicted beyond it
+SCRAPER_CACHE_MAX_BYTES = int(os.environ.get('SCRAPER_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
@@ -153,6 +252,31 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# Largest page size clients may ask for with ?page_size= on keyset-paginated lists
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+# Minimum word similarity (0-1) of a product name to a search term that does
+# not appear in it, see stock_app.search
+SEARCH_SIMILARITY_THRESHOLD = float(os.environ.get('SEARCH_SIMILARITY_THRESHOLD', 0.5))
+
+# Cached list/retrieve responses of the catalog endpoints expire after
+# RESPONSE_CACHE_TIMEOUT seconds; writes make them unreachable right away
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+# SKU/barcode lookups (/api/products/lookup/) are cached per code in Redis for
+# LOOKUP_CACHE_TIMEOUT seconds and in each process for the LOOKUP_LOCAL_SIZE
+# most recently used codes; one request resolves up to LOOKUP_MAX_CODES codes
+LOOKUP_CACHE_TIMEOUT = int(os.environ.get('LOOKUP_CACHE_TIMEOUT', 3600))
+LOOKUP_LOCAL_SIZE = int(os.environ.get('LOOKUP_LOCAL_SIZE', 10000))
+LOOKUP_MAX_CODES = int(os.environ.get('LOOKUP_MAX_CODES', 100))
+
+# Rows fetched from the database cursor per write of a product export
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+# Background export files are kept EXPORT_RETENTION_HOURS and handed to nginx with
+# X-Accel-Redirect under EXPORT_ACCEL_REDIRECT_PREFIX (empty to send them from Django)
+EXPORT_RETENTION_HOURS = int(os.environ.get('EXPORT_RETENTION_HOURS', 24))
+EXPORT_ACCEL_REDIRECT_PREFIX = os.environ.get('EXPORT_ACCEL_REDIRECT_PREFIX', '/protected_exports/')
+
 # Swagger settings
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
@@ -194,3 +318,5 @@ EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True').lower() == 'true'
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# Recipient of the daily stock report
+ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', '')
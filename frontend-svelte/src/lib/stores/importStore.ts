@@ -32,6 +32,7 @@ export interface ImportHistory {
   records_processed: number;
   records_failed: number;
   error_message?: string;
+  duplicate_of?: number | null;
   upload_date: string;
 }
 
@@ -247,7 +248,7 @@ function createImportStore() {
       update(state => ({ ...state, loading: true, error: null }));
 
       try {
-        const response = await fetch('/api/upload-history/', {
+        const response = await fetch('/api/upload-history/?page_size=100', {
           headers: {
             'Authorization': `Bearer ${localStorage.getItem('token')}`
           }
@@ -258,7 +259,9 @@ function createImportStore() {
           throw new Error(errorData.detail || 'Failed to fetch import history');
         }
 
-        const importHistory = await response.json();
+        // The history is paginated newest first; the first page is shown
+        const data = await response.json();
+        const importHistory = Array.isArray(data) ? data : data.results || [];
         update(state => ({ 
           ...state, 
           importHistory: importHistory.sort((a: ImportHistory, b: ImportHistory) => 